@@ -1,8 +1,6 @@
 import streamlit as st
-from utils.api import api_get, api_post
-from core.leave_engine import run_leave_engine
-from core.db import init_db
-from core.seed import seed_hr_if_empty
+from utils.api import api_post, get_me
+from core.startup import startup
 from utils.ui import load_css
 
 # ==========================
@@ -45,17 +43,15 @@ section[data-testid="stSidebar"] { display: none; }
 # ==========================
 # INIT SYSTEM (URUTAN AMAN)
 # ==========================
-init_db()
-seed_hr_if_empty()
-run_leave_engine()
+startup()
 
 # ==========================
 # AUTO CHECK LOGIN (JWT)
 # ==========================
-me = api_get("/me", timeout=5)
+me = get_me(timeout=5)
 
-if me.status_code == 200 and me.json():
-    role = me.json().get("role")
+if me:
+    role = me.get("role")
 
     if role == "employee":
         st.switch_page("pages/employee.py")
@@ -102,6 +98,11 @@ with center:
         if r.status_code == 200 and r.json().get("status") == "ok":
             st.success("Login berhasil")
             st.rerun()
+        elif r.status_code == 429:
+            st.error(
+                "Terlalu banyak percobaan login gagal. "
+                f"Coba lagi dalam {r.json().get('retry_after', 60)} detik."
+            )
         else:
             st.error("Email / Password salah")
 
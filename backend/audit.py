@@ -0,0 +1,113 @@
+import asyncio
+import os
+
+from backend.db import run_db
+from core.db import connection
+from core.metrics import timed_query
+
+# =========================
+# AUTH LOG WRITER (BATCH)
+# =========================
+# /login dan /logout hanya memasukkan baris ke antrian; flusher di
+# background menulis ke auth_logs per batch (satu transaksi executemany)
+# setiap FLUSH_MS atau BATCH_SIZE baris, mana yang lebih dulu.
+FLUSH_MS = int(os.getenv("HR_AUTH_LOG_FLUSH_MS", 200))
+BATCH_SIZE = int(os.getenv("HR_AUTH_LOG_BATCH", 500))
+QUEUE_SIZE = int(os.getenv("HR_AUTH_LOG_QUEUE", 10000))
+
+_STOP = object()
+
+AUTH_LOG_COLUMNS = (
+    "user_id", "email", "role", "action", "ip_address", "user_agent", "created_at"
+)
+
+
+def write_auth_logs(rows):
+    with connection() as conn, timed_query("auth_logs_flush"):
+        conn.executemany(f"""
+            INSERT INTO auth_logs ({", ".join(AUTH_LOG_COLUMNS)})
+            VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        """, rows)
+        conn.commit()
+
+
+class AuthLogWriter:
+    def __init__(self, flush_ms=FLUSH_MS, batch_size=BATCH_SIZE,
+                 queue_size=QUEUE_SIZE):
+        self.flush_seconds = flush_ms / 1000
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self.written = 0
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run(), name="auth-log-writer")
+
+    async def log(self, row: tuple):
+        """
+        row sesuai AUTH_LOG_COLUMNS. Antrian penuh -> tunggu (backpressure).
+        Sebelum start() (mis. di script), langsung ditulis.
+        """
+        if not self.running:
+            await run_db(write_auth_logs, [row])
+            return
+        await self._queue.put(row)
+
+    async def _next_batch(self):
+        """
+        Return (batch, stop). stop=True jika sentinel _STOP diterima.
+        """
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_seconds
+
+        # get_nowait + sleep pendek, bukan wait_for(get()): wait_for yang
+        # timeout bersamaan dengan get() selesai bisa membuang satu baris
+        while True:
+            while len(batch) < self.batch_size and not self._queue.empty():
+                row = self._queue.get_nowait()
+                if row is _STOP:
+                    return batch, True
+                batch.append(row)
+
+            remaining = deadline - loop.time()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                return batch, False
+            await asyncio.sleep(min(remaining, 0.01))
+
+    async def _flush(self, batch):
+        try:
+            await run_db(write_auth_logs, batch)
+            self.written += len(batch)
+        except Exception as e:
+            # audit log tidak boleh menjatuhkan request login
+            print(f"⚠️ auth_logs flush gagal ({len(batch)} baris): {e}")
+
+    async def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+
+    async def stop(self):
+        """
+        Tulis semua baris yang sudah masuk antrian, lalu hentikan flusher.
+        """
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
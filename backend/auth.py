@@ -1,3 +1,8 @@
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.hash import bcrypt
@@ -6,13 +11,95 @@ SECRET_KEY = "SUPER_SECRET_KEY_GANTI"
 ALGORITHM = "HS256"
 EXPIRE_MINUTES = 60 * 8  # 8 jam
 
+# Klaim token yang sudah diverifikasi di-cache (LRU) sampai exp, supaya
+# /me di setiap rerun Streamlit tidak decode JWT ulang
+TOKEN_CACHE_SIZE = int(os.getenv("HR_TOKEN_CACHE_SIZE", 10000))
+
+
+class TokenCache:
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._claims = OrderedDict()   # token -> (claims, exp)
+        self._revoked = {}             # token -> exp (logout)
+        self._revoked_exp = []         # heap (exp, token) untuk buang yang expired
+        self._lock = threading.Lock()
+
+    def _prune_revoked(self, now: float):
+        # catatan logout hanya perlu hidup sampai tokennya kedaluwarsa;
+        # dibuang di setiap get/revoke supaya _revoked tidak tumbuh terus
+        heap = self._revoked_exp
+        while heap and heap[0][0] <= now:
+            exp, token = heapq.heappop(heap)
+            if self._revoked.get(token) == exp:
+                del self._revoked[token]
+
+    def get(self, token: str, now: float):
+        """
+        Return (hit, claims). claims None berarti token sudah logout.
+        """
+        with self._lock:
+            self._prune_revoked(now)
+            if token in self._revoked:
+                return True, None
+
+            entry = self._claims.get(token)
+            if entry is None:
+                return False, None
+            claims, exp = entry
+            if exp <= now:
+                del self._claims[token]
+                return False, None
+            self._claims.move_to_end(token)
+            return True, claims
+
+    def put(self, token: str, claims: dict, exp: float):
+        with self._lock:
+            self._claims[token] = (claims, exp)
+            self._claims.move_to_end(token)
+            while len(self._claims) > self.maxsize:
+                self._claims.popitem(last=False)
+
+    def revoke(self, token: str, exp: float):
+        with self._lock:
+            self._claims.pop(token, None)
+            self._prune_revoked(time.time())
+            self._revoked[token] = exp
+            heapq.heappush(self._revoked_exp, (exp, token))
+
+    def clear(self):
+        with self._lock:
+            self._claims.clear()
+            self._revoked.clear()
+            self._revoked_exp.clear()
+
+
+_token_cache = TokenCache()
+
+
 def create_token(data: dict):
     payload = data.copy()
     payload["exp"] = datetime.utcnow() + timedelta(minutes=EXPIRE_MINUTES)
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 def verify_token(token: str):
+    now = time.time()
+    hit, claims = _token_cache.get(token, now)
+    if hit:
+        return claims
+
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
+
+    _token_cache.put(token, claims, claims.get("exp", now))
+    return claims
+
+def revoke_token(token: str):
+    """
+    Logout: token tidak diterima lagi oleh proses ini sampai exp.
+    """
+    claims = verify_token(token)
+    if claims:
+        _token_cache.revoke(token, claims.get("exp", time.time()))
+    return claims
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.db import POOL_SIZE
+from core.metrics import histogram
+
+# =========================
+# DB THREAD POOL (BACKEND)
+# =========================
+# sqlite3 bersifat blocking. Endpoint async menjalankan query di thread
+# pool khusus ini, bukan di threadpool default Starlette/anyio, sehingga
+# lonjakan login tidak menghabiskan worker untuk request lain.
+# Lokasi DB & tuning koneksi tetap dari core.db (satu konfigurasi).
+DB_WORKERS = int(os.getenv("HR_BACKEND_DB_WORKERS", POOL_SIZE))
+
+EXECUTOR_WAIT_SECONDS = histogram(
+    "hr_backend_db_wait_seconds",
+    "Waktu tunggu request di antrian thread pool DB backend",
+)
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=DB_WORKERS, thread_name_prefix="hr-db"
+        )
+    return _executor
+
+
+async def run_db(fn, *args, **kwargs):
+    """
+    Jalankan fungsi DB sync (yang memakai core.db.connection) tanpa
+    memblokir event loop.
+    """
+    loop = asyncio.get_running_loop()
+    queued = time.perf_counter()
+
+    def call():
+        EXECUTOR_WAIT_SECONDS.observe(time.perf_counter() - queued)
+        return fn(*args, **kwargs)
+
+    return await loop.run_in_executor(get_executor(), call)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,176 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from core.db import connection
+from core.metrics import timed_query
+
+# =========================
+# BRUTE-FORCE GUARD /login
+# =========================
+# Sliding window gagal-login per IP dan per email, di memori. Percobaan
+# yang melewati batas ditolak sebelum bcrypt dijalankan. Batas IP lebih
+# longgar karena satu kantor bisa keluar lewat satu IP (NAT).
+#
+# Percobaan yang lolos check() langsung dipesan (in-flight) dan ikut
+# dihitung ke batas email & IP sampai hasilnya dicatat, supaya burst
+# request paralel tidak semuanya lolos sebelum satu pun tercatat gagal.
+#
+# Persistensi: saat startup jendela diisi ulang dari baris failed_login
+# di auth_logs, jadi restart backend tidak mereset penghitung.
+WINDOW_SECONDS = int(os.getenv("HR_LOGIN_WINDOW_SECONDS", 300))
+MAX_FAILURES_PER_EMAIL = int(os.getenv("HR_LOGIN_MAX_PER_EMAIL", 5))
+MAX_FAILURES_PER_IP = int(os.getenv("HR_LOGIN_MAX_PER_IP", 50))
+RESTORE_FROM_DB = os.getenv("HR_LOGIN_GUARD_RESTORE", "1") == "1"
+
+THROTTLED_ACTION = "login_throttled"
+
+
+class SlidingWindow:
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._hits = {}  # key -> deque[timestamp]
+
+    def _prune(self, hits: deque, now: float):
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+
+    def retry_after(self, key, now: float, pending: int = 0) -> float:
+        """
+        0 jika masih di bawah batas, selain itu detik sampai satu slot lepas.
+        pending = percobaan in-flight yang ikut dihitung.
+        """
+        hits = self._hits.get(key)
+        if hits:
+            self._prune(hits, now)
+        count = len(hits) if hits else 0
+        if count + pending < self.limit:
+            return 0
+        free = self.limit - pending  # slot yang bisa lepas dari jendela
+        if free <= 0 or count < free:
+            # penuh oleh percobaan in-flight: hasilnya sebentar lagi
+            return 1
+        return hits[-free] + self.window - now
+
+    def hit(self, key, now: float):
+        hits = self._hits.setdefault(key, deque())
+        self._prune(hits, now)
+        hits.append(now)
+
+    def reset(self, key):
+        self._hits.pop(key, None)
+
+    def sweep(self, now: float):
+        for key in [k for k, h in self._hits.items() if not h or h[-1] <= now - self.window]:
+            del self._hits[key]
+
+    def __len__(self):
+        return len(self._hits)
+
+
+class LoginGuard:
+    def __init__(
+        self,
+        max_per_email: int = MAX_FAILURES_PER_EMAIL,
+        max_per_ip: int = MAX_FAILURES_PER_IP,
+        window: float = WINDOW_SECONDS,
+    ):
+        self.by_email = SlidingWindow(max_per_email, window)
+        self.by_ip = SlidingWindow(max_per_ip, window)
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._inflight_email = {}  # key -> jumlah percobaan in-flight
+        self._inflight_ip = {}
+
+    @staticmethod
+    def _email_key(email):
+        return (email or "").strip().lower()
+
+    @staticmethod
+    def _release(counts: dict, key):
+        n = counts.get(key, 0) - 1
+        if n > 0:
+            counts[key] = n
+        else:
+            counts.pop(key, None)
+
+    def check(self, ip, email, now: float | None = None) -> int:
+        """
+        Return 0 jika percobaan boleh diproses (dan memesannya), selain itu
+        Retry-After (detik). Setiap check() yang return 0 harus diakhiri
+        record_success / record_failure / release.
+        """
+        now = now or time.time()
+        key = self._email_key(email)
+        with self._lock:
+            wait = max(
+                self.by_email.retry_after(key, now, self._inflight_email.get(key, 0)),
+                self.by_ip.retry_after(ip, now, self._inflight_ip.get(ip, 0)) if ip else 0,
+            )
+            if wait > 0:
+                return math.ceil(wait)
+            self._inflight_email[key] = self._inflight_email.get(key, 0) + 1
+            if ip:
+                self._inflight_ip[ip] = self._inflight_ip.get(ip, 0) + 1
+        return 0
+
+    def release(self, ip, email):
+        """
+        Batalkan pesanan check() tanpa hasil (mis. error di tengah login).
+        """
+        with self._lock:
+            self._release(self._inflight_email, self._email_key(email))
+            if ip:
+                self._release(self._inflight_ip, ip)
+
+    def record_failure(self, ip, email, now: float | None = None, reserved: bool = True):
+        """
+        reserved=False untuk gagal yang tidak lewat check() (restore).
+        """
+        now = now or time.time()
+        with self._lock:
+            if reserved:
+                self._release(self._inflight_email, self._email_key(email))
+                if ip:
+                    self._release(self._inflight_ip, ip)
+            self.by_email.hit(self._email_key(email), now)
+            if ip:
+                self.by_ip.hit(ip, now)
+
+            # buang key yang jendelanya sudah kosong (memori tetap kecil)
+            if now - self._last_sweep > self.by_email.window:
+                self.by_email.sweep(now)
+                self.by_ip.sweep(now)
+                self._last_sweep = now
+
+    def record_success(self, ip, email):
+        with self._lock:
+            self._release(self._inflight_email, self._email_key(email))
+            if ip:
+                self._release(self._inflight_ip, ip)
+            self.by_email.reset(self._email_key(email))
+
+    def restore(self, now: float | None = None) -> int:
+        """
+        Isi ulang jendela dari failed_login di auth_logs (sync, untuk run_db).
+        """
+        now = now or time.time()
+        since = datetime.utcfromtimestamp(now - self.by_email.window)
+        with connection() as conn, timed_query("login_guard_restore"):
+            rows = conn.execute("""
+                SELECT email, ip_address, created_at
+                FROM auth_logs
+                WHERE action = 'failed_login' AND created_at >= ?
+                ORDER BY created_at
+            """, (since.strftime("%Y-%m-%d %H:%M:%S"),)).fetchall()
+
+        for email, ip, created_at in rows:
+            ts = (
+                datetime.fromisoformat(created_at) - datetime(1970, 1, 1)
+            ) / timedelta(seconds=1)
+            self.record_failure(ip, email, now=ts, reserved=False)
+        return len(rows)
@@ -1,63 +1,207 @@
-from fastapi import FastAPI, Depends, Response, Cookie, Request
-import sqlite3
-from backend.auth import create_token, verify_token
-from passlib.hash import bcrypt
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from fastapi import FastAPI, Depends, HTTPException, Response, Cookie, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from backend.auth import create_token, verify_token, revoke_token
+from backend.audit import AuthLogWriter
+from backend.db import run_db, shutdown as shutdown_db
+from backend.login_guard import LoginGuard, RESTORE_FROM_DB, THROTTLED_ACTION
+from backend.resources import (
+    DEFAULT_LIMIT, MAX_LIMIT, RESOURCES, fetch_page, parse_fields
+)
+from core import passwords
+from core.db import connection
+from core.leave_engine import collect_engine_metrics
+from core.metrics import REGISTRY, counter, histogram, timed_query
+from core.migrations import migrate
 
 app = FastAPI()
 
-DB = "data/hr.db"
+# Profil /me di-cache singkat: saldo bisa berubah dari proses Streamlit
+PROFILE_CACHE_SECONDS = float(os.getenv("HR_PROFILE_CACHE_SECONDS", 15))
+_profiles = {}  # user_id -> (profile, expires_at)
+
+auth_log_writer = AuthLogWriter()
+login_guard = LoginGuard()
+
+# /metrics terbuka untuk scraper internal; set token untuk membatasi
+METRICS_TOKEN = os.getenv("HR_METRICS_TOKEN")
+
+HTTP_REQUESTS = counter(
+    "hr_http_requests_total", "Jumlah request HTTP backend",
+    ("method", "route", "status")
+)
+HTTP_SECONDS = histogram(
+    "hr_http_request_seconds", "Latensi request HTTP backend",
+    ("method", "route")
+)
+REGISTRY.register_collector(collect_engine_metrics)
 
 # ======================================================
-# DB HELPERS
+# DB HELPERS (sync, dijalankan lewat run_db)
 # ======================================================
-def get_conn():
-    return sqlite3.connect(DB)
-
 def get_user(email):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute(
-        "SELECT id, email, role, password_hash FROM users WHERE email=?",
-        (email,)
-    )
-    row = c.fetchone()
-    conn.close()
-    return row
+    with connection() as conn, timed_query("get_user"):
+        return conn.execute(
+            "SELECT id, email, role, password_hash FROM users WHERE email=?",
+            (email,)
+        ).fetchone()
+
+def update_password_hash(user_id, password_hash):
+    with connection() as conn:
+        conn.execute(
+            "UPDATE users SET password_hash=? WHERE id=?",
+            (password_hash, user_id)
+        )
+        conn.commit()
+
+def get_profile(user_id):
+    with connection() as conn, timed_query("get_profile"):
+        row = conn.execute("""
+            SELECT u.id, u.nik, u.name, u.email, u.role, u.division,
+                   u.manager_id, u.join_date, u.permanent_date,
+                   b.last_year, b.current_year, b.change_off, b.sick_no_doc,
+                   u.notify_mode
+            FROM users u
+            LEFT JOIN leave_balance b ON b.user_id = u.id
+            WHERE u.id=?
+        """, (user_id,)).fetchone()
+
+    if not row:
+        return None
+
+    return {
+        "id": row[0],
+        "user_id": row[0],
+        "nik": row[1],
+        "name": row[2],
+        "email": row[3],
+        "role": row[4],
+        "division": row[5],
+        "manager_id": row[6],
+        "join_date": row[7],
+        "permanent_date": row[8],
+        "balance": {
+            "last_year": row[9] or 0,
+            "current_year": row[10] or 0,
+            "change_off": row[11] or 0,
+            "sick_no_doc": row[12] or 0,
+        },
+        "notify_mode": row[13] or "instant",
+    }
+
+async def load_profile(user_id):
+    cached = _profiles.get(user_id)
+    now = time.monotonic()
+    if cached and cached[1] > now:
+        return cached[0]
+
+    profile = await run_db(get_profile, user_id)
+    if profile:
+        _profiles[user_id] = (profile, now + PROFILE_CACHE_SECONDS)
+    else:
+        _profiles.pop(user_id, None)
+    return profile
 
-def log_auth_action(
+async def log_auth_action(
     user_id=None,
     email=None,
     role=None,
     action="login",
     request: Request | None = None
 ):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO auth_logs
-        (user_id, email, role, action, ip_address, user_agent)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
+    # created_at diisi sekarang: baris baru ditulis saat flush berikutnya
+    await auth_log_writer.log((
         user_id,
         email,
         role,
         action,
         request.client.host if request and request.client else None,
-        request.headers.get("user-agent") if request else None
+        request.headers.get("user-agent") if request else None,
+        datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
     ))
-    conn.commit()
-    conn.close()
+
+# ======================================================
+# METRICS (REQUEST COUNT & LATENSI PER ROUTE)
+# ======================================================
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # label pakai template route (/api/{resource_name}), bukan path
+        # mentah, supaya jumlah seri tetap kecil
+        route = request.scope.get("route")
+        path = route.path if route else "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, route=path, status=status)
+        HTTP_SECONDS.observe(
+            time.perf_counter() - started, method=request.method, route=path
+        )
+
+# ======================================================
+# STARTUP / SHUTDOWN
+# ======================================================
+@app.on_event("startup")
+async def run_migrations():
+    await run_db(migrate)
+    if RESTORE_FROM_DB:
+        await run_db(login_guard.restore)
+    auth_log_writer.start()
+    # siapkan process pool + hash pembanding sebelum request pertama
+    await passwords.verify_password_async("", None)
+
+@app.on_event("shutdown")
+async def close_db():
+    # flush auth_logs dulu, baru thread pool DB ditutup
+    await auth_log_writer.stop()
+    shutdown_db()
+    passwords.shutdown()
 
 # ======================================================
 # AUTH ENDPOINTS
 # ======================================================
 @app.post("/login")
-def login(email: str, password: str, response: Response, request: Request):
-    user = get_user(email)
+async def login(email: str, password: str, response: Response, request: Request):
+    ip = request.client.host if request.client else None
+
+    # ⛔ TERLALU BANYAK GAGAL: tolak sebelum query & bcrypt
+    retry_after = login_guard.check(ip, email)
+    if retry_after:
+        await log_auth_action(
+            email=email,
+            action=THROTTLED_ACTION,
+            request=request
+        )
+        return JSONResponse(
+            {"error": "too_many_attempts", "retry_after": retry_after},
+            status_code=429,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    try:
+        user = await run_db(get_user, email)
+
+        # bcrypt selalu dijalankan (di process pool), juga untuk email yang
+        # tidak terdaftar, supaya waktu respons tidak membocorkan email valid
+        ok, new_hash = await passwords.verify_password_async(
+            password, user[3] if user else None
+        )
+    except BaseException:
+        # percobaan yang dipesan check() tidak boleh tertahan
+        login_guard.release(ip, email)
+        raise
 
     # ❌ USER TIDAK ADA
     if not user:
-        log_auth_action(
+        login_guard.record_failure(ip, email)
+        await log_auth_action(
             email=email,
             action="failed_login",
             request=request
@@ -67,8 +211,9 @@ def login(email: str, password: str, response: Response, request: Request):
     user_id, user_email, role, password_hash = user
 
     # ❌ PASSWORD SALAH
-    if not bcrypt.verify(password, password_hash):
-        log_auth_action(
+    if not ok:
+        login_guard.record_failure(ip, email)
+        await log_auth_action(
             user_id=user_id,
             email=user_email,
             role=role,
@@ -77,7 +222,12 @@ def login(email: str, password: str, response: Response, request: Request):
         )
         return {"error": "invalid"}
 
+    # 🔁 cost bcrypt berubah -> simpan hash baru
+    if new_hash:
+        await run_db(update_password_hash, user_id, new_hash)
+
     # ✅ LOGIN BERHASIL
+    login_guard.record_success(ip, email)
     token = create_token({"user_id": user_id, "role": role})
     response.set_cookie(
         key="access_token",
@@ -86,7 +236,7 @@ def login(email: str, password: str, response: Response, request: Request):
         samesite="lax"
     )
 
-    log_auth_action(
+    await log_auth_action(
         user_id=user_id,
         email=user_email,
         role=role,
@@ -97,27 +247,102 @@ def login(email: str, password: str, response: Response, request: Request):
     return {"status": "ok", "role": role}
 
 @app.get("/me")
-def me(access_token: str | None = Cookie(default=None)):
+async def me(access_token: str | None = Cookie(default=None)):
+    """
+    Profil ringkas user yang login (identitas + snapshot saldo cuti),
+    atau null jika token tidak valid / user sudah dihapus.
+    """
     if not access_token:
         return None
-    return verify_token(access_token)
+
+    claims = verify_token(access_token)
+    if not claims:
+        return None
+
+    return await load_profile(claims.get("user_id"))
 
 @app.post("/logout")
-def logout(
+async def logout(
     response: Response,
     request: Request,
     access_token: str | None = Cookie(default=None)
 ):
-    user = verify_token(access_token) if access_token else None
+    user = revoke_token(access_token) if access_token else None
 
     if isinstance(user, dict):
-        log_auth_action(
+        await log_auth_action(
             user_id=user.get("user_id"),
             email=user.get("email"),
             role=user.get("role"),
             action="logout",
             request=request
         )
+        _profiles.pop(user.get("user_id"), None)
 
     response.delete_cookie("access_token")
     return {"status": "logged_out"}
+
+# ======================================================
+# DATA API (READ-ONLY, KEYSET PAGINATION + ETAG)
+# ======================================================
+def current_user(access_token: str | None = Cookie(default=None)):
+    claims = verify_token(access_token) if access_token else None
+    if not claims:
+        raise HTTPException(status_code=401, detail="not authenticated")
+    return {"id": claims.get("user_id"), "role": claims.get("role")}
+
+def etag_response(request: Request, payload) -> Response:
+    """
+    JSON + ETag (hash isi). If-None-Match yang cocok -> 304 tanpa body.
+    """
+    body = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/api/{resource_name}")
+async def list_resource(
+    resource_name: str,
+    request: Request,
+    limit: int = DEFAULT_LIMIT,
+    after: int | None = None,
+    fields: str | None = None,
+    viewer: dict = Depends(current_user)
+):
+    resource = RESOURCES.get(resource_name)
+    if resource is None:
+        raise HTTPException(status_code=404, detail="unknown resource")
+
+    try:
+        selected = parse_fields(resource, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # filter = query param lain yang diizinkan resource (mis. ?status=submitted)
+    filters = {
+        k: v for k, v in request.query_params.items() if k in resource.filters
+    }
+
+    page = await run_db(
+        fetch_page, resource, selected, filters, viewer,
+        after, max(1, min(limit, MAX_LIMIT))
+    )
+    return etag_response(request, page)
+
+# ======================================================
+# METRICS (PROMETHEUS TEXT FORMAT)
+# ======================================================
+@app.get("/metrics")
+async def metrics(request: Request):
+    if METRICS_TOKEN:
+        if request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+            raise HTTPException(status_code=401, detail="invalid metrics token")
+
+    # collector engine_runs membaca DB -> jalankan di thread pool DB
+    body = await run_db(REGISTRY.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -0,0 +1,187 @@
+from dataclasses import dataclass, field
+
+from core.db import connection
+from core.metrics import timed_query
+
+# =========================
+# DATA API (READ-ONLY)
+# =========================
+# Definisi resource untuk endpoint /api/*: kolom yang boleh dipilih,
+# filter yang diizinkan, dan kolom pemilik data untuk pembatasan per
+# role. Pagination keyset pada kolom key (terbaru dulu):
+#   ?limit=50&after=<next dari halaman sebelumnya>
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+@dataclass(frozen=True)
+class Resource:
+    source: str                 # FROM ... (boleh dengan JOIN)
+    key: str                    # kolom keyset, unik & integer
+    owner: str                  # kolom user_id pemilik baris
+    fields: dict                # nama field API -> ekspresi SQL
+    filters: tuple = field(default_factory=tuple)
+
+
+RESOURCES = {
+    "users": Resource(
+        source="users u",
+        key="u.id",
+        owner="u.id",
+        fields={
+            "id": "u.id",
+            "nik": "u.nik",
+            "name": "u.name",
+            "email": "u.email",
+            "role": "u.role",
+            "division": "u.division",
+            "manager_id": "u.manager_id",
+            "join_date": "u.join_date",
+            "probation_date": "u.probation_date",
+            "permanent_date": "u.permanent_date",
+        },
+        filters=("role", "division", "manager_id"),
+    ),
+    "balances": Resource(
+        source="leave_balance b",
+        key="b.user_id",
+        owner="b.user_id",
+        fields={
+            "user_id": "b.user_id",
+            "last_year": "b.last_year",
+            "current_year": "b.current_year",
+            "change_off": "b.change_off",
+            "sick_no_doc": "b.sick_no_doc",
+            "updated_at": "b.updated_at",
+        },
+        filters=("user_id",),
+    ),
+    "leave-requests": Resource(
+        source="leave_requests lr JOIN users u ON u.id = lr.user_id",
+        key="lr.id",
+        owner="lr.user_id",
+        fields={
+            "id": "lr.id",
+            "user_id": "lr.user_id",
+            "employee_name": "u.name",
+            "leave_type": "lr.leave_type",
+            "start_date": "lr.start_date",
+            "end_date": "lr.end_date",
+            "total_days": "lr.total_days",
+            "reason": "lr.reason",
+            "status": "lr.status",
+            "manager_note": "lr.manager_note",
+            "approved_by": "lr.approved_by",
+            "approved_at": "lr.approved_at",
+            "created_at": "lr.created_at",
+        },
+        filters=("user_id", "status", "leave_type"),
+    ),
+    "change-off-claims": Resource(
+        source="change_off_claims c JOIN users u ON u.id = c.user_id",
+        key="c.id",
+        owner="c.user_id",
+        fields={
+            "id": "c.id",
+            "user_id": "c.user_id",
+            "employee_name": "u.name",
+            "category": "c.category",
+            "work_type": "c.work_type",
+            "work_date": "c.work_date",
+            "daily_hours": "c.daily_hours",
+            "co_days": "c.co_days",
+            "description": "c.description",
+            "status": "c.status",
+            "rule_version": "c.rule_version",
+            "approved_by": "c.approved_by",
+            "approved_at": "c.approved_at",
+            "created_at": "c.created_at",
+        },
+        filters=("user_id", "status", "work_type"),
+    ),
+}
+
+
+def parse_fields(resource: Resource, fields: str | None) -> list[str]:
+    """
+    "id,name" -> ["id", "name"]. None = semua field.
+    ValueError untuk field yang tidak dikenal.
+    """
+    if not fields:
+        return list(resource.fields)
+
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in resource.fields]
+    if unknown:
+        raise ValueError(f"unknown field: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def page_query(
+    resource: Resource,
+    fields: list[str],
+    filters: dict,
+    viewer: dict,
+    after: int | None,
+    limit: int,
+) -> tuple[str, dict]:
+    """
+    SQL + parameter satu halaman. viewer = {"id", "role"}: hr melihat
+    semua, manager melihat diri + tim langsung, employee hanya dirinya.
+    """
+    where, params = [], {}
+
+    if viewer["role"] == "manager":
+        where.append(f"""(
+            {resource.owner} = :viewer
+            OR {resource.owner} IN (SELECT id FROM users WHERE manager_id = :viewer)
+        )""")
+        params["viewer"] = viewer["id"]
+    elif viewer["role"] != "hr":
+        where.append(f"{resource.owner} = :viewer")
+        params["viewer"] = viewer["id"]
+
+    for name, value in filters.items():
+        where.append(f"{resource.fields[name]} = :f_{name}")
+        params[f"f_{name}"] = value
+
+    if after is not None:
+        where.append(f"{resource.key} < :after")
+        params["after"] = after
+
+    columns = [resource.key] + [resource.fields[f] for f in fields]
+    sql = f"""
+        SELECT {", ".join(columns)}
+        FROM {resource.source}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY {resource.key} DESC
+        LIMIT :limit
+    """
+    params["limit"] = limit + 1
+    return sql, params
+
+
+def fetch_page(
+    resource: Resource,
+    fields: list[str],
+    filters: dict,
+    viewer: dict,
+    after: int | None,
+    limit: int,
+) -> dict:
+    """
+    Satu halaman (sync, untuk run_db), lihat page_query.
+    """
+    sql, params = page_query(resource, fields, filters, viewer, after, limit)
+
+    with connection() as conn, timed_query(f"api_{resource.source.split()[0]}"):
+        rows = conn.execute(sql, params).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "items": [dict(zip(fields, r[1:])) for r in rows],
+        "next": rows[-1][0] if has_more else None,
+    }
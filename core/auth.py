@@ -1,39 +1,41 @@
 import hashlib
 import sqlite3
 import streamlit as st
-from core.db import get_conn
-from passlib.hash import bcrypt
+from core.db import connection
+from core import passwords
 
 def hash_password(password: str) -> str:
-    return bcrypt.hash(password)
+    return passwords.hash_password(password)
 
 def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.verify(password, hashed)
+    ok, _ = passwords.verify_password(password, hashed)
+    return ok
 
 
 
 def login(email, password):
-    conn = get_conn()
-    c = conn.cursor()
-
-    c.execute("""
-        SELECT id, role, password_hash
-        FROM users
-        WHERE email = ?
-    """, (email,))
-
-    row = c.fetchone()
-    conn.close()
-
-    if not row:
+    with connection() as conn:
+        row = conn.execute("""
+            SELECT id, role, password_hash
+            FROM users
+            WHERE email = ?
+        """, (email,)).fetchone()
+
+    # email tidak ada tetap menjalankan bcrypt (waktu respons sama)
+    ok, new_hash = passwords.verify_password(password, row[2] if row else None)
+    if not ok:
         return None
 
-    user_id, role, password_hash = row
+    user_id, role, _ = row
 
-    if bcrypt.verify(password, password_hash):
-        return user_id, role
+    if new_hash:
+        with connection() as conn:
+            conn.execute(
+                "UPDATE users SET password_hash=? WHERE id=?", (new_hash, user_id)
+            )
+            conn.commit()
 
-    return None
+    return user_id, role
 
 def require_role(role):
     current_role = st.session_state.get("role")
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from core.db import connection
+
+# =========================
+# VERSIONED IN-PROCESS CACHE
+# =========================
+# Data referensi (kalender libur, aturan Change Off) di-cache per proses.
+# Penulisan lewat helper modul terkait langsung meng-invalidasi cache;
+# perubahan dari proses lain terdeteksi lewat baris cache_versions yang
+# dicek paling sering tiap CACHE_CHECK_SECONDS.
+CACHE_CHECK_SECONDS = float(os.getenv("HR_CACHE_CHECK_SECONDS", 60))
+
+
+def get_version(conn, name: str) -> int:
+    row = conn.execute(
+        "SELECT version FROM cache_versions WHERE name=?", (name,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def bump_version(conn, name: str):
+    """
+    Naikkan versi dalam transaksi pemanggil (commit oleh pemanggil).
+    """
+    conn.execute("""
+        INSERT INTO cache_versions (name, version) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1
+    """, (name,))
+
+
+class VersionedCache:
+    def __init__(self, name: str, loader, check_seconds: float = CACHE_CHECK_SECONDS):
+        """
+        loader(conn, version) -> value, dipanggil dalam satu snapshot
+        bersama pembacaan versi.
+        """
+        self.name = name
+        self.loader = loader
+        self.check_seconds = check_seconds
+        self._value = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with connection() as conn:
+            conn.execute("BEGIN")
+            version = get_version(conn, self.name)
+            value = self.loader(conn, version)
+            conn.commit()
+        self._value, self._version = value, version
+
+    def get(self):
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < self.check_seconds:
+            return self._value
+
+        with self._lock:
+            if self._value is None:
+                self._load()
+            elif now - self._checked_at >= self.check_seconds:
+                with connection() as conn:
+                    version = get_version(conn, self.name)
+                if version != self._version:
+                    self._load()
+            self._checked_at = time.monotonic()
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._version = None
@@ -1,5 +1,12 @@
-from datetime import datetime, date, time
-from core.holiday import load_holidays
+from datetime import datetime, date, time, timedelta
+
+import numpy as np
+import pandas as pd
+
+from core.co_rules import DAY_TYPES, CompiledRules, get_active_rules
+from core.holiday import load_holidays, get_calendar
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
 
 
 def get_day_type(work_date: date, holidays: set) -> str:
@@ -14,7 +21,8 @@ def calc_hours(start_time: time, end_time: time) -> float:
     start = datetime.combine(date.today(), start_time)
     end = datetime.combine(date.today(), end_time)
     if end < start:
-        end = end.replace(day=end.day + 1)
+        # lewat tengah malam (aman untuk tanggal 31 / akhir bulan)
+        end += timedelta(days=1)
     return round((end - start).seconds / 3600, 2)
 
 
@@ -25,61 +33,98 @@ def calculate_co(
     start_time: time,
     end_time: time,
     travelling: bool = False,
-    standby: bool = False
+    standby: bool = False,
+    rules: CompiledRules | None = None
 ) -> tuple[float, str, float]:
+    """
+    CO satu hari berdasarkan aturan aktif (core.co_rules). Simpan
+    rules.version di klaim agar perhitungan bisa ditelusuri.
+    """
+    if rules is None:
+        rules = get_active_rules()
 
     holidays = load_holidays()
     day_type = get_day_type(work_date, holidays)
     hours = calc_hours(start_time, end_time)
 
-    co = 0.0
-
-    # =====================================================
-    # BASE WORK TYPE
-    # =====================================================
-    if work_type == "3-shift":
-        if day_type in ["weekend", "holiday"]:
-            co += 1.0
-
-    elif work_type == "2-shift":
-        if day_type == "weekday":
-            co += 0.5
-        else:
-            co += 1.5
-
-    elif work_type == "non-shift":
-        if day_type == "weekday":
-            if hours > 12:
-                co += 1.0
-        else:
-            if hours <= 12:
-                co += 1.0
-            else:
-                co += 2.0
-
-    elif work_type == "back-office":
-        if day_type == "weekday":
-            if hours > 12:
-                co += 1.0
-        else:
-            if hours <= 12:
-                co += 1.0
-            else:
-                co += 2.0
-
-    # =====================================================
-    # ADDITIONAL ACTIVITY
-    # =====================================================
-    if travelling and day_type in ["weekend", "holiday"]:
-        if work_type in ["2-shift", "3-shift"]:
-            if start_time < time(12, 0):
-                co += 1.0
-            else:
-                co += 0.5
-        else:
-            co += 0.5
-
-    if standby and day_type in ["weekend", "holiday"]:
-        co += 0.5
+    co = rules.evaluate(
+        work_type, day_type, hours, travelling, standby, start_time
+    )
 
     return round(co, 2), day_type, hours
+
+
+# =====================================================
+# BATCH (SEBULAN / BANYAK EMPLOYEE SEKALIGUS)
+# =====================================================
+def _to_seconds(values) -> np.ndarray:
+    """
+    datetime.time / "HH:MM[:SS]" -> detik sejak 00:00.
+    """
+    out = np.empty(len(values), dtype=np.int64)
+    for i, v in enumerate(values):
+        if isinstance(v, str):
+            v = time.fromisoformat(v)
+        out[i] = v.hour * 3600 + v.minute * 60 + v.second
+    return out
+
+
+def calculate_co_batch(
+    days: pd.DataFrame,
+    rules: CompiledRules | None = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Versi vektor dari calculate_co untuk banyak baris sekaligus.
+
+    days: kolom work_type, work_date, start_time, end_time, dan opsional
+    travelling / standby (default False). Baris boleh campuran employee
+    dan work type.
+
+    Return (co, day_type, hours) sebagai array, urut sama dengan days.
+    """
+    if rules is None:
+        rules = get_active_rules()
+
+    n = len(days)
+    if n == 0:
+        return np.zeros(0), np.array([], dtype=object), np.zeros(0)
+
+    calendar = get_calendar()
+
+    work_type = days["work_type"].to_numpy(dtype=object)
+    travelling = (
+        days["travelling"].to_numpy(dtype=bool)
+        if "travelling" in days else np.zeros(n, dtype=bool)
+    )
+    standby = (
+        days["standby"].to_numpy(dtype=bool)
+        if "standby" in days else np.zeros(n, dtype=bool)
+    )
+
+    # ================= DAY TYPE =================
+    ordinals = (
+        pd.to_datetime(days["work_date"]).to_numpy(dtype="datetime64[D]")
+        .astype(np.int64) + _EPOCH_ORDINAL
+    )
+    is_holiday = np.isin(ordinals, calendar.ordinals)
+    is_weekend = (ordinals - 1) % 7 >= 5
+    # index sesuai DAY_TYPES: weekday, weekend, holiday
+    day_type_idx = np.where(is_holiday, 2, np.where(is_weekend, 1, 0))
+    day_type = np.array(DAY_TYPES, dtype=object)[day_type_idx]
+
+    # ================= HOURS =================
+    start_sec = _to_seconds(days["start_time"].tolist())
+    end_sec = _to_seconds(days["end_time"].tolist())
+    hours = np.round(((end_sec - start_sec) % 86400) / 3600, 2)
+
+    # ================= RULE LOOKUP =================
+    co = rules.evaluate_batch(
+        work_type,
+        day_type_idx,
+        hours,
+        travelling,
+        standby,
+        start_sec < 12 * 3600
+    )
+
+    return np.round(co, 2), day_type, hours
@@ -0,0 +1,261 @@
+from datetime import time
+from itertools import product
+
+import numpy as np
+
+from core.cache import VersionedCache, bump_version
+
+# =========================
+# CHANGE OFF RULE ENGINE
+# =========================
+# Aturan CO disimpan di tabel co_rules (per versi, bisa diedit HR) dan
+# dikompilasi sekali menjadi tabel lookup numpy berdimensi
+# (work_type, day_type, hours_bucket, travel_slot, standby), sehingga
+# evaluasi per hari O(1) dan versi batch cukup satu fancy-indexing.
+#
+# Setiap baris aturan adalah satu komponen:
+#   base    -> selalu dihitung
+#   travel  -> hanya jika travelling
+#   standby -> hanya jika standby
+# Kolom pencocok boleh "*" (semua). Jika beberapa baris cocok untuk
+# komponen yang sama, yang paling spesifik (paling sedikit "*") dipakai.
+
+WILDCARD = "*"
+COMPONENTS = ("base", "travel", "standby")
+DAY_TYPES = ("weekday", "weekend", "holiday")
+HOURS_BUCKETS = ("le12", "gt12")
+TRAVEL_SLOTS = ("none", "before_noon", "after_noon")
+WORK_TYPES = ("non-shift", "2-shift", "3-shift", "back-office")
+
+RULE_COLUMNS = (
+    "component", "work_type", "day_type",
+    "hours_bucket", "travel_slot", "co_days"
+)
+
+# Kebijakan awal (sama dengan logika hardcoded sebelumnya).
+# Dipakai migration 5 untuk mengisi versi 1 — jangan diubah; kebijakan
+# baru dibuat HR sebagai versi baru.
+CO_RULES_V1 = (
+    # 3-shift: hanya hari off
+    ("base", "3-shift", "weekend", "*", "*", 1.0),
+    ("base", "3-shift", "holiday", "*", "*", 1.0),
+    # 2-shift
+    ("base", "2-shift", "weekday", "*", "*", 0.5),
+    ("base", "2-shift", "weekend", "*", "*", 1.5),
+    ("base", "2-shift", "holiday", "*", "*", 1.5),
+    # non-shift / back-office: tergantung jam kerja
+    ("base", "non-shift", "weekday", "gt12", "*", 1.0),
+    ("base", "non-shift", "weekend", "le12", "*", 1.0),
+    ("base", "non-shift", "weekend", "gt12", "*", 2.0),
+    ("base", "non-shift", "holiday", "le12", "*", 1.0),
+    ("base", "non-shift", "holiday", "gt12", "*", 2.0),
+    ("base", "back-office", "weekday", "gt12", "*", 1.0),
+    ("base", "back-office", "weekend", "le12", "*", 1.0),
+    ("base", "back-office", "weekend", "gt12", "*", 2.0),
+    ("base", "back-office", "holiday", "le12", "*", 1.0),
+    ("base", "back-office", "holiday", "gt12", "*", 2.0),
+    # travelling di hari off
+    ("travel", "*", "weekend", "*", "*", 0.5),
+    ("travel", "*", "holiday", "*", "*", 0.5),
+    ("travel", "2-shift", "weekend", "*", "before_noon", 1.0),
+    ("travel", "2-shift", "holiday", "*", "before_noon", 1.0),
+    ("travel", "3-shift", "weekend", "*", "before_noon", 1.0),
+    ("travel", "3-shift", "holiday", "*", "before_noon", 1.0),
+    # standby (luar kota) di hari off
+    ("standby", "*", "weekend", "*", "*", 0.5),
+    ("standby", "*", "holiday", "*", "*", 0.5),
+)
+
+
+def hours_bucket(hours: float) -> str:
+    return "gt12" if hours > 12 else "le12"
+
+
+def travel_slot(travelling: bool, start_time: time) -> str:
+    if not travelling:
+        return "none"
+    return "before_noon" if start_time < time(12, 0) else "after_noon"
+
+
+def validate_rule(rule) -> str | None:
+    """
+    Return pesan error, atau None jika baris aturan valid.
+    """
+    component, work_type, day_type, bucket, slot, co_days = rule
+
+    if component not in COMPONENTS:
+        return f"component harus salah satu dari {', '.join(COMPONENTS)}"
+    if not work_type:
+        return "work_type wajib diisi (pakai * untuk semua)"
+    if day_type not in DAY_TYPES + (WILDCARD,):
+        return f"day_type tidak dikenal: {day_type}"
+    if bucket not in HOURS_BUCKETS + (WILDCARD,):
+        return f"hours_bucket tidak dikenal: {bucket}"
+    if slot not in TRAVEL_SLOTS[1:] + (WILDCARD,):
+        return f"travel_slot tidak dikenal: {slot}"
+    try:
+        if float(co_days) < 0:
+            return "co_days tidak boleh negatif"
+    except (TypeError, ValueError):
+        return "co_days harus angka"
+    return None
+
+
+def _best_match(rules, key):
+    best, best_score = None, -1
+    for rule in rules:
+        fields = rule[1:5]
+        if all(f == WILDCARD or f == k for f, k in zip(fields, key)):
+            score = sum(f != WILDCARD for f in fields)
+            if score > best_score:
+                best, best_score = rule, score
+    return float(best[5]) if best else 0.0
+
+
+class CompiledRules:
+    def __init__(self, version: int, rules):
+        self.version = version
+        self.rules = [tuple(r) for r in rules]
+
+        # work type di luar daftar hanya kena aturan "*" (index terakhir)
+        named = {r[1] for r in self.rules if r[1] != WILDCARD}
+        self.work_types = tuple(sorted(named | set(WORK_TYPES)))
+        self.work_type_index = {wt: i for i, wt in enumerate(self.work_types)}
+        other = len(self.work_types)
+
+        by_component = {
+            c: [r for r in self.rules if r[0] == c] for c in COMPONENTS
+        }
+
+        self.table = np.zeros(
+            (other + 1, len(DAY_TYPES), len(HOURS_BUCKETS), len(TRAVEL_SLOTS), 2)
+        )
+        for (wi, wt), (di, dt), (hi, hb), (ti, ts) in product(
+            enumerate(self.work_types + ("\0other",)),
+            enumerate(DAY_TYPES),
+            enumerate(HOURS_BUCKETS),
+            enumerate(TRAVEL_SLOTS),
+        ):
+            key = (wt, dt, hb, ts)
+            base = _best_match(by_component["base"], key)
+            travel = (
+                _best_match(by_component["travel"], key) if ts != "none" else 0.0
+            )
+            standby = _best_match(by_component["standby"], key)
+
+            self.table[wi, di, hi, ti, 0] = round(base + travel, 2)
+            self.table[wi, di, hi, ti, 1] = round(base + travel + standby, 2)
+
+    def evaluate(
+        self,
+        work_type: str,
+        day_type: str,
+        hours: float,
+        travelling: bool,
+        standby: bool,
+        start_time: time
+    ) -> float:
+        return float(self.table[
+            self.work_type_index.get(work_type, len(self.work_types)),
+            DAY_TYPES.index(day_type),
+            HOURS_BUCKETS.index(hours_bucket(hours)),
+            TRAVEL_SLOTS.index(travel_slot(travelling, start_time)),
+            int(bool(standby)),
+        ])
+
+    def evaluate_batch(
+        self,
+        work_type: np.ndarray,
+        day_type_idx: np.ndarray,
+        hours: np.ndarray,
+        travelling: np.ndarray,
+        standby: np.ndarray,
+        before_noon: np.ndarray
+    ) -> np.ndarray:
+        other = len(self.work_types)
+        wt_idx = np.fromiter(
+            (self.work_type_index.get(w, other) for w in work_type),
+            dtype=np.int64, count=len(work_type)
+        )
+        slot_idx = np.where(travelling, np.where(before_noon, 1, 2), 0)
+        return self.table[
+            wt_idx,
+            day_type_idx,
+            (hours > 12).astype(np.int64),
+            slot_idx,
+            standby.astype(np.int64),
+        ]
+
+
+# =========================
+# LOAD / SAVE
+# =========================
+def _load_active_rules(conn, _cache_version) -> CompiledRules:
+    row = conn.execute("""
+        SELECT MAX(version) FROM co_rule_versions WHERE is_active=1
+    """).fetchone()
+    version = row[0] or 0
+
+    rules = conn.execute(f"""
+        SELECT {", ".join(RULE_COLUMNS)}
+        FROM co_rules WHERE version=?
+        ORDER BY id
+    """, (version,)).fetchall()
+
+    return CompiledRules(version, rules)
+
+
+_active = VersionedCache("co_rules", _load_active_rules)
+
+
+def get_active_rules() -> CompiledRules:
+    return _active.get()
+
+
+def invalidate_rules():
+    _active.invalidate()
+
+
+def get_rules(conn, version: int) -> list[tuple]:
+    return conn.execute(f"""
+        SELECT {", ".join(RULE_COLUMNS)}
+        FROM co_rules WHERE version=?
+        ORDER BY id
+    """, (version,)).fetchall()
+
+
+def save_rule_version(conn, rules, note: str, created_by: int | None) -> int:
+    """
+    Simpan aturan sebagai versi baru dan jadikan aktif. Klaim lama tetap
+    menyimpan rule_version yang dipakai saat dihitung.
+    """
+    rules = [tuple(r) for r in rules]
+    for i, rule in enumerate(rules, start=1):
+        error = validate_rule(rule)
+        if error:
+            raise ValueError(f"Baris {i}: {error}")
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute(
+            "SELECT COALESCE(MAX(version), 0) + 1 FROM co_rule_versions"
+        ).fetchone()[0]
+
+        conn.execute("UPDATE co_rule_versions SET is_active=0")
+        conn.execute("""
+            INSERT INTO co_rule_versions (version, note, created_by, is_active)
+            VALUES (?, ?, ?, 1)
+        """, (version, note, created_by))
+        conn.executemany(f"""
+            INSERT INTO co_rules (version, {", ".join(RULE_COLUMNS)})
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(version, *r) for r in rules])
+
+        bump_version(conn, "co_rules")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    invalidate_rules()
+    return version
@@ -1,140 +1,262 @@
 import sqlite3
 import os
+import queue
+import threading
+import atexit
+import time
+from contextlib import contextmanager
+
+from core import query_log
+from core.metrics import CONN_ACQUIRE_SECONDS
 
 # =========================
 # ABSOLUTE PROJECT ROOT
 # =========================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
-DB_PATH = os.path.join(DATA_DIR, "hr.db")
+DB_PATH = os.getenv("HR_DB_PATH", os.path.join(DATA_DIR, "hr.db"))
+
+# =========================
+# CONNECTION TUNING
+# =========================
+POOL_SIZE = int(os.getenv("HR_DB_POOL_SIZE", 8))
+BUSY_TIMEOUT_MS = int(os.getenv("HR_DB_BUSY_TIMEOUT_MS", 5000))
+CACHE_SIZE_KIB = int(os.getenv("HR_DB_CACHE_SIZE_KIB", 16384))
+MMAP_SIZE = int(os.getenv("HR_DB_MMAP_SIZE", 128 * 1024 * 1024))
+
+# Per-connection pragma; cukup sekali per koneksi karena koneksi di-reuse
+CONNECTION_PRAGMAS = (
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA cache_size=-{CACHE_SIZE_KIB}",
+    f"PRAGMA mmap_size={MMAP_SIZE}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Koneksi ter-instrumentasi (timing per query + slow_query_log).
+# Default mati: overhead kecil tapi ada di setiap execute/fetch.
+# HR_DB_PROFILE=1 -> semua koneksi. Selain itu diputuskan per acquire:
+# thread yang sedang diprofil render profiler (HR_RENDER_PROFILE atau
+# ?profile=1) mendapat koneksi ter-instrumentasi.
+PROFILE_QUERIES = os.getenv("HR_DB_PROFILE", "0") == "1"
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3.Connection yang close()-nya mengembalikan koneksi ke pool.
+    Koneksi yang tidak di-close tetap ditutup oleh garbage collector,
+    karena pool tidak menyimpan referensi ke koneksi yang sedang dipakai.
+    """
+
+    _pool = None
+    _checked_out = False
+
+    def close(self):
+        if self._pool is None:
+            super().close()
+            return
+        self._pool.release(self)
+
+    def _close(self):
+        super().close()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor yang mengukur execute + fetch. Waktu fetch ikut dihitung karena
+    SQLite baru mengerjakan sebagian besar SELECT saat baris diambil.
+    """
+
+    _sql = None
+    _elapsed = 0.0
+    _logged = False
+
+    def _track(self, started, call):
+        seconds = time.perf_counter() - started
+        self._elapsed += seconds
+        query_log.record(self._sql, seconds, self._elapsed, call=call)
+        if not self._logged and self._elapsed * 1000 >= query_log.SLOW_QUERY_MS:
+            self._logged = True
+            query_log.record_slow(self._sql, self._elapsed)
+
+    def execute(self, sql, parameters=()):
+        self._sql, self._elapsed, self._logged = sql, 0.0, False
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._track(started, call=True)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._sql, self._elapsed, self._logged = sql, 0.0, False
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._track(started, call=True)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            if self._sql:
+                self._track(started, call=False)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            if self._sql:
+                self._track(started, call=False)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            if self._sql:
+                self._track(started, call=False)
+
+
+class InstrumentedConnection(PooledConnection):
+    # Connection.execute bawaan tidak lewat cursor(), jadi di-override juga
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """
+    Pool koneksi idle (LIFO). Tidak membatasi koneksi yang sedang dipakai:
+    pool kosong -> acquire() langsung membuka koneksi baru, tidak menunggu.
+    size hanya membatasi koneksi idle yang disimpan; sisanya ditutup.
+    """
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        # koneksi biasa dan ter-instrumentasi di antrian terpisah
+        self._idle = {
+            False: queue.LifoQueue(maxsize=size),
+            True: queue.LifoQueue(maxsize=size),
+        }
+        self._wal_lock = threading.Lock()
+        self._wal_ready = False
+
+    def _connect(self, instrumented: bool) -> PooledConnection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            factory=InstrumentedConnection if instrumented else PooledConnection
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+
+        # journal_mode=WAL tersimpan di file DB, cukup sekali per proses
+        if not self._wal_ready:
+            with self._wal_lock:
+                if not self._wal_ready:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    self._wal_ready = True
+
+        conn._pool = self
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        started = time.perf_counter()
+        instrumented = PROFILE_QUERIES or query_log.thread_profiling()
+        try:
+            conn = self._idle[instrumented].get_nowait()
+            source = "pool"
+        except queue.Empty:
+            conn = self._connect(instrumented)
+            source = "new"
+        conn._checked_out = True
+        CONN_ACQUIRE_SECONDS.observe(time.perf_counter() - started, source=source)
+        return conn
+
+    def release(self, conn: PooledConnection):
+        # close() dua kali tidak boleh memasukkan koneksi yang sama dua kali
+        if not conn._checked_out:
+            return
+        conn._checked_out = False
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+            self._idle[isinstance(conn, InstrumentedConnection)].put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn._close()
+
+    def close_all(self):
+        for idle in self._idle.values():
+            while True:
+                try:
+                    idle.get_nowait()._close()
+                except queue.Empty:
+                    break
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None or _pool.path != DB_PATH:
+        with _pool_lock:
+            if _pool is None or _pool.path != DB_PATH:
+                if _pool is not None:
+                    _pool.close_all()
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+@atexit.register
+def _close_pool():
+    if _pool is not None:
+        _pool.close_all()
+
 
 # =========================
 # CONNECTION
 # =========================
 def get_conn():
-    os.makedirs(DATA_DIR, exist_ok=True)
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    """
+    Ambil koneksi dari pool. conn.close() mengembalikan koneksi ke pool
+    (transaksi yang belum di-commit akan di-rollback).
+    """
+    return get_pool().acquire()
+
+
+@contextmanager
+def connection():
+    """
+    Handle koneksi yang selalu kembali ke pool, termasuk saat
+    st.stop() / st.rerun() / exception di tengah blok.
+    """
+    conn = get_conn()
+    try:
+        yield conn
+    finally:
+        conn.close()
 
 # =========================
 # INIT DATABASE
 # =========================
 def init_db():
-    conn = get_conn()
-    c = conn.cursor()
-
-    # =========================
-    # USERS
-    # =========================
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nik TEXT UNIQUE NOT NULL,
-        name TEXT NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        role TEXT NOT NULL,
-        division TEXT NOT NULL DEFAULT 'Back Office',
-        join_date DATE,
-        probation_date DATE,
-        permanent_date DATE,
-        password_hash TEXT NOT NULL,
-        manager_id INTEGER,
-        FOREIGN KEY (manager_id) REFERENCES users(id)
-    )
-    """)
-
-    # =========================
-    # LEAVE BALANCE
-    # =========================
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS leave_balance (
-        user_id INTEGER PRIMARY KEY,
-        last_year INTEGER DEFAULT 0,
-        current_year INTEGER DEFAULT 0,
-        change_off REAL DEFAULT 0,
-        sick_no_doc INTEGER DEFAULT 0,
-        updated_at DATE,
-        FOREIGN KEY (user_id) REFERENCES users(id)
-    )
-    """)
-
-    # =========================
-    # LEAVE REQUESTS
-    # =========================
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS leave_requests (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        leave_type TEXT NOT NULL,
-        start_date DATE NOT NULL,
-        end_date DATE NOT NULL,
-        total_days INTEGER NOT NULL,
-        reason TEXT,
-        status TEXT DEFAULT 'submitted',
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        approved_by INTEGER,
-        approved_at DATETIME,
-        FOREIGN KEY (user_id) REFERENCES users(id),
-        FOREIGN KEY (approved_by) REFERENCES users(id)
-    )
-    """)
-
-    # =========================
-    # HOLIDAYS
-    # =========================
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS holidays (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        holiday_date DATE UNIQUE,
-        description TEXT
-    )
-    """)
-
-    # =========================
-    # CHANGE OFF CLAIMS
-    # =========================
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS change_off_claims (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        category TEXT,
-        start_date DATE,
-        end_date DATE,
-        location TEXT,
-        daily_hours REAL,
-        attachment TEXT,
-        status TEXT DEFAULT 'submitted',
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        approved_by INTEGER,
-        approved_at DATETIME,
-        FOREIGN KEY (user_id) REFERENCES users(id),
-        FOREIGN KEY (approved_by) REFERENCES users(id)
-    )
-    """)
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS auth_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        email TEXT,
-        role TEXT,
-        action TEXT,              -- login | logout | failed_login
-        ip_address TEXT,
-        user_agent TEXT,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-   )
-   """)
-
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS accrual_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        year INTEGER NOT NULL,
-        month INTEGER NOT NULL,
-        accrual_days INTEGER NOT NULL,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE(user_id, year, month),
-        FOREIGN KEY (user_id) REFERENCES users(id)
-   )
-   """)
-
-    conn.commit()
-    conn.close()
+    """
+    Dipertahankan untuk script lama; schema sekarang dikelola
+    core.migrations.
+    """
+    from core.migrations import migrate
+    migrate()
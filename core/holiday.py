@@ -1,9 +1,93 @@
-from datetime import date, timedelta
-from core.db import get_conn
+import os
+from bisect import bisect_left, bisect_right
+from datetime import date
 
+import numpy as np
 
-def load_holidays():
-    conn = get_conn()
+from core.cache import VersionedCache
+
+# =========================
+# HOLIDAY CALENDAR CACHE
+# =========================
+# Kalender libur di-cache per proses (lihat core.cache). Versi
+# 'holidays' di cache_versions dinaikkan trigger di tabel holidays.
+HOLIDAY_CACHE_CHECK_SECONDS = float(os.getenv("HR_HOLIDAY_CACHE_CHECK_SECONDS", 60))
+
+
+# date.toordinal() dari 1970-01-01 (epoch datetime64)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _weekdays_upto(n):
+    """
+    Jumlah hari Senin–Jumat di ordinal 1..n (ordinal 1 = Senin).
+    Bisa dipakai untuk int maupun numpy array.
+    """
+    return (n // 7) * 5 + np.minimum(n % 7, 5)
+
+
+def _to_ordinals(values) -> np.ndarray:
+    if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+        return values.astype("datetime64[D]").astype(np.int64) + _EPOCH_ORDINAL
+
+    flat = np.asarray(values, dtype=object).ravel()
+    if flat.size and isinstance(flat[0], date):
+        # konversi date -> datetime64 lewat numpy jauh lebih lambat
+        return np.fromiter(
+            (d.toordinal() for d in flat), dtype=np.int64, count=flat.size
+        ).reshape(np.shape(values))
+
+    arr = np.asarray(values, dtype="datetime64[D]")
+    return arr.astype(np.int64) + _EPOCH_ORDINAL
+
+
+class HolidayCalendar:
+    def __init__(self, dates, version: int):
+        self.version = version
+        self.dates = frozenset(dates)
+        # ordinal terurut, dipakai untuk pencarian rentang (bisect)
+        self.ordinals = sorted(d.toordinal() for d in self.dates)
+        # libur yang jatuh di akhir pekan tidak mengurangi hari kerja
+        self.weekday_ordinals = [
+            o for o in self.ordinals if (o - 1) % 7 < 5
+        ]
+        self._weekday_array = np.array(self.weekday_ordinals, dtype=np.int64)
+
+    def is_holiday(self, d: date) -> bool:
+        return d in self.dates
+
+    def count_working_days(self, start: date, end: date) -> int:
+        """
+        Hari kerja (Senin–Jumat, bukan libur) di [start, end], O(log n).
+        """
+        a, b = start.toordinal(), end.toordinal()
+        if b < a:
+            return 0
+
+        weekdays = int(_weekdays_upto(b) - _weekdays_upto(a - 1))
+        holidays = (
+            bisect_right(self.weekday_ordinals, b)
+            - bisect_left(self.weekday_ordinals, a)
+        )
+        return weekdays - holidays
+
+    def count_working_days_many(self, ranges) -> np.ndarray:
+        """
+        Versi batch: ranges = [(start, end), ...] (date / ISO string /
+        datetime64). Return array jumlah hari kerja per rentang.
+        """
+        ords = _to_ordinals(ranges).reshape(-1, 2)
+        a, b = ords[:, 0], ords[:, 1]
+
+        weekdays = _weekdays_upto(b) - _weekdays_upto(a - 1)
+        holidays = (
+            np.searchsorted(self._weekday_array, b, side="right")
+            - np.searchsorted(self._weekday_array, a, side="left")
+        )
+        return np.where(b < a, 0, weekdays - holidays)
+
+
+def _load_calendar(conn, version) -> HolidayCalendar:
     rows = conn.execute("""
         SELECT holiday_date FROM holidays
     """).fetchall()
@@ -15,7 +99,51 @@ def load_holidays():
         except:
             pass
 
-    return holidays
+    return HolidayCalendar(holidays, version)
+
+
+_calendar = VersionedCache(
+    "holidays", _load_calendar, check_seconds=HOLIDAY_CACHE_CHECK_SECONDS
+)
+
+
+def get_calendar() -> HolidayCalendar:
+    return _calendar.get()
+
+
+def invalidate_holidays():
+    _calendar.invalidate()
+
+
+def load_holidays() -> frozenset:
+    return get_calendar().dates
+
+
+# =========================
+# WRITE-THROUGH (HR Holiday Calendar)
+# =========================
+def add_holiday(conn, holiday_date: date, description: str):
+    conn.execute("""
+        INSERT OR IGNORE INTO holidays (holiday_date, description)
+        VALUES (?,?)
+    """, (holiday_date.isoformat(), description))
+    conn.commit()
+    invalidate_holidays()
+
+
+def update_holiday(conn, holiday_id: int, description: str):
+    conn.execute(
+        "UPDATE holidays SET description=? WHERE id=?",
+        (description, holiday_id)
+    )
+    conn.commit()
+    invalidate_holidays()
+
+
+def delete_holiday(conn, holiday_id: int):
+    conn.execute("DELETE FROM holidays WHERE id=?", (holiday_id,))
+    conn.commit()
+    invalidate_holidays()
 
 
 def is_workday(d: date, holidays: set) -> bool:
@@ -35,11 +163,8 @@ def get_day_category(d: date) -> str:
     return "workday"
 
 def calculate_working_days(start: date, end: date) -> int:
-    holidays = load_holidays()
-    days = 0
-    d = start
-    while d <= end:
-        if is_workday(d, holidays):
-            days += 1
-        d += timedelta(days=1)
-    return days
+    return get_calendar().count_working_days(start, end)
+
+
+def calculate_working_days_many(ranges) -> np.ndarray:
+    return get_calendar().count_working_days_many(ranges)
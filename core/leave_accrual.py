@@ -1,48 +1,62 @@
 from datetime import date
-from core.db import get_conn
+from core import queries
+from core.db import connection
 
-def run_monthly_accrual(today: date | None = None):
+
+def _month_index(d: date) -> int:
+    return d.year * 12 + d.month - 1
+
+
+def _cycle_start(d: date) -> date:
+    # Siklus cuti 1 Juli – 30 Juni
+    return date(d.year if d.month >= 7 else d.year - 1, 7, 1)
+
+
+def run_monthly_accrual(today: date | None = None, backfill: bool = False) -> int:
+    """
+    Accrual +1 current_year per employee permanent per bulan, set-based:
+    satu INSERT ... SELECT (anti-join ke accrual_logs) + satu UPDATE
+    leave_balance, berapa pun jumlah employee.
+
+    backfill=True juga mengisi setiap bulan yang belum ter-accrual sejak
+    permanent_date, dibatasi awal siklus cuti berjalan (bulan sebelum
+    reset 30 Juni sudah tidak masuk current_year).
+
+    Return jumlah baris accrual baru.
+    """
     if not today:
         today = date.today()
 
-    year = today.year
-    month = today.month
-
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Ambil employee yang sudah permanent
-    users = cur.execute("""
-        SELECT id
-        FROM users
-        WHERE role = 'employee'
-        AND permanent_date IS NOT NULL
-        AND date(permanent_date) <= date(?)
-    """, (today.isoformat(),)).fetchall()
-
-    for (user_id,) in users:
-        # Cek apakah sudah accrual bulan ini
-        exists = cur.execute("""
-            SELECT 1 FROM accrual_logs
-            WHERE user_id=? AND year=? AND month=?
-        """, (user_id, year, month)).fetchone()
-
-        if exists:
-            continue  # aman, skip
-
-        # Tambah +1 ke current_year
-        cur.execute("""
-            UPDATE leave_balance
-            SET current_year = current_year + 1,
-                updated_at = DATE('now')
-            WHERE user_id=?
-        """, (user_id,))
-
-        # Log accrual
-        cur.execute("""
-            INSERT INTO accrual_logs (user_id, year, month, accrual_days)
-            VALUES (?, ?, ?, 1)
-        """, (user_id, year, month))
-
-    conn.commit()
-    conn.close()
+    target = _month_index(today)
+    floor = _month_index(_cycle_start(today)) if backfill else target
+
+    with connection() as conn:
+        # Kunci tulis dari awal: watermark id harus konsisten dengan INSERT
+        conn.execute("BEGIN IMMEDIATE")
+
+        watermark = conn.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM accrual_logs"
+        ).fetchone()[0]
+
+        inserted = conn.execute(queries.ACCRUAL_INSERT, {
+            "floor": floor,
+            "target": target,
+            "today": today.isoformat(),
+        }).rowcount
+
+        if inserted:
+            conn.execute("""
+                UPDATE leave_balance
+                SET current_year = current_year + (
+                        SELECT SUM(a.accrual_days) FROM accrual_logs a
+                        WHERE a.user_id = leave_balance.user_id AND a.id > :w
+                    ),
+                    updated_at = DATE('now')
+                WHERE user_id IN (
+                    SELECT user_id FROM accrual_logs WHERE id > :w
+                )
+            """, {"w": watermark})
+
+        conn.commit()
+
+    return inserted
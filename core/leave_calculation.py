@@ -1,5 +1,5 @@
-from datetime import date, timedelta
-from core.db import get_conn
+from datetime import date
+from core.holiday import load_holidays, calculate_working_days
 
 
 def get_holiday_dates():
@@ -7,13 +7,7 @@ def get_holiday_dates():
     Ambil semua tanggal libur dari database.
     Return dalam bentuk set of string: {'2025-12-25', ...}
     """
-    conn = get_conn()
-    rows = conn.execute(
-        "SELECT holiday_date FROM holidays"
-    ).fetchall()
-    conn.close()
-
-    return set(row[0] for row in rows)
+    return {d.isoformat() for d in load_holidays()}
 
 
 def calculate_leave_days(start_date: date, end_date: date) -> int:
@@ -22,18 +16,4 @@ def calculate_leave_days(start_date: date, end_date: date) -> int:
     - Senin–Jumat
     - BUKAN hari libur
     """
-    holidays = get_holiday_dates()
-
-    total_days = 0
-    current = start_date
-
-    while current <= end_date:
-        is_weekday = current.weekday() < 5      # Senin–Jumat
-        is_holiday = current.isoformat() in holidays
-
-        if is_weekday and not is_holiday:
-            total_days += 1
-
-        current += timedelta(days=1)
-
-    return total_days
+    return calculate_working_days(start_date, end_date)
@@ -1,13 +1,159 @@
-from datetime import date
+import time
+from datetime import date, timedelta
+from core.db import connection
+from core.metrics import ENGINE_RUN_SECONDS, gauge
 from core.leave_accrual import run_monthly_accrual
 from core.leave_reset import run_june_30_reset
 
-def run_leave_engine(today: date | None = None):
+# executed_by untuk job otomatis (ditampilkan "SYSTEM" di HR System Status)
+SYSTEM_USER = 0
+
+JOB_ACCRUAL = "monthly_accrual"
+JOB_RESET = "june_30_reset"
+
+# Urutan job di tanggal yang sama: accrual Juni dulu, baru reset 30 Juni
+_JOB_ORDER = {JOB_ACCRUAL: 0, JOB_RESET: 1}
+
+
+def _month_end(d: date) -> date:
+    next_month = (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def due_jobs(
+    today: date,
+    last_run: date | None,
+    done_resets: set[int] = frozenset()
+) -> list[tuple[date, str]]:
+    """
+    Job yang harus jalan sejak last_run s/d today, urut kronologis.
+    Tanpa riwayat, hanya job untuk hari ini yang dijalankan supaya
+    deploy pertama tidak memicu reset tahun-tahun sebelumnya.
+    """
+    if last_run is None or last_run > today:
+        jobs = [(today, JOB_ACCRUAL)]
+        if today.month == 6 and today.day == 30 and today.year not in done_resets:
+            jobs.append((today, JOB_RESET))
+        return jobs
+
+    jobs = []
+
+    # Accrual: setiap bulan sejak last_run, dihitung per akhir bulan
+    month = last_run.replace(day=1)
+    while month <= today:
+        jobs.append((min(_month_end(month), today), JOB_ACCRUAL))
+        month = _month_end(month) + timedelta(days=1)
+
+    # Reset: setiap 30 Juni yang terlewat (termasuk yang gagal di last_run)
+    for year in range(last_run.year, today.year + 1):
+        reset_date = date(year, 6, 30)
+        if last_run <= reset_date <= today and year not in done_resets:
+            jobs.append((reset_date, JOB_RESET))
+
+    return sorted(jobs, key=lambda j: (j[0], _JOB_ORDER[j[1]]))
+
+
+def _record_run(job, period, run_date, status, message, duration_ms):
+    with connection() as conn:
+        conn.execute("""
+            INSERT INTO engine_runs
+            (job, period, run_date, status, message, duration_ms)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (job, period, run_date.isoformat(), status, message, duration_ms))
+        conn.commit()
+
+
+def _run_job(job: str, run_date: date) -> dict:
+    started = time.perf_counter()
+
+    try:
+        if job == JOB_ACCRUAL:
+            period = f"{run_date.year}-{run_date.month:02d}"
+            accrued = run_monthly_accrual(run_date)
+            status, message = "ok", f"{accrued} employee accrued"
+        else:
+            period = str(run_date.year)
+            ok, message = run_june_30_reset(run_date, executed_by=SYSTEM_USER)
+            status = "ok" if ok else "skipped"
+    except Exception as e:
+        status, message = "failed", str(e)
+
+    duration_ms = round((time.perf_counter() - started) * 1000, 2)
+    _record_run(job, period, run_date, status, message, duration_ms)
+    ENGINE_RUN_SECONDS.observe(duration_ms / 1000, job=job, status=status)
+
+    return {
+        "job": job,
+        "period": period,
+        "run_date": run_date,
+        "status": status,
+        "message": message,
+        "duration_ms": duration_ms,
+    }
+
+
+def run_leave_engine(today: date | None = None) -> list[dict]:
+    """
+    Jalankan accrual bulanan + reset 30 Juni, termasuk periode yang
+    terlewat sejak run terakhir. Dipanggil oleh scripts/run_scheduler.py,
+    bukan dari render halaman.
+    """
     if not today:
         today = date.today()
 
-    # 1️⃣ Monthly accrual (+1 setiap tanggal 1)
-    run_monthly_accrual(today)
+    with connection() as conn:
+        last = conn.execute("""
+            SELECT MAX(run_date) FROM engine_runs WHERE status != 'failed'
+        """).fetchone()[0]
+        done_resets = {
+            r[0] for r in conn.execute("SELECT year FROM leave_reset_logs")
+        }
+
+    last_run = date.fromisoformat(last) if last else None
+
+    results = []
+    for run_date, job in due_jobs(today, last_run, done_resets):
+        result = _run_job(job, run_date)
+        results.append(result)
+
+        # Job berikutnya bergantung pada yang ini; ulangi di tick berikutnya
+        if result["status"] == "failed":
+            break
+
+    return results
+
+
+# =========================
+# METRICS (DARI engine_runs)
+# =========================
+# Job jalan di proses scheduler; proses yang mengekspos /metrics membaca
+# ringkasannya dari tabel engine_runs saat scrape.
+ENGINE_RUNS = gauge(
+    "hr_engine_runs", "Jumlah run leave engine tercatat", ("job", "status")
+)
+ENGINE_RUN_DURATION_SUM = gauge(
+    "hr_engine_run_duration_seconds_total",
+    "Total durasi run leave engine tercatat", ("job", "status")
+)
+ENGINE_LAST_RUN_SECONDS = gauge(
+    "hr_engine_last_run_duration_seconds", "Durasi run terakhir per job", ("job",)
+)
+
+
+def collect_engine_metrics():
+    with connection() as conn:
+        totals = conn.execute("""
+            SELECT job, status, COUNT(*), COALESCE(SUM(duration_ms), 0)
+            FROM engine_runs GROUP BY job, status
+        """).fetchall()
+        last = conn.execute("""
+            SELECT job, duration_ms FROM engine_runs
+            WHERE id IN (SELECT MAX(id) FROM engine_runs GROUP BY job)
+        """).fetchall()
+
+    for job, status, count, total_ms in totals:
+        ENGINE_RUNS.set(count, job=job, status=status)
+        ENGINE_RUN_DURATION_SUM.set(total_ms / 1000, job=job, status=status)
+    for job, duration_ms in last:
+        ENGINE_LAST_RUN_SECONDS.set((duration_ms or 0) / 1000, job=job)
 
-    # 2️⃣ Annual reset (30 Juni)
-    run_june_30_reset(today)
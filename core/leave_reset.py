@@ -1,5 +1,5 @@
 from datetime import date
-from core.db import get_conn
+from core.db import connection
 
 def run_june_30_reset(today: date | None = None, executed_by: int | None = None):
     if not today:
@@ -11,33 +11,31 @@ def run_june_30_reset(today: date | None = None, executed_by: int | None = None)
 
     year = today.year
 
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Cegah double reset di tahun yang sama
-    already = cur.execute("""
-        SELECT 1 FROM leave_reset_logs WHERE year=?
-    """, (year,)).fetchone()
-
-    if already:
-        conn.close()
-        return False, "June 30 reset already executed"
-
-    # RESET LOGIC (FINAL)
-    cur.execute("""
-        UPDATE leave_balance
-        SET last_year = current_year,
-            current_year = 0,
-            updated_at = DATE('now')
-    """)
-
-    # LOG RESET
-    cur.execute("""
-        INSERT INTO leave_reset_logs (year, executed_by)
-        VALUES (?, ?)
-    """, (year, executed_by))
-
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+
+        # Cegah double reset di tahun yang sama
+        already = cur.execute("""
+            SELECT 1 FROM leave_reset_logs WHERE year=?
+        """, (year,)).fetchone()
+
+        if already:
+            return False, "June 30 reset already executed"
+
+        # RESET LOGIC (FINAL)
+        cur.execute("""
+            UPDATE leave_balance
+            SET last_year = current_year,
+                current_year = 0,
+                updated_at = DATE('now')
+        """)
+
+        # LOG RESET
+        cur.execute("""
+            INSERT INTO leave_reset_logs (year, executed_by)
+            VALUES (?, ?)
+        """, (year, executed_by))
+
+        conn.commit()
 
     return True, "June 30 leave reset completed"
@@ -0,0 +1,289 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# =========================
+# METRICS (PROMETHEUS TEXT, TANPA DEPENDENCY)
+# =========================
+# Registry per proses. Backend mengekspos /metrics; HR System Status
+# mem-parse teks yang sama (summarize) supaya angkanya identik.
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels_text(self.labelnames, key)} {_fmt(value)}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key -> [bucket_counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        with self._lock:
+            items = sorted(
+                (k, (list(s[0]), s[1], s[2])) for k, s in self._series.items()
+            )
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = _labels_text(self.labelnames, key, [("le", _fmt(bound))])
+                yield f"{self.name}_bucket{le} {cumulative}"
+            le = _labels_text(self.labelnames, key, [("le", "+Inf")])
+            yield f"{self.name}_bucket{le} {count}"
+            labels = _labels_text(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_fmt(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def register_collector(self, fn):
+        """
+        fn() dipanggil setiap render, untuk metric yang dihitung saat
+        scrape (mis. dari tabel DB). fn mengisi gauge/counter sendiri.
+        """
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"⚠️ metrics collector gagal: {e}")
+
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.type}")
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+# =========================
+# METRIC BERSAMA
+# =========================
+QUERY_SECONDS = histogram(
+    "hr_db_query_seconds", "Waktu query SQLite per nama query", ("query",)
+)
+# Pool SQLite tidak pernah menunggu koneksi bebas (pool kosong -> buka
+# koneksi baru), jadi ini latensi ambil/connect, bukan waktu antre.
+CONN_ACQUIRE_SECONDS = histogram(
+    "hr_db_conn_acquire_seconds",
+    "Latensi ambil koneksi SQLite: pool = reuse koneksi idle, "
+    "new = connect + pragma",
+    ("source",),
+)
+EMAIL_SEND_SECONDS = histogram(
+    "hr_email_send_seconds", "Latensi kirim email SMTP", ("status",)
+)
+ENGINE_RUN_SECONDS = histogram(
+    "hr_engine_run_seconds", "Durasi job leave engine", ("job", "status"),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300),
+)
+
+
+def timed_query(name: str):
+    """
+    with timed_query("manager_team"): conn.execute(...)
+    """
+    return QUERY_SECONDS.time(query=name)
+
+
+# =========================
+# PARSE (UNTUK HR SYSTEM STATUS)
+# =========================
+def _parse_labels(text: str) -> dict:
+    labels, i = {}, 0
+    while i < len(text):
+        eq = text.index("=", i)
+        name = text[i:eq].strip().lstrip(",").strip()
+        j = eq + 2
+        value = []
+        while text[j] != '"':
+            if text[j] == "\\":
+                j += 1
+                value.append({"n": "\n"}.get(text[j], text[j]))
+            else:
+                value.append(text[j])
+            j += 1
+        labels[name] = "".join(value)
+        i = j + 1
+    return labels
+
+
+def parse_text(text: str):
+    """
+    Teks Prometheus -> list (nama_sample, labels, value).
+    """
+    samples = []
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        head, _, value = line.rpartition(" ")
+        if "{" in head:
+            name, _, rest = head.partition("{")
+            labels = _parse_labels(rest.rstrip("}"))
+        else:
+            name, labels = head, {}
+        samples.append((name, labels, float(value)))
+    return samples
+
+
+def _quantile(buckets, count, q):
+    """
+    Perkiraan quantile dari bucket kumulatif (batas atas bucket).
+    """
+    target = q * count
+    for bound, cumulative in buckets:
+        if cumulative >= target:
+            return bound
+    return float("inf")
+
+
+def summarize(text: str):
+    """
+    Ringkasan per seri untuk ditampilkan di UI.
+    Return (histograms, scalars):
+      histograms: [{metric, labels, count, avg_ms, p50_ms, p95_ms, total_s}]
+      scalars:    [{metric, labels, value}]
+    """
+    hist, scalars = {}, []
+    for name, labels, value in parse_text(text):
+        if name.endswith("_bucket"):
+            base = name[:-7]
+            le = labels.pop("le")
+            key = (base, tuple(sorted(labels.items())))
+            bound = float("inf") if le == "+Inf" else float(le)
+            hist.setdefault(key, {"buckets": []})["buckets"].append((bound, value))
+        elif name.endswith("_sum") and (name[:-4], tuple(sorted(labels.items()))) in hist:
+            hist[(name[:-4], tuple(sorted(labels.items())))]["sum"] = value
+        elif name.endswith("_count") and (name[:-6], tuple(sorted(labels.items()))) in hist:
+            hist[(name[:-6], tuple(sorted(labels.items())))]["count"] = value
+        else:
+            scalars.append({"metric": name, "labels": labels, "value": value})
+
+    histograms = []
+    for (base, labels), h in hist.items():
+        count = h.get("count", 0)
+        total = h.get("sum", 0.0)
+        buckets = sorted(h["buckets"])
+        histograms.append({
+            "metric": base,
+            "labels": dict(labels),
+            "count": int(count),
+            "total_s": round(total, 3),
+            "avg_ms": round(total / count * 1000, 2) if count else 0.0,
+            "p50_ms": _quantile(buckets, count, 0.5) * 1000 if count else 0.0,
+            "p95_ms": _quantile(buckets, count, 0.95) * 1000 if count else 0.0,
+        })
+    return histograms, scalars
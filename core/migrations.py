@@ -0,0 +1,437 @@
+from core.db import connection
+
+# =========================
+# SCHEMA MIGRATIONS
+# =========================
+# Setiap migration punya nomor versi berurutan dan dijalankan tepat
+# sekali per database. Versi yang sudah jalan dicatat di schema_version.
+# Jangan ubah migration yang sudah rilis — tambahkan migration baru.
+
+
+def _columns(conn, table):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_column(conn, table, column, ddl):
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def _m001_base_schema(conn):
+    # =========================
+    # USERS
+    # =========================
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nik TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        role TEXT NOT NULL,
+        join_date DATE,
+        probation_date DATE,
+        permanent_date DATE,
+        password_hash TEXT NOT NULL,
+        manager_id INTEGER,
+        division TEXT DEFAULT 'Back Office',
+        FOREIGN KEY (manager_id) REFERENCES users(id)
+    )
+    """)
+    _add_column(conn, "users", "division", "TEXT DEFAULT 'Back Office'")
+
+    # =========================
+    # LEAVE BALANCE
+    # =========================
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS leave_balance (
+        user_id INTEGER PRIMARY KEY,
+        last_year INTEGER DEFAULT 0,
+        current_year INTEGER DEFAULT 0,
+        change_off REAL DEFAULT 0,
+        sick_no_doc INTEGER DEFAULT 0,
+        updated_at DATE,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """)
+
+    # =========================
+    # LEAVE REQUESTS
+    # =========================
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS leave_requests (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        leave_type TEXT NOT NULL,
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        total_days INTEGER NOT NULL,
+        reason TEXT,
+        status TEXT DEFAULT 'submitted',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        approved_by INTEGER,
+        approved_at DATETIME,
+        manager_note TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (approved_by) REFERENCES users(id)
+    )
+    """)
+    _add_column(conn, "leave_requests", "manager_note", "TEXT")
+
+    # Kolom = leave_requests.* + info archive (dipakai INSERT ... SELECT *)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS leave_requests_archive (
+        id INT,
+        user_id INT,
+        leave_type TEXT,
+        start_date NUM,
+        end_date NUM,
+        total_days INT,
+        reason TEXT,
+        status TEXT,
+        created_at NUM,
+        approved_by INT,
+        approved_at NUM,
+        manager_note TEXT,
+        archived_at,
+        archived_by,
+        archive_note
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS archive_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        year INTEGER NOT NULL,
+        total_rows INTEGER NOT NULL,
+        archived_by INTEGER,
+        executed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # =========================
+    # HOLIDAYS
+    # =========================
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS holidays (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        holiday_date DATE UNIQUE,
+        description TEXT
+    )
+    """)
+
+    # =========================
+    # CHANGE OFF CLAIMS
+    # =========================
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS change_off_claims (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        category TEXT NOT NULL,          -- Teknisi / Back Office
+        work_type TEXT NOT NULL,         -- non-shift / 2-shift / 3-shift / back-office
+        work_date DATE NOT NULL,
+        start_date DATE,
+        end_date DATE,
+        daily_hours REAL,
+        co_days REAL NOT NULL,
+        location TEXT,
+        description TEXT,
+        attachment TEXT,
+        status TEXT DEFAULT 'submitted',
+        approved_by INTEGER,
+        approved_at DATETIME,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (approved_by) REFERENCES users(id)
+    )
+    """)
+    # DB lama dari init_db() belum punya kolom-kolom ini
+    _add_column(conn, "change_off_claims", "work_type", "TEXT")
+    _add_column(conn, "change_off_claims", "work_date", "DATE")
+    _add_column(conn, "change_off_claims", "co_days", "REAL NOT NULL DEFAULT 0")
+    _add_column(conn, "change_off_claims", "description", "TEXT")
+
+    # =========================
+    # LOGS
+    # =========================
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS auth_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        email TEXT,
+        role TEXT,
+        action TEXT,              -- login | logout | failed_login
+        ip_address TEXT,
+        user_agent TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS accrual_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        accrual_days INTEGER NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        executed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_id, year, month),
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """)
+    # ALTER TABLE tidak menerima default non-konstan
+    _add_column(conn, "accrual_logs", "executed_at", "DATETIME")
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS leave_reset_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        year INTEGER NOT NULL,
+        executed_by INTEGER NOT NULL DEFAULT 0,
+        executed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(year)
+    )
+    """)
+
+
+# Index untuk query yang paling sering jalan (core.queries, dijaga oleh
+# tests/test_query_plans.py)
+INDEX_PACK = (
+    # manager "My Team" + lookup HR / manager per divisi
+    ("idx_users_manager", "users (manager_id, email)"),
+    ("idx_users_role", "users (role, division)"),
+    # pending per employee + antrian approval HR
+    ("idx_leave_requests_user_status", "leave_requests (user_id, status, created_at)"),
+    ("idx_leave_requests_status_created", "leave_requests (status, created_at)"),
+    ("idx_leave_requests_created", "leave_requests (created_at)"),
+    ("idx_change_off_claims_user_status", "change_off_claims (user_id, status, created_at)"),
+    ("idx_change_off_claims_status_created", "change_off_claims (status, created_at)"),
+    # login activity (ORDER BY created_at DESC LIMIT 500)
+    ("idx_auth_logs_created", "auth_logs (created_at)"),
+)
+
+
+def _m002_index_pack(conn):
+    for name, target in INDEX_PACK:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+def _m003_engine_runs(conn):
+    # Riwayat job leave engine (accrual bulanan / reset 30 Juni)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS engine_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job TEXT NOT NULL,               -- monthly_accrual | june_30_reset
+        period TEXT NOT NULL,            -- YYYY-MM | YYYY
+        run_date DATE NOT NULL,          -- tanggal logis yang diproses
+        status TEXT NOT NULL,            -- ok | skipped | failed
+        message TEXT,
+        duration_ms REAL,
+        started_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_engine_runs_run_date
+    ON engine_runs (run_date)
+    """)
+
+
+def _m004_cache_versions(conn):
+    # Versi per tabel untuk invalidasi cache lintas proses
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS cache_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    conn.execute("""
+    INSERT OR IGNORE INTO cache_versions (name, version) VALUES ('holidays', 0)
+    """)
+
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_holidays_{event.lower()}_version
+        AFTER {event} ON holidays
+        BEGIN
+            UPDATE cache_versions SET version = version + 1
+            WHERE name = 'holidays';
+        END
+        """)
+
+
+def _m005_co_rules(conn):
+    # Aturan Change Off per versi (diedit HR, lihat core.co_rules)
+    from core.co_rules import CO_RULES_V1
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS co_rule_versions (
+        version INTEGER PRIMARY KEY,
+        note TEXT,
+        created_by INTEGER,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        is_active INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS co_rules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        version INTEGER NOT NULL,
+        component TEXT NOT NULL,
+        work_type TEXT NOT NULL DEFAULT '*',
+        day_type TEXT NOT NULL DEFAULT '*',
+        hours_bucket TEXT NOT NULL DEFAULT '*',
+        travel_slot TEXT NOT NULL DEFAULT '*',
+        co_days REAL NOT NULL
+    )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_co_rules_version ON co_rules (version)"
+    )
+
+    if not conn.execute("SELECT 1 FROM co_rule_versions").fetchone():
+        conn.execute("""
+        INSERT INTO co_rule_versions (version, note, created_by, is_active)
+        VALUES (1, 'Kebijakan awal', NULL, 1)
+        """)
+        conn.executemany("""
+        INSERT INTO co_rules
+            (version, component, work_type, day_type,
+             hours_bucket, travel_slot, co_days)
+        VALUES (1, ?, ?, ?, ?, ?, ?)
+        """, CO_RULES_V1)
+
+    conn.execute("""
+    INSERT OR IGNORE INTO cache_versions (name, version) VALUES ('co_rules', 0)
+    """)
+
+    # Klaim menyimpan versi aturan yang dipakai saat dihitung
+    if "rule_version" not in _columns(conn, "change_off_claims"):
+        _add_column(conn, "change_off_claims", "rule_version", "INTEGER")
+        conn.execute("UPDATE change_off_claims SET rule_version = 1")
+
+
+def _m006_slow_query_log(conn):
+    # Query lambat dari koneksi ter-instrumentasi (HR_DB_PROFILE=1)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS slow_query_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        sql TEXT NOT NULL,               -- SQL ternormalisasi
+        duration_ms REAL NOT NULL,
+        call_site TEXT                   -- file:line pemanggil
+    )
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_slow_query_log_created
+    ON slow_query_log (created_at)
+    """)
+
+
+def _m007_email_outbox(conn):
+    # Email keluar, ditulis di transaksi yang sama dengan perubahan status
+    # dan dikirim oleh worker (lihat core.outbox)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        to_email TEXT NOT NULL,          -- dipisah koma
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        html INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'pending',  -- pending | sending | sent | failed
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        locked_at DATETIME,
+        last_error TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        sent_at DATETIME
+    )
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+    ON email_outbox (status, next_attempt_at)
+    """)
+
+
+def _m008_notification_digest(conn):
+    # Pilihan per user: email per event atau digest (lihat core.notify)
+    _add_column(conn, "users", "notify_mode", "TEXT NOT NULL DEFAULT 'instant'")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS notification_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        recipient TEXT NOT NULL,
+        event TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        summary TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        outbox_id INTEGER               -- terisi saat masuk email digest
+    )
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_notification_events_pending
+    ON notification_events (outbox_id, recipient)
+    """)
+
+
+def _m009_outbox_html_part(conn):
+    # email multipart: body = teks, body_html = alternatif HTML
+    _add_column(conn, "email_outbox", "body_html", "TEXT")
+
+
+MIGRATIONS = [
+    (1, "base schema", _m001_base_schema),
+    (2, "index pack: team, approval queues, login activity", _m002_index_pack),
+    (3, "engine_runs job table", _m003_engine_runs),
+    (4, "cache_versions + holiday triggers", _m004_cache_versions),
+    (5, "versioned change off rules", _m005_co_rules),
+    (6, "slow_query_log table", _m006_slow_query_log),
+    (7, "email_outbox table", _m007_email_outbox),
+    (8, "notification digest events + users.notify_mode", _m008_notification_digest),
+    (9, "email_outbox.body_html", _m009_outbox_html_part),
+]
+
+
+def get_schema_version(conn) -> int:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate() -> int:
+    """
+    Jalankan semua migration yang belum tercatat di schema_version.
+    Aman dipanggil bersamaan dari beberapa proses (BEGIN IMMEDIATE).
+    Return versi schema setelah migrate.
+    """
+    with connection() as conn:
+        version = get_schema_version(conn)
+        conn.commit()
+
+        for number, name, upgrade in MIGRATIONS:
+            if number <= version:
+                continue
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # proses lain mungkin sudah menjalankan migration ini
+                if get_schema_version(conn) >= number:
+                    conn.rollback()
+                    continue
+
+                upgrade(conn)
+                conn.execute(
+                    "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                    (number, name)
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            version = number
+
+        return version
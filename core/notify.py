@@ -0,0 +1,173 @@
+import os
+from datetime import datetime, timedelta
+
+from core.db import connection
+from core.outbox import enqueue_rendered
+from utils.email_templates import RenderedEmail, render_many
+
+# =========================
+# NOTIFIKASI: PER EVENT / DIGEST
+# =========================
+# Setiap user memilih users.notify_mode:
+#   instant -> satu email per event (lewat email_outbox)
+#   hourly  -> event dikumpulkan, satu email ringkasan per jam
+#   daily   -> satu email ringkasan per hari (DAILY_HOUR_UTC)
+# Event digest disimpan di notification_events dan dirangkum oleh email
+# worker (build_digests) menjadi satu baris email_outbox per penerima.
+MODE_INSTANT = "instant"
+MODE_HOURLY = "hourly"
+MODE_DAILY = "daily"
+
+NOTIFY_MODES = {
+    MODE_INSTANT: "Per event",
+    MODE_HOURLY: "Hourly digest",
+    MODE_DAILY: "Daily digest",
+}
+
+# 01:00 UTC = 08:00 WIB
+DAILY_HOUR_UTC = int(os.getenv("HR_DIGEST_DAILY_HOUR_UTC", 1))
+KEEP_DAYS = int(os.getenv("HR_DIGEST_KEEP_DAYS", 30))
+
+EVENT_LEAVE_SUBMITTED = "leave_submitted"
+EVENT_CO_SUBMITTED = "co_submitted"
+EVENT_LEAVE_STATUS = "leave_status"
+EVENT_CO_STATUS = "co_status"
+
+EVENT_LABELS = {
+    EVENT_LEAVE_SUBMITTED: "Leave requests pending approval",
+    EVENT_CO_SUBMITTED: "Change Off claims pending approval",
+    EVENT_LEAVE_STATUS: "Leave request updates",
+    EVENT_CO_STATUS: "Change Off claim updates",
+}
+
+_TS = "%Y-%m-%d %H:%M:%S"
+
+
+def _recipients(to_email) -> list[str]:
+    if isinstance(to_email, str):
+        to_email = to_email.split(",")
+    return list(dict.fromkeys(e.strip() for e in to_email if e and e.strip()))
+
+
+def get_modes(conn, emails) -> dict:
+    """
+    email -> notify_mode. Email yang bukan user dianggap instant.
+    """
+    if not emails:
+        return {}
+    rows = conn.execute(f"""
+        SELECT email, notify_mode FROM users
+        WHERE email IN ({", ".join("?" * len(emails))})
+    """, list(emails)).fetchall()
+    return {email: mode or MODE_INSTANT for email, mode in rows}
+
+
+def notify(conn, to_email, message: RenderedEmail, summary: str, event: str):
+    """
+    Kirim notifikasi (hasil utils.email_templates.render) sesuai pilihan
+    tiap penerima, TANPA commit (commit bersama perubahan datanya).
+    summary = satu baris untuk email digest.
+    """
+    recipients = _recipients(to_email)
+    modes = get_modes(conn, recipients)
+
+    instant = [e for e in recipients if modes.get(e, MODE_INSTANT) == MODE_INSTANT]
+    if instant:
+        enqueue_rendered(conn, instant, message)
+
+    digest = [e for e in recipients if e not in instant]
+    if digest:
+        conn.executemany("""
+            INSERT INTO notification_events (recipient, event, subject, summary)
+            VALUES (?, ?, ?, ?)
+        """, [(e, event, message.subject, summary) for e in digest])
+
+
+def window_end(oldest: datetime, mode: str) -> datetime:
+    """
+    Kapan digest berisi event tertua ini dikirim.
+    """
+    if mode == MODE_HOURLY:
+        return oldest.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    if mode == MODE_DAILY:
+        boundary = oldest.replace(hour=DAILY_HOUR_UTC, minute=0, second=0, microsecond=0)
+        return boundary if boundary > oldest else boundary + timedelta(days=1)
+    # user pindah ke instant / sudah dihapus: kirim yang tersisa sekarang
+    return oldest
+
+
+def digest_context(events) -> dict:
+    """
+    events = [(event, subject, summary, created_at)] -> context template
+    "digest" (dikelompokkan per jenis event).
+    """
+    grouped = {}
+    for event, subject, summary, created_at in events:
+        grouped.setdefault(event, []).append((created_at[:16], summary or subject))
+
+    return {
+        "count": len(events),
+        "first": events[0][3][:16],
+        "last": events[-1][3][:16],
+        "groups": [
+            (EVENT_LABELS.get(event, "Other notifications"), items)
+            for event, items in grouped.items()
+        ],
+    }
+
+
+def build_digests(now: datetime | None = None) -> int:
+    """
+    Rangkum event yang jendelanya sudah lewat menjadi email outbox
+    (satu per penerima). Return jumlah digest yang dibuat.
+    """
+    now = now or datetime.utcnow()
+    created = 0
+
+    with connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        pending = conn.execute("""
+            SELECT e.recipient, u.notify_mode, MIN(e.created_at)
+            FROM notification_events e
+            LEFT JOIN users u ON u.email = e.recipient
+            WHERE e.outbox_id IS NULL
+            GROUP BY e.recipient
+        """).fetchall()
+
+        due = []
+        for recipient, mode, oldest in pending:
+            if window_end(datetime.strptime(oldest, _TS), mode) > now:
+                continue
+            events = conn.execute("""
+                SELECT id, event, subject, summary, created_at
+                FROM notification_events
+                WHERE recipient = ? AND outbox_id IS NULL
+                ORDER BY id
+            """, (recipient,)).fetchall()
+            due.append((recipient, events))
+
+        messages = render_many(
+            "digest", [digest_context([e[1:] for e in events]) for _, events in due]
+        )
+        for (recipient, events), message in zip(due, messages):
+            outbox_id = enqueue_rendered(conn, recipient, message)
+            conn.executemany(
+                "UPDATE notification_events SET outbox_id = ? WHERE id = ?",
+                [(outbox_id, e[0]) for e in events]
+            )
+            created += 1
+
+        conn.execute(
+            "DELETE FROM notification_events WHERE outbox_id IS NOT NULL AND created_at < ?",
+            ((now - timedelta(days=KEEP_DAYS)).strftime(_TS),)
+        )
+        conn.commit()
+
+    return created
+
+
+def set_mode(conn, user_id: int, mode: str):
+    if mode not in NOTIFY_MODES:
+        raise ValueError(f"unknown notify mode: {mode}")
+    conn.execute("UPDATE users SET notify_mode = ? WHERE id = ?", (mode, user_id))
+    conn.commit()
@@ -0,0 +1,199 @@
+import os
+import random
+
+from core.db import connection
+
+# =========================
+# EMAIL OUTBOX
+# =========================
+# Halaman tidak mengirim email langsung. Email ditulis ke email_outbox di
+# transaksi yang sama dengan perubahan status (commit bersama), lalu
+# dikirim oleh worker terpisah (python -m scripts.run_email_worker).
+# Gagal kirim dicoba ulang dengan exponential backoff sampai MAX_ATTEMPTS,
+# setelah itu status 'failed' dan bisa di-retry manual dari HR.
+MAX_ATTEMPTS = int(os.getenv("HR_EMAIL_MAX_ATTEMPTS", 8))
+RETRY_BASE_SECONDS = int(os.getenv("HR_EMAIL_RETRY_BASE_SECONDS", 30))
+RETRY_MAX_SECONDS = int(os.getenv("HR_EMAIL_RETRY_MAX_SECONDS", 3600))
+BATCH_SIZE = int(os.getenv("HR_EMAIL_BATCH_SIZE", 20))
+# baris 'sending' dari worker yang mati diambil ulang setelah ini
+LOCK_TIMEOUT_SECONDS = int(os.getenv("HR_EMAIL_LOCK_TIMEOUT_SECONDS", 300))
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+
+def enqueue_email(
+    conn,
+    to_email,
+    subject: str,
+    body: str,
+    html: bool = False,
+    body_html: str | None = None
+) -> int:
+    """
+    Tulis email ke outbox TANPA commit: pemanggil commit bersama
+    perubahan datanya. to_email boleh string atau list. body_html =
+    alternatif HTML untuk body teks (multipart).
+    """
+    if not isinstance(to_email, str):
+        to_email = ", ".join(e for e in to_email if e)
+    cur = conn.execute("""
+        INSERT INTO email_outbox (to_email, subject, body, html, body_html)
+        VALUES (?, ?, ?, ?, ?)
+    """, (to_email, subject, body, int(html), body_html))
+    return cur.lastrowid
+
+
+def enqueue_rendered(conn, to_email, message) -> int:
+    """
+    enqueue_email untuk hasil utils.email_templates.render().
+    """
+    return enqueue_email(
+        conn, to_email, message.subject, message.text, body_html=message.html
+    )
+
+
+def retry_delay(attempts: int) -> int:
+    """
+    Detik sampai percobaan berikutnya (attempts = jumlah gagal sejauh ini).
+    Jitter ±20% supaya email yang gagal bersamaan tidak dicoba serentak.
+    """
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return int(delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(limit: int = BATCH_SIZE) -> list[tuple]:
+    """
+    Ambil email yang jatuh tempo dan tandai 'sending' (aman untuk
+    beberapa worker). Return
+    [(id, to_email, subject, body, html, body_html, attempts)].
+    """
+    with connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute("""
+            SELECT id, to_email, subject, body, html, body_html, attempts
+            FROM email_outbox
+            WHERE (status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP)
+               OR (status = 'sending' AND locked_at <= datetime('now', ?))
+            ORDER BY id
+            LIMIT ?
+        """, (f"-{LOCK_TIMEOUT_SECONDS} seconds", limit)).fetchall()
+
+        if rows:
+            conn.executemany("""
+                UPDATE email_outbox
+                SET status = 'sending', locked_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [(r[0],) for r in rows])
+        conn.commit()
+    return rows
+
+
+def deliver_pending(send=None, limit: int = BATCH_SIZE, send_many=None) -> dict:
+    """
+    Satu putaran worker. send(to_email, subject, body, html, body_html)
+    default utils.emailer.send_email. send_many(list EmailMessage) ->
+    error per email (None = terkirim) mengirim satu batch sekaligus, mis.
+    utils.notifications.deliver_many. Return jumlah per hasil.
+    """
+    rows = claim_batch(limit)
+    if not rows:
+        return {"sent": 0, "retry": 0, "failed": 0}
+
+    if send_many is not None:
+        from utils.emailer import build_message
+
+        # error per baris: satu baris rusak / env SMTP belum lengkap tidak
+        # boleh membuat batch tertahan di 'sending'
+        errors, messages, index = [], [], []
+        for i, (_, to_email, subject, body, html, body_html, _) in enumerate(rows):
+            try:
+                messages.append(build_message(to_email, subject, body, bool(html), body_html))
+                index.append(i)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+
+        if messages:
+            try:
+                sent = list(send_many(messages))
+                if len(sent) != len(messages):
+                    raise RuntimeError(
+                        f"send_many returned {len(sent)} results for {len(messages)} emails"
+                    )
+            except Exception as e:
+                sent = [e] * len(messages)
+            for i, error in zip(index, sent):
+                errors[i] = error
+    else:
+        if send is None:
+            from utils.emailer import send_email as send
+
+        errors = []
+        for _, to_email, subject, body, html, body_html, _ in rows:
+            try:
+                send(to_email, subject, body, html=bool(html), body_html=body_html)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+
+    return mark_results(
+        (outbox_id, attempts, error)
+        for (outbox_id, *_, attempts), error in zip(rows, errors)
+    )
+
+
+def mark_results(results) -> dict:
+    """
+    Simpan hasil satu batch dalam satu transaksi.
+    results = [(id, attempts sebelum kirim, error / None)].
+    """
+    result = {"sent": 0, "retry": 0, "failed": 0}
+    sent, failed = [], []
+    for outbox_id, attempts, error in results:
+        if error is None:
+            sent.append((outbox_id,))
+            result["sent"] += 1
+            continue
+
+        attempts += 1
+        if attempts >= MAX_ATTEMPTS:
+            status, delay = STATUS_FAILED, 0
+        else:
+            status, delay = STATUS_PENDING, retry_delay(attempts)
+        result["failed" if status == STATUS_FAILED else "retry"] += 1
+        failed.append((
+            status, attempts, f"{type(error).__name__}: {error}"[:500],
+            f"+{delay} seconds", outbox_id
+        ))
+
+    with connection() as conn:
+        conn.executemany("""
+            UPDATE email_outbox
+            SET status = 'sent', sent_at = CURRENT_TIMESTAMP,
+                attempts = attempts + 1, last_error = NULL, locked_at = NULL
+            WHERE id = ?
+        """, sent)
+        conn.executemany("""
+            UPDATE email_outbox
+            SET status = ?, attempts = ?, last_error = ?, locked_at = NULL,
+                next_attempt_at = datetime('now', ?)
+            WHERE id = ?
+        """, failed)
+        conn.commit()
+    return result
+
+
+def retry_failed(conn) -> int:
+    """
+    Kembalikan email 'failed' ke antrian (dipakai HR).
+    """
+    cur = conn.execute("""
+        UPDATE email_outbox
+        SET status = 'pending', attempts = 0, next_attempt_at = CURRENT_TIMESTAMP
+        WHERE status = 'failed'
+    """)
+    conn.commit()
+    return cur.rowcount
@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+# =========================
+# PASSWORD HASHING (PROCESS POOL)
+# =========================
+# bcrypt memakan CPU penuh per panggilan. Hash & verify dijalankan di
+# process pool terpisah supaya tidak memblokir thread Streamlit maupun
+# event loop backend. Cost (rounds) bisa diatur; hash lama dengan cost
+# berbeda di-upgrade otomatis saat login berhasil.
+BCRYPT_ROUNDS = int(os.getenv("HR_BCRYPT_ROUNDS", 12))
+HASH_WORKERS = int(os.getenv("HR_HASH_WORKERS", os.cpu_count() or 1))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    bcrypt__rounds=BCRYPT_ROUNDS,
+)
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+# hash pembanding untuk email yang tidak terdaftar (cost sama), dihitung
+# sekali saat pool dibuat
+_dummy_hash: Future | None = None
+
+
+# ---- dijalankan di worker process ----
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> tuple[bool, str | None]:
+    try:
+        return pwd_context.verify_and_update(password, hashed)
+    except (ValueError, TypeError):
+        # hash rusak / bukan bcrypt
+        return False, None
+
+
+# ---- pool ----
+def get_pool() -> ProcessPoolExecutor:
+    global _pool, _dummy_hash
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # forkserver: worker di-fork dari server bersih, bukan dari
+                # proses multi-thread (Streamlit / uvicorn), dan modul ini
+                # di-preload di server. Seperti start method spawn, worker
+                # tetap meng-import ulang __main__ pemanggil: script yang
+                # memakai modul ini harus berupa file / modul dengan guard
+                # `if __name__ == "__main__"` (bukan stdin / python -c).
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload([__name__])
+                pool = ProcessPoolExecutor(
+                    max_workers=HASH_WORKERS, mp_context=ctx
+                )
+                _dummy_hash = pool.submit(_hash, os.urandom(16).hex())
+                _pool = pool
+    return _pool
+
+
+def shutdown():
+    global _pool, _dummy_hash
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+            _dummy_hash = None
+
+
+def _get_dummy_hash() -> Future:
+    # _dummy_hash di-set sebelum _pool (di bawah _pool_lock)
+    get_pool()
+    return _dummy_hash
+
+
+# ---- API sync (Streamlit / script) ----
+def hash_password(password: str) -> str:
+    return get_pool().submit(_hash, password).result()
+
+
+def verify_password(password: str, hashed: str | None) -> tuple[bool, str | None]:
+    """
+    Return (cocok, hash_baru). hash_baru terisi jika hash perlu di-upgrade
+    ke cost sekarang. hashed=None (email tidak ada) tetap menjalankan
+    bcrypt supaya waktunya sama dengan email yang ada.
+    """
+    if hashed is None:
+        get_pool().submit(_verify_and_update, password, _get_dummy_hash().result()).result()
+        return False, None
+    return get_pool().submit(_verify_and_update, password, hashed).result()
+
+
+# ---- API async (backend) ----
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), _hash, password)
+
+
+async def verify_password_async(password: str, hashed: str | None) -> tuple[bool, str | None]:
+    loop = asyncio.get_running_loop()
+    if hashed is None:
+        dummy = await asyncio.wrap_future(_get_dummy_hash())
+        await loop.run_in_executor(get_pool(), _verify_and_update, password, dummy)
+        return False, None
+    return await loop.run_in_executor(get_pool(), _verify_and_update, password, hashed)
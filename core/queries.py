@@ -0,0 +1,123 @@
+# =========================
+# HOT QUERIES
+# =========================
+# SQL yang paling sering jalan, dipakai langsung oleh pages/ dan core/.
+# tests/test_query_plans.py menjalankan EXPLAIN QUERY PLAN atas konstanta
+# yang sama, jadi perubahan query di sini otomatis ikut dicek terhadap
+# INDEX_PACK (core.migrations).
+
+# ---- manager ----
+MANAGER_TEAM = """
+    SELECT
+        u.id,
+        u.email,
+        COUNT(DISTINCT lr.id) AS pending_leave,
+        COUNT(DISTINCT co.id) AS pending_co
+    FROM users u
+    LEFT JOIN leave_requests lr
+        ON lr.user_id=u.id AND lr.status='submitted'
+    LEFT JOIN change_off_claims co
+        ON co.user_id=u.id AND co.status='submitted'
+    WHERE u.manager_id=?
+    GROUP BY u.id
+    ORDER BY u.email
+"""
+
+MANAGER_PENDING_LEAVE = """
+    SELECT id, leave_type, start_date, end_date, total_days, reason
+    FROM leave_requests
+    WHERE user_id=? AND status='submitted'
+    ORDER BY created_at
+"""
+
+MANAGER_PENDING_CO = """
+    SELECT id, work_type, work_date, co_days, description
+    FROM change_off_claims
+    WHERE user_id=? AND status='submitted'
+    ORDER BY created_at
+"""
+
+HR_EMAILS = "SELECT email FROM users WHERE role='hr'"
+
+# ---- HR ----
+MANAGERS_BY_DIVISION = """
+    SELECT id, name, division
+    FROM users
+    WHERE role = 'manager'
+"""
+
+HR_LEAVE_QUEUE = """
+    SELECT lr.id,u.name,lr.leave_type,lr.start_date,lr.end_date,
+           lr.total_days,lr.reason,lr.user_id
+    FROM leave_requests lr
+    JOIN users u ON u.id=lr.user_id
+    WHERE lr.status='manager_approved'
+    ORDER BY lr.created_at
+"""
+
+HR_CO_QUEUE = """
+    SELECT c.id,u.name,c.work_date,c.start_date,c.end_date,
+           c.co_days,c.description,c.attachment,c.user_id
+    FROM change_off_claims c
+    JOIN users u ON u.id=c.user_id
+    WHERE c.status='manager_approved'
+    ORDER BY c.created_at
+"""
+
+LOGIN_ACTIVITY = """
+    SELECT
+        l.created_at,
+        u.name,
+        l.email,
+        l.role,
+        l.action,
+        l.ip_address
+    FROM auth_logs l
+    LEFT JOIN users u ON u.id = l.user_id
+    ORDER BY l.created_at DESC
+    LIMIT 500
+"""
+
+# ---- employee ----
+EMPLOYEE_LEAVE_HISTORY = """
+    SELECT start_date,end_date,leave_type,total_days,status
+    FROM leave_requests WHERE user_id=?
+"""
+
+EMPLOYEE_CO_HISTORY = """
+    SELECT work_date,co_days,status
+    FROM change_off_claims WHERE user_id=?
+"""
+
+# ---- leave engine ----
+# Accrual bulanan set-based (core.leave_accrual): satu INSERT ... SELECT
+# dengan anti-join ke accrual_logs.
+ACCRUAL_INSERT = """
+    INSERT INTO accrual_logs (user_id, year, month, accrual_days)
+    WITH RECURSIVE
+    eligible(user_id, ym) AS (
+        SELECT id,
+               MAX(
+                   :floor,
+                   CAST(strftime('%Y', permanent_date) AS INTEGER) * 12
+                   + CAST(strftime('%m', permanent_date) AS INTEGER) - 1
+               )
+        FROM users
+        WHERE role = 'employee'
+        AND permanent_date IS NOT NULL
+        AND date(permanent_date) <= date(:today)
+    ),
+    months(user_id, ym) AS (
+        SELECT user_id, ym FROM eligible WHERE ym <= :target
+        UNION ALL
+        SELECT user_id, ym + 1 FROM months WHERE ym < :target
+    )
+    SELECT m.user_id, m.ym / 12, m.ym % 12 + 1, 1
+    FROM months m
+    WHERE NOT EXISTS (
+        SELECT 1 FROM accrual_logs a
+        WHERE a.user_id = m.user_id
+        AND a.year = m.ym / 12
+        AND a.month = m.ym % 12 + 1
+    )
+"""
@@ -0,0 +1,196 @@
+import atexit
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+# =========================
+# SLOW QUERY LOG
+# =========================
+# Dipakai oleh koneksi ter-instrumentasi (HR_DB_PROFILE=1, atau thread
+# yang sedang diprofil render profiler; lihat core.db).
+# Setiap execute/fetch dicatat ke statistik in-memory per SQL yang sudah
+# dinormalisasi; query di atas ambang juga disimpan ke slow_query_log
+# beserta call site-nya. Penulisan ke DB dilakukan thread flusher
+# terpisah, bukan di tengah transaksi pemanggil.
+SLOW_QUERY_MS = float(os.getenv("HR_SLOW_QUERY_MS", 50))
+FLUSH_SECONDS = float(os.getenv("HR_SLOW_QUERY_FLUSH_SECONDS", 5))
+KEEP_DAYS = int(os.getenv("HR_SLOW_QUERY_KEEP_DAYS", 7))
+MAX_PENDING = 1000
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SKIP_FILES = {os.path.abspath(__file__), os.path.join(BASE_DIR, "core", "db.py")}
+
+_stats = {}      # sql ternormalisasi -> [calls, total_s, max_s]
+_pending = []    # (created_at, sql, duration_ms, call_site)
+_lock = threading.Lock()
+_local = threading.local()
+_flusher: threading.Thread | None = None
+_last_prune = 0.0
+_observers = []  # fn(sql_normalized, seconds, call), mis. render profiler
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Bentuk SQL untuk pengelompokan: literal jadi ?, daftar IN (?, ?, ...)
+    diringkas, whitespace dirapikan.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _SPACE.sub(" ", sql).strip()
+    return _IN_LIST.sub("(?...)", sql)
+
+
+def _call_site() -> str:
+    frame = sys._getframe(2)
+    while frame and frame.f_code.co_filename in _SKIP_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    path = frame.f_code.co_filename
+    if path.startswith(BASE_DIR):
+        path = os.path.relpath(path, BASE_DIR)
+    return f"{path}:{frame.f_lineno}"
+
+
+def record(sql: str, seconds: float, elapsed: float, call: bool = True):
+    """
+    Tambah waktu ke statistik SQL. elapsed = total execute + fetch sejauh
+    ini (untuk max). call=False untuk waktu fetch dari execute yang sama
+    (jumlah panggilan tidak bertambah).
+    """
+    if getattr(_local, "flushing", False):
+        return
+    key = normalize_sql(sql)
+    with _lock:
+        stat = _stats.get(key)
+        if stat is None:
+            stat = _stats[key] = [0, 0.0, 0.0]
+        stat[0] += call
+        stat[1] += seconds
+        stat[2] = max(stat[2], elapsed)
+    for fn in _observers:
+        fn(key, seconds, call)
+
+
+def set_thread_profiling(enabled: bool):
+    """
+    Minta koneksi yang diambil thread ini berikutnya ter-instrumentasi
+    (dipakai render profiler untuk ?profile=1 tanpa HR_DB_PROFILE).
+    """
+    _local.profiling = enabled
+
+
+def thread_profiling() -> bool:
+    return getattr(_local, "profiling", False)
+
+
+def add_observer(fn):
+    """
+    fn(sql, seconds, call) dipanggil untuk setiap execute/fetch yang
+    diukur, di thread pemanggil query.
+    """
+    if fn not in _observers:
+        _observers.append(fn)
+
+
+def record_slow(sql: str, seconds: float):
+    if getattr(_local, "flushing", False):
+        return
+    row = (
+        datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+        normalize_sql(sql),
+        round(seconds * 1000, 3),
+        _call_site(),
+    )
+    with _lock:
+        if len(_pending) < MAX_PENDING:
+            _pending.append(row)
+    _start_flusher()
+
+
+def top_queries(limit: int = 20) -> list[dict]:
+    """
+    Statistik proses ini, urut total waktu terbesar.
+    """
+    with _lock:
+        items = sorted(_stats.items(), key=lambda kv: -kv[1][1])[:limit]
+    return [{
+        "sql": sql,
+        "calls": calls,
+        "total_ms": round(total * 1000, 2),
+        "avg_ms": round(total * 1000 / calls, 3) if calls else 0.0,
+        "max_ms": round(worst * 1000, 2),
+    } for sql, (calls, total, worst) in items]
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+
+# =========================
+# FLUSH KE slow_query_log
+# =========================
+def flush():
+    global _last_prune
+    with _lock:
+        rows = _pending[:]
+        _pending.clear()
+
+    if not rows:
+        return
+
+    now = time.time()
+    prune = now - _last_prune > 3600
+
+    from core.db import connection
+
+    _local.flushing = True
+    try:
+        with connection() as conn:
+            conn.executemany("""
+                INSERT INTO slow_query_log (created_at, sql, duration_ms, call_site)
+                VALUES (?, ?, ?, ?)
+            """, rows)
+            if prune:
+                cutoff = datetime.utcnow() - timedelta(days=KEEP_DAYS)
+                conn.execute(
+                    "DELETE FROM slow_query_log WHERE created_at < ?",
+                    (cutoff.strftime("%Y-%m-%d %H:%M:%S"),)
+                )
+                _last_prune = now
+            conn.commit()
+    except sqlite3.Error as e:
+        # mis. tabel belum ada (migrate belum jalan)
+        print(f"⚠️ slow_query_log flush gagal: {e}")
+    finally:
+        _local.flushing = False
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        flush()
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is None:
+        with _lock:
+            if _flusher is None:
+                _flusher = threading.Thread(
+                    target=_flush_loop, name="hr-slow-query-log", daemon=True
+                )
+                _flusher.start()
+
+
+atexit.register(flush)
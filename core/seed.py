@@ -1,25 +1,29 @@
-from core.db import get_conn
+from core.db import connection
 from core.auth import hash_password
 
-def seed_hr_if_empty():
-    conn = get_conn()
-    cur = conn.cursor()
+DIVISIONS = [
+    "TSCM", "IC", "GA & PURCHASING",
+    "HR", "FINANCE", "WORKSHOP",
+    "SALES", "Back Office"
+]
 
-    cur.execute("SELECT COUNT(*) FROM users")
-    count = cur.fetchone()[0]
+def seed_hr_if_empty():
+    with connection() as conn:
+        cur = conn.cursor()
 
-    if count == 0:
-        cur.execute("""
-            INSERT INTO users (nik, name, email, role, password_hash)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            "HR001",
-            "HR Admin",
-            "hr@cistech.co.id",
-            "hr",
-            hash_password("admin123")
-        ))
-        conn.commit()
-        print("✅ Default HR Admin created")
+        cur.execute("SELECT COUNT(*) FROM users")
+        count = cur.fetchone()[0]
 
-    conn.close()
+        if count == 0:
+            cur.execute("""
+                INSERT INTO users (nik, name, email, role, password_hash)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                "HR001",
+                "HR Admin",
+                "hr@cistech.co.id",
+                "hr",
+                hash_password("admin123")
+            ))
+            conn.commit()
+            print("✅ Default HR Admin created")
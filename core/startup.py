@@ -0,0 +1,25 @@
+import threading
+from core.migrations import migrate
+from core.seed import seed_hr_if_empty
+
+# =========================
+# ONE-TIME STARTUP
+# =========================
+# Streamlit menjalankan ulang script halaman di setiap klik, jadi
+# migration + seed cukup dijalankan sekali per proses.
+_started = False
+_lock = threading.Lock()
+
+
+def startup():
+    global _started
+    if _started:
+        return
+
+    with _lock:
+        if _started:
+            return
+
+        migrate()
+        seed_hr_if_empty()
+        _started = True
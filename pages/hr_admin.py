@@ -1,10 +1,16 @@
+import os
 import streamlit as st
 from datetime import date
-from utils.api import api_get, api_post
-from core.db import get_conn
+from utils.api import api_get, api_post, get_me
+from core import queries
+from core.db import connection
+from core.startup import startup
 from core.auth import hash_password
-from core.leave_engine import run_leave_engine
-from utils.ui import load_css
+from core.seed import DIVISIONS
+from core.holiday import add_holiday, update_holiday, delete_holiday
+from core.co_rules import RULE_COLUMNS, get_active_rules, get_rules, save_rule_version
+from utils.ui import load_css, notification_settings
+from utils import profiler
 
 
 
@@ -24,12 +30,9 @@ def safe_date(v):
         return v
     return date.fromisoformat(v)
 
+@profiler.profiled()
 def get_managers_by_division(conn):
-    rows = conn.execute("""
-        SELECT id, name, division
-        FROM users
-        WHERE role = 'manager'
-    """).fetchall()
+    rows = conn.execute(queries.MANAGERS_BY_DIVISION).fetchall()
 
     result = {}
     for mid, name, div in rows:
@@ -42,6 +45,8 @@ def get_managers_by_division(conn):
 # ======================================================
 # PAGE CONFIG
 # ======================================================
+profiler.start_rerun("hr_admin")
+profiler.mark("page config")
 st.set_page_config(page_title="HR Admin Dashboard", layout="wide")
 load_css("assets/styles/global.css")
 
@@ -55,750 +60,704 @@ div[data-baseweb="radio"] > div { gap: 14px; }
 # ======================================================
 # AUTH
 # ======================================================
-me = api_get("/me")
-if not (me.status_code == 200 and isinstance(me.json(), dict)):
+profiler.mark("auth")
+payload = get_me()
+if not isinstance(payload, dict):
     st.session_state.clear()
     st.switch_page("app.py")
     st.stop()
 
-payload = me.json()
 if payload.get("role") != "hr":
     st.error("Unauthorized")
     st.stop()
 
-hr_id = payload.get("id") or payload.get("user_id")
+hr_id = payload.get("id")
 
 # ======================================================
-# ENGINE + DB
+# DB
 # ======================================================
-run_leave_engine()
-conn = get_conn()
+profiler.mark("startup")
+startup()
+with connection() as conn:
+    # ======================================================
+    # HEADER
+    # ======================================================
+    profiler.mark("header")
 
-# ======================================================
-# HEADER
-# ======================================================
+    col1, col2 = st.columns([7, 3], vertical_alignment="center")
 
-col1, col2 = st.columns([7, 3], vertical_alignment="center")
+    with col1:
+        st.title("🏢 HR Admin Dashboard")
+        notification_settings(conn, payload)
 
-with col1:
-    st.title("🏢 HR Admin Dashboard")
+        # 🔔 GLOBAL NOTIFICATION
+        if st.session_state.get("user_created"):
+            st.toast("✅ User berhasil dibuat", icon="🎉")
+            st.session_state.user_created = False
 
-    # 🔔 GLOBAL NOTIFICATION
-    if st.session_state.get("user_created"):
-        st.toast("✅ User berhasil dibuat", icon="🎉")
-        st.session_state.user_created = False
+    with col2:
+        c_logo, c_logout = st.columns([3, 1], vertical_alignment="center")
 
-with col2:
-    c_logo, c_logout = st.columns([3, 1], vertical_alignment="center")
+        with c_logo:
+            st.image("assets/cistech.png", width=220)
 
-    with c_logo:
-        st.image("assets/cistech.png", width=220)
+        with c_logout:
+            if st.button("Logout"):
+                api_post("/logout")
+                st.switch_page("app.py")
 
-    with c_logout:
-        if st.button("Logout"):
-            api_post("/logout")
-            st.switch_page("app.py")
+    st.divider()
 
-st.divider()
 
+    # ======================================================
+    # MODULE CONFIG
+    # ======================================================
+    MODULES = {
+        "🧍 User Management": [
+            "➕ Create User",
+            "📋 User List",
+            "✏️ Edit User",
+            "🔐 Reset Password",
+            "🗑️ Delete User",
+        ],
+        "🗂️ Leave & Attendance": [
+            "📊 Edit Saldo Cuti",
+            "📅 Holiday Calendar",
+            "⚙️ Change Off Rules",
+            "🧾 Manage Leave History",
+        ],
+        "✅ Approval Center": [
+            "✅ HR Leave Approval",
+            "📦 HR Change Off Final Approval",
+        ],
+        "🛡️ System & Audit": [
+            "📊 System Status",
+            "🕵️ Login Activity",
+            "🚨 June 30 Reset (Emergency)",
+            "🗄️ Archive Leave Data (FULL)"
+        ],
+    }
+
+    # ======================================================
+    # SESSION INIT
+    # ======================================================
+    if "hr_module" not in st.session_state:
+        st.session_state.hr_module = list(MODULES.keys())[0]
+
+    if "hr_menu" not in st.session_state:
+        st.session_state.hr_menu = MODULES[st.session_state.hr_module][0]
+
+    # ======================================================
+    # MODULE SELECT
+    # ======================================================
+    module = st.selectbox("📦 Module", MODULES.keys(), key="hr_module")
+
+    if st.session_state.hr_menu not in MODULES[module]:
+        st.session_state.hr_menu = MODULES[module][0]
+
+    menu = st.radio(
+        "📌 Menu",
+        MODULES[module],
+        key="hr_menu",
+        horizontal=True
+    )
 
-# ======================================================
-# MODULE CONFIG
-# ======================================================
-MODULES = {
-    "🧍 User Management": [
-        "➕ Create User",
-        "📋 User List",
-        "✏️ Edit User",
-        "🔐 Reset Password",
-        "🗑️ Delete User",
-    ],
-    "🗂️ Leave & Attendance": [
-        "📊 Edit Saldo Cuti",
-        "📅 Holiday Calendar",
-        "🧾 Manage Leave History",
-    ],
-    "✅ Approval Center": [
-        "✅ HR Leave Approval",
-        "📦 HR Change Off Final Approval",
-    ],
-    "🛡️ System & Audit": [
-        "📊 System Status",
-        "🕵️ Login Activity",
-        "🚨 June 30 Reset (Emergency)",
-        "🗄️ Archive Leave Data (FULL)"
-    ],
-}
+    st.divider()
 
-# ======================================================
-# SESSION INIT
-# ======================================================
-if "hr_module" not in st.session_state:
-    st.session_state.hr_module = list(MODULES.keys())[0]
+    # ======================================================
+    # COMMON DATA (hanya menu yang memilih / menampilkan user)
+    # ======================================================
+    profiler.mark("common data")
+    USER_MENUS = MODULES["🧍 User Management"] + ["📊 Edit Saldo Cuti"]
 
-if "hr_menu" not in st.session_state:
-    st.session_state.hr_menu = MODULES[st.session_state.hr_module][0]
+    if menu in USER_MENUS:
+        users = conn.execute("""
+            SELECT id, nik, name, email, role, division,
+                   join_date, permanent_date, manager_id
+            FROM users
+            ORDER BY name
+        """).fetchall()
 
-# ======================================================
-# MODULE SELECT
-# ======================================================
-module = st.selectbox("📦 Module", MODULES.keys(), key="hr_module")
+        user_map = {f"{u[2]} ({u[3]})": u[0] for u in users}
 
-if st.session_state.hr_menu not in MODULES[module]:
-    st.session_state.hr_menu = MODULES[module][0]
+        managers_by_division = get_managers_by_division(conn)
 
-menu = st.radio(
-    "📌 Menu",
-    MODULES[module],
-    key="hr_menu",
-    horizontal=True
-)
+    profiler.mark(f"menu: {menu}")
 
-st.divider()
+    # ======================================================
+    # ➕ CREATE USER
+    # ======================================================
+    if menu == "➕ Create User":
+        st.subheader("➕ Create User")
 
-# ======================================================
-# COMMON DATA
-# ======================================================
-users = conn.execute("""
-    SELECT id, nik, name, email, role, division,
-           join_date, permanent_date, manager_id
-    FROM users
-    ORDER BY name
-""").fetchall()
+        role = st.selectbox("Role", ["employee", "manager", "hr"])
+        division = st.selectbox("Division", DIVISIONS)
 
-user_map = {f"{u[2]} ({u[3]})": u[0] for u in users}
+        manager_id = None
+        if role == "employee":
+            available = managers_by_division.get(division, [])
+            if not available:
+                st.error(f"❌ Tidak ada manager untuk divisi {division}")
+                st.stop()
+
+            label = st.selectbox(
+                "Manager",
+                [m["label"] for m in available]
+            )
+            manager_id = next(m["id"] for m in available if m["label"] == label)
+
+        st.divider()
+
+        with st.form("create_user"):
+            nik = st.text_input("NIK")
+            name = st.text_input("Name")
+            email = st.text_input("Email")
+            join_date = st.date_input("Join Date")
+            permanent_date = st.date_input("Permanent Date")
+            password = st.text_input("Password", type="password")
+            submit = st.form_submit_button("Create User")
+
+        if submit:
+            if role == "employee" and not manager_id:
+                st.error("Employee wajib punya manager")
+                st.stop()
 
-DIVISIONS = [
-    "TSCM", "IC", "GA & PURCHASING",
-    "HR", "FINANCE", "WORKSHOP",
-    "SALES", "Back Office"
-]
+            conn.execute("""
+                INSERT INTO users
+                (nik,name,email,role,division,manager_id,join_date,permanent_date,password_hash)
+                VALUES (?,?,?,?,?,?,?,?,?)
+            """, (
+                nik, name, email, role, division,
+                manager_id,
+                join_date.isoformat(),
+                permanent_date.isoformat() if permanent_date else None,
+                hash_password(password)
+            ))
 
-managers_by_division = get_managers_by_division(conn)
+            uid = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
 
-# ======================================================
-# ➕ CREATE USER
-# ======================================================
-if menu == "➕ Create User":
-    st.subheader("➕ Create User")
+            conn.execute("""
+                INSERT INTO leave_balance
+                (user_id,last_year,current_year,change_off,sick_no_doc)
+                VALUES (?,0,0,0,0)
+            """, (uid,))
 
-    role = st.selectbox("Role", ["employee", "manager", "hr"])
-    division = st.selectbox("Division", DIVISIONS)
+            conn.commit()
 
-    manager_id = None
-    if role == "employee":
-        available = managers_by_division.get(division, [])
-        if not available:
-            st.error(f"❌ Tidak ada manager untuk divisi {division}")
-            st.stop()
+            # 🔔 SET NOTIFICATION FLAG
+            st.session_state.user_created = True
+            st.rerun()
 
-        label = st.selectbox(
-            "Manager",
-            [m["label"] for m in available]
-        )
-        manager_id = next(m["id"] for m in available if m["label"] == label)
+    elif menu == "📋 User List":
+        st.subheader("📋 User List")
+        st.dataframe([{
+            "NIK": u[1],
+            "Name": u[2],
+            "Email": u[3],
+            "Role": u[4],
+            "Division": u[5],
+            "Join Date": u[6],
+            "Permanent Date": u[7] or "-",
+        } for u in users], width="stretch")
 
-    st.divider()
+    elif menu == "✏️ Edit User":
+        st.subheader("✏️ Edit User")
 
-    with st.form("create_user"):
-        nik = st.text_input("NIK")
-        name = st.text_input("Name")
-        email = st.text_input("Email")
-        join_date = st.date_input("Join Date")
-        permanent_date = st.date_input("Permanent Date")
-        password = st.text_input("Password", type="password")
-        submit = st.form_submit_button("Create User")
-
-    if submit:
-        if role == "employee" and not manager_id:
-            st.error("Employee wajib punya manager")
-            st.stop()
+        uid = user_map[st.selectbox("Select User", user_map)]
+        u = next(x for x in users if x[0] == uid)
 
-        conn.execute("""
-            INSERT INTO users
-            (nik,name,email,role,division,manager_id,join_date,permanent_date,password_hash)
-            VALUES (?,?,?,?,?,?,?,?,?)
-        """, (
-            nik, name, email, role, division,
-            manager_id,
-            join_date.isoformat(),
-            permanent_date.isoformat() if permanent_date else None,
-            hash_password(password)
-        ))
-
-        uid = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
-
-        conn.execute("""
-            INSERT INTO leave_balance
-            (user_id,last_year,current_year,change_off,sick_no_doc)
-            VALUES (?,0,0,0,0)
-        """, (uid,))
-
-        conn.commit()
-
-        # 🔔 SET NOTIFICATION FLAG
-        st.session_state.user_created = True
-        st.rerun()
-
-elif menu == "📋 User List":
-    st.subheader("📋 User List")
-    st.dataframe([{
-        "NIK": u[1],
-        "Name": u[2],
-        "Email": u[3],
-        "Role": u[4],
-        "Division": u[5],
-        "Join Date": u[6],
-        "Permanent Date": u[7] or "-",
-    } for u in users], width="stretch")
-
-elif menu == "✏️ Edit User":
-    st.subheader("✏️ Edit User")
-
-    uid = user_map[st.selectbox("Select User", user_map)]
-    u = next(x for x in users if x[0] == uid)
-
-    managers_by_division = get_managers_by_division(conn)
-
-    with st.form("edit_user"):
-        nik = st.text_input("NIK", u[1])
-        name = st.text_input("Name", u[2])
-        email = st.text_input("Email", u[3])
-
-        role = st.selectbox(
-            "Role",
-            ["employee", "manager", "hr"],
-            index=["employee", "manager", "hr"].index(u[4])
-        )
+        managers_by_division = get_managers_by_division(conn)
 
-        division = st.selectbox(
-            "Division",
-            DIVISIONS,
-            index=DIVISIONS.index(u[5])
-        )
+        with st.form("edit_user"):
+            nik = st.text_input("NIK", u[1])
+            name = st.text_input("Name", u[2])
+            email = st.text_input("Email", u[3])
 
-        manager_id = None
+            role = st.selectbox(
+                "Role",
+                ["employee", "manager", "hr"],
+                index=["employee", "manager", "hr"].index(u[4])
+            )
 
-        # ✅ MANAGER HANYA UNTUK EMPLOYEE
-        if role == "employee":
-            available_managers = managers_by_division.get(division, [])
+            division = st.selectbox(
+                "Division",
+                DIVISIONS,
+                index=DIVISIONS.index(u[5])
+            )
 
-            if not available_managers:
-                st.warning(f"⚠️ Tidak ada manager untuk divisi {division}")
-            else:
-                # cari manager existing
-                current_label = next(
-                    (m["label"] for m in available_managers if m["id"] == u[8]),
-                    None
-                )
+            manager_id = None
 
-                manager_label = st.selectbox(
-                    "Manager",
-                    [m["label"] for m in available_managers],
-                    index=[m["label"] for m in available_managers].index(current_label)
-                    if current_label else 0
-                )
+            # ✅ MANAGER HANYA UNTUK EMPLOYEE
+            if role == "employee":
+                available_managers = managers_by_division.get(division, [])
+
+                if not available_managers:
+                    st.warning(f"⚠️ Tidak ada manager untuk divisi {division}")
+                else:
+                    # cari manager existing
+                    current_label = next(
+                        (m["label"] for m in available_managers if m["id"] == u[8]),
+                        None
+                    )
 
-                manager_id = next(
-                    m["id"] for m in available_managers
-                    if m["label"] == manager_label
-                )
+                    manager_label = st.selectbox(
+                        "Manager",
+                        [m["label"] for m in available_managers],
+                        index=[m["label"] for m in available_managers].index(current_label)
+                        if current_label else 0
+                    )
 
-        join_date = st.date_input(
-            "Join Date",
-            value=safe_date(u[6]),
-            min_value=date(1990, 1, 1),
-            max_value=date.today()
-        )
-        permanent_date = st.date_input(
-            "permanent_date",
-            value=safe_date(u[7]),
-            min_value=date(1990, 1, 1),
-            max_value=date.today()
-        )
+                    manager_id = next(
+                        m["id"] for m in available_managers
+                        if m["label"] == manager_label
+                    )
 
-        submit = st.form_submit_button("Update")
+            join_date = st.date_input(
+                "Join Date",
+                value=safe_date(u[6]),
+                min_value=date(1990, 1, 1),
+                max_value=date.today()
+            )
+            permanent_date = st.date_input(
+                "permanent_date",
+                value=safe_date(u[7]),
+                min_value=date(1990, 1, 1),
+                max_value=date.today()
+            )
+
+            submit = st.form_submit_button("Update")
+
+        if submit:
+            # 🔐 SAFETY: NON-EMPLOYEE TIDAK BOLEH PUNYA MANAGER
+            if role != "employee":
+                manager_id = None
 
-    if submit:
-        # 🔐 SAFETY: NON-EMPLOYEE TIDAK BOLEH PUNYA MANAGER
-        if role != "employee":
-            manager_id = None
+            conn.execute("""
+                UPDATE users
+                SET nik=?, name=?, email=?, role=?, division=?,
+                    manager_id=?, join_date=?, permanent_date=?
+                WHERE id=?
+            """, (
+                nik,
+                name,
+                email,
+                role,
+                division,
+                manager_id,
+                join_date.isoformat(),
+                permanent_date.isoformat() if permanent_date else None,
+                uid
+            ))
 
-        conn.execute("""
-            UPDATE users
-            SET nik=?, name=?, email=?, role=?, division=?,
-                manager_id=?, join_date=?, permanent_date=?
-            WHERE id=?
-        """, (
-            nik,
-            name,
-            email,
-            role,
-            division,
-            manager_id,
-            join_date.isoformat(),
-            permanent_date.isoformat() if permanent_date else None,
-            uid
-        ))
-
-        conn.commit()
-        st.success("✅ User updated")
-        st.rerun()
-
-
-elif menu == "🔐 Reset Password":
-    st.subheader("🔐 Reset Password")
-    uid = user_map[st.selectbox("Select User", user_map)]
-    p1 = st.text_input("New Password", type="password")
-    p2 = st.text_input("Confirm Password", type="password")
-    if st.button("Reset"):
-        if p1 and p1 == p2:
-            conn.execute("UPDATE users SET password_hash=? WHERE id=?",
-                         (hash_password(p1),uid))
-            conn.commit()
-            st.success("Password reset")
-        else:
-            st.error("Invalid password")
-
-elif menu == "🗑️ Delete User":
-    st.subheader("🗑️ Delete User")
-    uid = user_map[st.selectbox("Select User", user_map)]
-    if st.checkbox("I understand this action is permanent"):
-        if st.button("DELETE USER"):
-            conn.execute("DELETE FROM users WHERE id=?",(uid,))
             conn.commit()
-            st.success("Deleted")
+            st.success("✅ User updated")
             st.rerun()
 
-# ======================================================
-# LEAVE & ATTENDANCE
-# ======================================================
-elif menu == "📊 Edit Saldo Cuti":
-    st.subheader("📊 Edit Saldo Cuti")
-    uid = user_map[st.selectbox("Select User", user_map)]
-    bal = conn.execute("""
-        SELECT last_year,current_year,change_off,sick_no_doc
-        FROM leave_balance WHERE user_id=?
-    """,(uid,)).fetchone()
-
-    with st.form("balance"):
-        ly = st.number_input("Last Year", value=bal[0])
-        cy = st.number_input("Current Year", value=bal[1])
-        co = st.number_input("Change Off", value=float(bal[2]), step=0.5)
-        sick = st.number_input("Sick (No Doc)", value=bal[3], max_value=6)
-        if st.form_submit_button("Update"):
-            conn.execute("""
-                UPDATE leave_balance SET last_year=?,current_year=?,change_off=?,sick_no_doc=?
-                WHERE user_id=?
-            """,(ly,cy,co,sick,uid))
-            conn.commit()
-            st.success("Updated")
-            st.rerun()
 
-# ======================================================
-# 7. HOLIDAY CALENDAR
-# ======================================================
-elif menu == "📅 Holiday Calendar":
-    st.subheader("📅 Holiday Calendar")
-
-    with st.form("add_holiday"):
-        h_date = st.date_input("Holiday Date")
-        desc = st.text_input("Description")
-        submit = st.form_submit_button("Add Holiday")
-
-    if submit:
-        conn.execute("""
-            INSERT OR IGNORE INTO holidays (holiday_date, description)
-            VALUES (?,?)
-        """,(h_date.isoformat(),desc))
-        conn.commit()
-        st.success("Holiday added")
-        st.rerun()
-
-    rows = conn.execute("""
-        SELECT id,holiday_date,description
-        FROM holidays ORDER BY holiday_date
-    """).fetchall()
-
-    if not rows:
-        st.info("No holidays defined")
-    else:
-        for hid,hdate,desc in rows:
-            with st.expander(f"{hdate} — {desc}"):
-                new_desc = st.text_input("Description",desc,key=f"d_{hid}")
-                if st.button("Update",key=f"u_{hid}"):
-                    conn.execute(
-                        "UPDATE holidays SET description=? WHERE id=?",
-                        (new_desc,hid)
-                    )
-                    conn.commit()
-                    st.rerun()
+    elif menu == "🔐 Reset Password":
+        st.subheader("🔐 Reset Password")
+        uid = user_map[st.selectbox("Select User", user_map)]
+        p1 = st.text_input("New Password", type="password")
+        p2 = st.text_input("Confirm Password", type="password")
+        if st.button("Reset"):
+            if p1 and p1 == p2:
+                conn.execute("UPDATE users SET password_hash=? WHERE id=?",
+                             (hash_password(p1),uid))
+                conn.commit()
+                st.success("Password reset")
+            else:
+                st.error("Invalid password")
+
+    elif menu == "🗑️ Delete User":
+        st.subheader("🗑️ Delete User")
+        uid = user_map[st.selectbox("Select User", user_map)]
+        if st.checkbox("I understand this action is permanent"):
+            if st.button("DELETE USER"):
+                conn.execute("DELETE FROM users WHERE id=?",(uid,))
+                conn.commit()
+                st.success("Deleted")
+                st.rerun()
 
-                if st.button("Delete",key=f"x_{hid}"):
-                    conn.execute("DELETE FROM holidays WHERE id=?",(hid,))
-                    conn.commit()
-                    st.rerun()
+    # ======================================================
+    # LEAVE & ATTENDANCE
+    # ======================================================
+    elif menu == "📊 Edit Saldo Cuti":
+        st.subheader("📊 Edit Saldo Cuti")
+        uid = user_map[st.selectbox("Select User", user_map)]
+        bal = conn.execute("""
+            SELECT last_year,current_year,change_off,sick_no_doc
+            FROM leave_balance WHERE user_id=?
+        """,(uid,)).fetchone()
+
+        with st.form("balance"):
+            ly = st.number_input("Last Year", value=bal[0])
+            cy = st.number_input("Current Year", value=bal[1])
+            co = st.number_input("Change Off", value=float(bal[2]), step=0.5)
+            sick = st.number_input("Sick (No Doc)", value=bal[3], max_value=6)
+            if st.form_submit_button("Update"):
+                conn.execute("""
+                    UPDATE leave_balance SET last_year=?,current_year=?,change_off=?,sick_no_doc=?
+                    WHERE user_id=?
+                """,(ly,cy,co,sick,uid))
+                conn.commit()
+                st.success("Updated")
+                st.rerun()
 
-# ======================================================
-# 8. HR FINAL LEAVE APPROVAL (🔥 POTONG SALDO)
-# ======================================================
-elif menu == "✅ HR Leave Approval":
-    st.subheader("✅ HR Final Leave Approval")
-
-    rows = conn.execute("""
-        SELECT lr.id,u.name,lr.leave_type,lr.start_date,lr.end_date,
-               lr.total_days,lr.reason,lr.user_id
-        FROM leave_requests lr
-        JOIN users u ON u.id=lr.user_id
-        WHERE lr.status='manager_approved'
-        ORDER BY lr.created_at
-    """).fetchall()
-
-    if not rows:
-        st.info("No pending leave approvals")
-    else:
-        for r in rows:
-            leave_id,name,typ,s,e,days,reason,uid = r
-            with st.expander(f"{name} | {typ} | {days} day(s)"):
-                st.write(f"{s} → {e}")
-                st.write(reason or "-")
-
-                action = st.radio(
-                    "Action",
-                    ["Approve","Reject"],
-                    key=f"a_{leave_id}",
-                    horizontal=True
-                )
-                note = st.text_area(
-                    "Reject Reason",
-                    key=f"r_{leave_id}"
-                ) if action=="Reject" else None
-
-                if st.button("Submit",key=f"s_{leave_id}"):
-                    try:
-                        conn.execute("BEGIN")
-
-                        if action=="Approve":
-                            bal = conn.execute("""
-                                SELECT last_year,current_year,change_off,sick_no_doc
-                                FROM leave_balance WHERE user_id=?
-                            """,(uid,)).fetchone()
-
-                            ly,cy,co,sick = bal
-                            remaining = float(days)
-
-                            if typ=="Personal Leave":
-                                use = min(ly,remaining)
-                                ly -= use
-                                remaining -= use
-                                use = min(cy,remaining)
-                                cy -= use
-                                remaining -= use
-                                if remaining>0:
-                                    raise Exception("Insufficient leave balance")
-
-                            elif typ=="Change Off":
-                                if co < remaining:
-                                    raise Exception("Insufficient CO balance")
-                                co -= remaining
-
-                            elif typ=="Sick (No Doc)":
-                                if sick + remaining > 6:
-                                    raise Exception("Sick limit exceeded")
-                                sick += remaining
+    # ======================================================
+    # 7. HOLIDAY CALENDAR
+    # ======================================================
+    elif menu == "📅 Holiday Calendar":
+        st.subheader("📅 Holiday Calendar")
 
-                            conn.execute("""
-                                UPDATE leave_balance
-                                SET last_year=?,current_year=?,change_off=?,sick_no_doc=?,updated_at=DATE('now')
-                                WHERE user_id=?
-                            """,(ly,cy,co,sick,uid))
+        with st.form("add_holiday"):
+            h_date = st.date_input("Holiday Date")
+            desc = st.text_input("Description")
+            submit = st.form_submit_button("Add Holiday")
 
-                            conn.execute("""
-                                UPDATE leave_requests
-                                SET status='hr_approved',
-                                    approved_by=?,
-                                    approved_at=CURRENT_TIMESTAMP
-                                WHERE id=?
-                            """,(hr_id,leave_id))
+        if submit:
+            add_holiday(conn, h_date, desc)
+            st.success("Holiday added")
+            st.rerun()
 
-                        else:
-                            conn.execute("""
-                                UPDATE leave_requests
-                                SET status='hr_rejected',
-                                    approved_by=?,
-                                    approved_at=CURRENT_TIMESTAMP,
-                                    reason=?
-                                WHERE id=?
-                            """,(hr_id,note or "-",leave_id))
+        rows = conn.execute("""
+            SELECT id,holiday_date,description
+            FROM holidays ORDER BY holiday_date
+        """).fetchall()
 
-                        conn.commit()
-                        st.success("Leave processed")
+        if not rows:
+            st.info("No holidays defined")
+        else:
+            for hid,hdate,desc in rows:
+                with st.expander(f"{hdate} — {desc}"):
+                    new_desc = st.text_input("Description",desc,key=f"d_{hid}")
+                    if st.button("Update",key=f"u_{hid}"):
+                        update_holiday(conn, hid, new_desc)
                         st.rerun()
 
-                    except Exception as e:
-                        conn.rollback()
-                        st.error(str(e))
-
-# ======================================================
-# 9. HR FINAL CHANGE OFF APPROVAL
-# ======================================================
-elif menu == "📦 HR Change Off Final Approval":
-    st.subheader("📦 HR Final Change Off Approval")
-
-    rows = conn.execute("""
-        SELECT c.id,u.name,c.work_date,c.start_date,c.end_date,
-               c.co_days,c.description,c.attachment,c.user_id
-        FROM change_off_claims c
-        JOIN users u ON u.id=c.user_id
-        WHERE c.status='manager_approved'
-        ORDER BY c.created_at
-    """).fetchall()
-
-    if not rows:
-        st.info("No pending Change Off approvals")
-    else:
-        for r in rows:
-            cid,name,wdate,sdate,edate,co_days,desc,attach,uid = r
-            period = wdate or f"{sdate} → {edate}"
-
-            with st.expander(f"{name} | {period} | CO {co_days}"):
-                st.write(desc or "-")
-
-                if attach:
-                    if st.checkbox("Preview Attachment",key=f"p_{cid}"):
-                        from utils.pdf_preview import preview_pdf
-                        preview_pdf(attach)
-
-                if st.button("Approve",key=f"ok_{cid}"):
-                    try:
-                        conn.execute("BEGIN")
-
-                        conn.execute("""
-                            UPDATE leave_balance
-                            SET change_off = ROUND(change_off + ?,2),
-                                updated_at=DATE('now')
-                            WHERE user_id=?
-                        """,(co_days,uid))
-
-                        conn.execute("""
-                            UPDATE change_off_claims
-                            SET status='hr_approved',
-                                approved_by=?,
-                                approved_at=CURRENT_TIMESTAMP
-                            WHERE id=?
-                        """,(hr_id,cid))
-
-                        conn.commit()
-                        st.success("Change Off approved")
+                    if st.button("Delete",key=f"x_{hid}"):
+                        delete_holiday(conn, hid)
                         st.rerun()
 
-                    except Exception as e:
-                        conn.rollback()
-                        st.error(str(e))
+    # ======================================================
+    # 7b. CHANGE OFF RULES (VERSIONED)
+    # ======================================================
+    elif menu == "⚙️ Change Off Rules":
+        import pandas as pd
 
-# ======================================================
-# 10. MANAGE LEAVE HISTORY
-# ======================================================
-elif menu == "🧾 Manage Leave History":
-    rows = conn.execute("""
-        SELECT lr.id,u.name,lr.leave_type,lr.start_date,lr.end_date,
-               lr.total_days,lr.status,lr.created_at
-        FROM leave_requests lr
-        JOIN users u ON u.id=lr.user_id
-        ORDER BY lr.created_at DESC
-    """).fetchall()
-
-    st.dataframe([{
-        "ID":r[0],
-        "Employee":r[1],
-        "Type":r[2],
-        "Start":r[3],
-        "End":r[4],
-        "Days":r[5],
-        "Status":r[6],
-        "Created":r[7]
-    } for r in rows], width="stretch")
+        st.subheader("⚙️ Change Off Rules")
 
-# ======================================================
-elif menu == "🕵️ Login Activity":
-    st.subheader("🕵️ Login Activity Log")
-
-    rows = conn.execute("""
-        SELECT
-            l.created_at,
-            u.name,
-            l.email,
-            l.role,
-            l.action,
-            l.ip_address
-        FROM auth_logs l
-        LEFT JOIN users u ON u.id = l.user_id
-        ORDER BY l.created_at DESC
-        LIMIT 500
-    """).fetchall()
-
-    if not rows:
-        st.info("No login activity found")
-    else:
-        import pandas as pd
-        from datetime import datetime
-        import pytz
-
-        utc = pytz.utc
-        wib = pytz.timezone("Asia/Jakarta")
-
-        formatted = []
-        for r in rows:
-            utc_time = datetime.fromisoformat(r[0])
-            local_time = utc.localize(utc_time).astimezone(wib)
-
-            formatted.append((
-                local_time.strftime("%Y-%m-%d %H:%M:%S"),
-                r[1] or "-",        # Name
-                r[2] or "-",        # Email
-                r[3] or "-",        # Role
-                r[4].upper(),       # Action
-                r[5] or "-"         # IP Address
-            ))
+        active = get_active_rules()
+        st.caption(
+            f"Versi aktif: v{active.version}. Perubahan disimpan sebagai versi "
+            "baru; klaim lama tetap mencatat versi yang dipakai saat dihitung."
+        )
+        st.caption(
+            "component: base / travel / standby · day_type: weekday / weekend / "
+            "holiday · hours_bucket: le12 / gt12 · travel_slot: before_noon / "
+            "after_noon · isi * untuk semua. Baris paling spesifik yang dipakai."
+        )
 
-        df = pd.DataFrame(
-            formatted,
-            columns=[
-                "Time (WIB)",
-                "Name",
-                "Email",
-                "Role",
-                "Action",
-                "IP Address"
-            ]
+        rules_df = pd.DataFrame(
+            get_rules(conn, active.version), columns=list(RULE_COLUMNS)
+        )
+        edited = st.data_editor(
+            rules_df,
+            num_rows="dynamic",
+            hide_index=True,
+            key=f"co_rules_editor_v{active.version}"
         )
 
-        st.dataframe(df, width="stretch")
+        note = st.text_input("Catatan perubahan", key="co_rules_note")
+        if st.button("💾 Simpan sebagai versi baru"):
+            rows = [
+                tuple(r) for r in edited.dropna(how="all")
+                .fillna({"work_type": "*", "day_type": "*",
+                         "hours_bucket": "*", "travel_slot": "*"})
+                .itertuples(index=False)
+            ]
+            try:
+                version = save_rule_version(conn, rows, note or "-", hr_id)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.success(f"Aturan v{version} aktif")
+                st.rerun()
 
-elif menu == "🚨 June 30 Reset (Emergency)":
-    st.subheader("🚨 June 30 Leave Reset")
+        st.markdown("### 🕘 Riwayat Versi")
+        history = conn.execute("""
+            SELECT v.version, v.note, u.name, v.created_at, v.is_active
+            FROM co_rule_versions v
+            LEFT JOIN users u ON u.id = v.created_by
+            ORDER BY v.version DESC
+        """).fetchall()
+
+        st.dataframe(
+            pd.DataFrame(
+                history,
+                columns=["Version", "Note", "Created By", "Created At", "Active"]
+            ),
+            hide_index=True
+        )
 
-    st.warning("""
-    ⚠️ Digunakan hanya jika:
-    - Auto reset gagal
-    - Atas persetujuan manajemen
-    """)
+    # ======================================================
+    # 8. HR FINAL LEAVE APPROVAL (🔥 POTONG SALDO)
+    # ======================================================
+    elif menu == "✅ HR Leave Approval":
+        st.subheader("✅ HR Final Leave Approval")
 
-    confirm = st.checkbox("Saya memahami tindakan ini tidak bisa dibatalkan")
+        rows = conn.execute(queries.HR_LEAVE_QUEUE).fetchall()
 
-    if confirm and st.button("EXECUTE JUNE 30 RESET"):
-        from core.leave_reset import run_june_30_reset
+        if not rows:
+            st.info("No pending leave approvals")
+        else:
+            for r in rows:
+                leave_id,name,typ,s,e,days,reason,uid = r
+                with st.expander(f"{name} | {typ} | {days} day(s)"):
+                    st.write(f"{s} → {e}")
+                    st.write(reason or "-")
+
+                    action = st.radio(
+                        "Action",
+                        ["Approve","Reject"],
+                        key=f"a_{leave_id}",
+                        horizontal=True
+                    )
+                    note = st.text_area(
+                        "Reject Reason",
+                        key=f"r_{leave_id}"
+                    ) if action=="Reject" else None
+
+                    if st.button("Submit",key=f"s_{leave_id}"):
+                        try:
+                            conn.execute("BEGIN")
+
+                            if action=="Approve":
+                                bal = conn.execute("""
+                                    SELECT last_year,current_year,change_off,sick_no_doc
+                                    FROM leave_balance WHERE user_id=?
+                                """,(uid,)).fetchone()
+
+                                ly,cy,co,sick = bal
+                                remaining = float(days)
+
+                                if typ=="Personal Leave":
+                                    use = min(ly,remaining)
+                                    ly -= use
+                                    remaining -= use
+                                    use = min(cy,remaining)
+                                    cy -= use
+                                    remaining -= use
+                                    if remaining>0:
+                                        raise Exception("Insufficient leave balance")
+
+                                elif typ=="Change Off":
+                                    if co < remaining:
+                                        raise Exception("Insufficient CO balance")
+                                    co -= remaining
+
+                                elif typ=="Sick (No Doc)":
+                                    if sick + remaining > 6:
+                                        raise Exception("Sick limit exceeded")
+                                    sick += remaining
+
+                                conn.execute("""
+                                    UPDATE leave_balance
+                                    SET last_year=?,current_year=?,change_off=?,sick_no_doc=?,updated_at=DATE('now')
+                                    WHERE user_id=?
+                                """,(ly,cy,co,sick,uid))
+
+                                conn.execute("""
+                                    UPDATE leave_requests
+                                    SET status='hr_approved',
+                                        approved_by=?,
+                                        approved_at=CURRENT_TIMESTAMP
+                                    WHERE id=?
+                                """,(hr_id,leave_id))
+
+                            else:
+                                conn.execute("""
+                                    UPDATE leave_requests
+                                    SET status='hr_rejected',
+                                        approved_by=?,
+                                        approved_at=CURRENT_TIMESTAMP,
+                                        reason=?
+                                    WHERE id=?
+                                """,(hr_id,note or "-",leave_id))
+
+                            conn.commit()
+                            st.success("Leave processed")
+                            st.rerun()
+
+                        except Exception as e:
+                            conn.rollback()
+                            st.error(str(e))
+
+    # ======================================================
+    # 9. HR FINAL CHANGE OFF APPROVAL
+    # ======================================================
+    elif menu == "📦 HR Change Off Final Approval":
+        st.subheader("📦 HR Final Change Off Approval")
+
+        rows = conn.execute(queries.HR_CO_QUEUE).fetchall()
+
+        if not rows:
+            st.info("No pending Change Off approvals")
+        else:
+            for r in rows:
+                cid,name,wdate,sdate,edate,co_days,desc,attach,uid = r
+                period = wdate or f"{sdate} → {edate}"
 
-        ok, msg = run_june_30_reset(executed_by=hr_id)
+                with st.expander(f"{name} | {period} | CO {co_days}"):
+                    st.write(desc or "-")
 
-        if ok:
-            st.success(msg)
-        else:
-            st.error(msg)
+                    if attach:
+                        if st.checkbox("Preview Attachment",key=f"p_{cid}"):
+                            from utils.pdf_preview import preview_pdf
+                            preview_pdf(attach)
 
-elif menu == "📊 System Status":
-    st.subheader("📊 Leave System Status")
+                    if st.button("Approve",key=f"ok_{cid}"):
+                        try:
+                            conn.execute("BEGIN")
 
-    from datetime import date
-    today = date.today()
-    year = today.year
-    month = today.month
+                            conn.execute("""
+                                UPDATE leave_balance
+                                SET change_off = ROUND(change_off + ?,2),
+                                    updated_at=DATE('now')
+                                WHERE user_id=?
+                            """,(co_days,uid))
 
-    # =========================
-    # SYSTEM INFO
-    # =========================
-    c1, c2, c3 = st.columns(3)
-    c1.metric("Today", today.isoformat())
-    c2.metric("Leave Cycle", "1 July – 30 June")
-    c3.metric("Current Year", year)
+                            conn.execute("""
+                                UPDATE change_off_claims
+                                SET status='hr_approved',
+                                    approved_by=?,
+                                    approved_at=CURRENT_TIMESTAMP
+                                WHERE id=?
+                            """,(hr_id,cid))
+
+                            conn.commit()
+                            st.success("Change Off approved")
+                            st.rerun()
+
+                        except Exception as e:
+                            conn.rollback()
+                            st.error(str(e))
+
+    # ======================================================
+    # 10. MANAGE LEAVE HISTORY
+    # ======================================================
+    elif menu == "🧾 Manage Leave History":
+        # Per halaman lewat data API (keyset), bukan SELECT semua request
+        PAGE_SIZE = 100
+
+        if "leave_history_cursors" not in st.session_state:
+            st.session_state.leave_history_cursors = [None]
+        cursors = st.session_state.leave_history_cursors
+
+        # ETag + body terakhir per cursor: rerun karena klik widget cukup
+        # kirim If-None-Match, halaman yang tidak berubah dijawab 304
+        if "leave_history_pages" not in st.session_state:
+            st.session_state.leave_history_pages = {}
+        cached = st.session_state.leave_history_pages.get(cursors[-1])
+
+        r = api_get(
+            "/api/leave-requests",
+            params={
+                "limit": PAGE_SIZE,
+                "after": cursors[-1],
+                "fields": "id,employee_name,leave_type,start_date,end_date,"
+                          "total_days,status,created_at",
+            },
+            headers={"If-None-Match": cached[0]} if cached else None,
+        )
+        if r.status_code == 304 and cached:
+            page = cached[1]
+        elif r.status_code == 200:
+            page = r.json()
+            if r.headers.get("ETag"):
+                st.session_state.leave_history_pages[cursors[-1]] = (
+                    r.headers["ETag"], page
+                )
+        else:
+            st.error("Gagal memuat leave history")
+            st.stop()
 
-    st.divider()
+        st.dataframe([{
+            "ID":x["id"],
+            "Employee":x["employee_name"],
+            "Type":x["leave_type"],
+            "Start":x["start_date"],
+            "End":x["end_date"],
+            "Days":x["total_days"],
+            "Status":x["status"],
+            "Created":x["created_at"]
+        } for x in page["items"]], width="stretch")
+
+        c1, c2, c3 = st.columns([1, 1, 4])
+        with c1:
+            if st.button("⬅️ Newer", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with c2:
+            if st.button("Older ➡️", disabled=page["next"] is None):
+                cursors.append(page["next"])
+                st.rerun()
+        with c3:
+            st.caption(f"Halaman {len(cursors)}")
 
-    # =========================
-    # MONTHLY ACCRUAL STATUS
-    # =========================
-    st.markdown("### 🟢 Monthly Accrual Status")
-
-    # eligible employees
-    eligible = conn.execute("""
-        SELECT COUNT(*)
-        FROM users
-        WHERE permanent_date IS NOT NULL
-        AND join_date <= DATE('now', '-1 month')
-    """).fetchone()[0]
-
-    # accrual log bulan ini
-    accrual = conn.execute("""
-        SELECT COUNT(*), MAX(executed_at)
-        FROM accrual_logs
-        WHERE year = ? AND month = ?
-    """, (year, month)).fetchone()
-
-    accrued_count = accrual[0] or 0
-    last_run = accrual[1]
-
-    if accrued_count == 0:
-        status = "❌ NOT RUN"
-    elif accrued_count < eligible:
-        status = f"⚠️ PARTIAL ({eligible - accrued_count} missing)"
-    else:
-        status = "✅ DONE"
-
-    c1, c2, c3 = st.columns(3)
-    c1.metric("Eligible Employee", eligible)
-    c2.metric("Accrued This Month", accrued_count)
-    c3.metric("Status", status)
-
-    if last_run:
-        st.caption(f"Last run at: {last_run}")
+    # ======================================================
+    elif menu == "🕵️ Login Activity":
+        st.subheader("🕵️ Login Activity Log")
 
-    st.divider()
+        rows = conn.execute(queries.LOGIN_ACTIVITY).fetchall()
 
-    # =========================
-    # ANNUAL RESET STATUS (30 JUNE)
-    # =========================
-    st.markdown("### 🔴 Annual Reset Status (30 June)")
-
-    reset = conn.execute("""
-        SELECT year, executed_by, executed_at
-        FROM leave_reset_logs
-        WHERE year = ?
-    """, (year,)).fetchone()
-
-    if today < date(year, 6, 30):
-        reset_status = "ℹ️ UPCOMING"
-    elif not reset:
-        reset_status = "🚨 ACTION REQUIRED"
-    else:
-        reset_status = "✅ DONE"
-
-    executor = "-"
-    executed_at = "-"
-
-    if reset:
-        if reset[1] == 0:
-            executor = "SYSTEM"
+        if not rows:
+            st.info("No login activity found")
         else:
-            u = conn.execute(
-                "SELECT name FROM users WHERE id=?",
-                (reset[1],)
-            ).fetchone()
-            executor = u[0] if u else "Unknown"
+            import pandas as pd
+            from datetime import datetime
+            import pytz
+
+            utc = pytz.utc
+            wib = pytz.timezone("Asia/Jakarta")
+
+            formatted = []
+            for r in rows:
+                utc_time = datetime.fromisoformat(r[0])
+                local_time = utc.localize(utc_time).astimezone(wib)
+
+                formatted.append((
+                    local_time.strftime("%Y-%m-%d %H:%M:%S"),
+                    r[1] or "-",        # Name
+                    r[2] or "-",        # Email
+                    r[3] or "-",        # Role
+                    r[4].upper(),       # Action
+                    r[5] or "-"         # IP Address
+                ))
+
+            df = pd.DataFrame(
+                formatted,
+                columns=[
+                    "Time (WIB)",
+                    "Name",
+                    "Email",
+                    "Role",
+                    "Action",
+                    "IP Address"
+                ]
+            )
 
-        executed_at = reset[2]
+            st.dataframe(df, width="stretch")
 
-    c1, c2, c3 = st.columns(3)
-    c1.metric("Reset Status", reset_status)
-    c2.metric("Executed By", executor)
-    c3.metric("Executed At", executed_at)
+    elif menu == "🚨 June 30 Reset (Emergency)":
+        st.subheader("🚨 June 30 Leave Reset")
 
-    # =========================
-    # EMERGENCY ACTION
-    # =========================
-    if reset_status == "🚨 ACTION REQUIRED":
-        st.warning("⚠️ Annual reset has not been executed yet")
+        st.warning("""
+        ⚠️ Digunakan hanya jika:
+        - Auto reset gagal
+        - Atas persetujuan manajemen
+        """)
 
-        confirm = st.checkbox("I understand this action cannot be undone")
+        confirm = st.checkbox("Saya memahami tindakan ini tidak bisa dibatalkan")
 
         if confirm and st.button("EXECUTE JUNE 30 RESET"):
             from core.leave_reset import run_june_30_reset
@@ -807,77 +766,422 @@ elif menu == "📊 System Status":
 
             if ok:
                 st.success(msg)
-                st.rerun()
             else:
                 st.error(msg)
 
-elif menu == "🗄️ Archive Leave Data (FULL)":
-    st.subheader("🗄️ Full Archive Leave Data Tahunan")
+    elif menu == "📊 System Status":
+        st.subheader("📊 Leave System Status")
+
+        from datetime import date
+        today = date.today()
+        year = today.year
+        month = today.month
+
+        # =========================
+        # SYSTEM INFO
+        # =========================
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Today", today.isoformat())
+        c2.metric("Leave Cycle", "1 July – 30 June")
+        c3.metric("Current Year", year)
+
+        st.divider()
+
+        # =========================
+        # MONTHLY ACCRUAL STATUS
+        # =========================
+        st.markdown("### 🟢 Monthly Accrual Status")
+
+        # eligible employees
+        eligible = conn.execute("""
+            SELECT COUNT(*)
+            FROM users
+            WHERE permanent_date IS NOT NULL
+            AND join_date <= DATE('now', '-1 month')
+        """).fetchone()[0]
+
+        # accrual log bulan ini
+        accrual = conn.execute("""
+            SELECT COUNT(*), MAX(executed_at)
+            FROM accrual_logs
+            WHERE year = ? AND month = ?
+        """, (year, month)).fetchone()
+
+        accrued_count = accrual[0] or 0
+        last_run = accrual[1]
+
+        if accrued_count == 0:
+            status = "❌ NOT RUN"
+        elif accrued_count < eligible:
+            status = f"⚠️ PARTIAL ({eligible - accrued_count} missing)"
+        else:
+            status = "✅ DONE"
+
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Eligible Employee", eligible)
+        c2.metric("Accrued This Month", accrued_count)
+        c3.metric("Status", status)
 
-    current_year = date.today().year
+        if last_run:
+            st.caption(f"Last run at: {last_run}")
 
-    year = st.selectbox(
-        "Pilih Tahun yang akan ditutup",
-        list(range(current_year, 2019, -1))
-    )
+        st.divider()
 
-    total = conn.execute("""
-        SELECT COUNT(*)
-        FROM leave_requests
-        WHERE strftime('%Y', start_date) = ?
-    """, (str(year),)).fetchone()[0]
+        # =========================
+        # ANNUAL RESET STATUS (30 JUNE)
+        # =========================
+        st.markdown("### 🔴 Annual Reset Status (30 June)")
 
-    st.info(f"📦 Total leave request tahun {year}: **{total} record**")
+        reset = conn.execute("""
+            SELECT year, executed_by, executed_at
+            FROM leave_reset_logs
+            WHERE year = ?
+        """, (year,)).fetchone()
 
-    if year == current_year:
-        st.warning("⚠️ Ini adalah TAHUN BERJALAN")
+        if today < date(year, 6, 30):
+            reset_status = "ℹ️ UPCOMING"
+        elif not reset:
+            reset_status = "🚨 ACTION REQUIRED"
+        else:
+            reset_status = "✅ DONE"
 
-    st.error("""
-    ⚠️ SEMUA status akan di-archive:
-    - submitted
-    - manager_approved
-    - manager_rejected
-    - hr_approved
-    - hr_rejected
+        executor = "-"
+        executed_at = "-"
 
-    Tindakan ini TIDAK bisa dibatalkan
-    """)
+        if reset:
+            if reset[1] == 0:
+                executor = "SYSTEM"
+            else:
+                u = conn.execute(
+                    "SELECT name FROM users WHERE id=?",
+                    (reset[1],)
+                ).fetchone()
+                executor = u[0] if u else "Unknown"
 
-    confirm1 = st.checkbox("Saya memahami semua request akan ditutup")
-    confirm2 = st.checkbox("Saya bertanggung jawab penuh")
+            executed_at = reset[2]
 
-    if confirm1 and confirm2 and st.button("🔒 ARCHIVE SEMUA DATA"):
-        try:
-            conn.execute("BEGIN")
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Reset Status", reset_status)
+        c2.metric("Executed By", executor)
+        c3.metric("Executed At", executed_at)
 
-            conn.execute("""
-                INSERT INTO leave_requests_archive
-                SELECT *,
-                       CURRENT_TIMESTAMP,
-                       ?,
-                       'FULL YEAR ARCHIVE'
-                FROM leave_requests
-                WHERE strftime('%Y', start_date) = ?
-            """, (hr_id, str(year)))
+        # =========================
+        # EMERGENCY ACTION
+        # =========================
+        if reset_status == "🚨 ACTION REQUIRED":
+            st.warning("⚠️ Annual reset has not been executed yet")
 
-            conn.execute("""
-                DELETE FROM leave_requests
-                WHERE strftime('%Y', start_date) = ?
-            """, (str(year),))
+            confirm = st.checkbox("I understand this action cannot be undone")
 
-            conn.execute("""
-                INSERT INTO archive_logs (year,total_rows,archived_by)
-                VALUES (?,?,?)
-            """, (year, total, hr_id))
+            if confirm and st.button("EXECUTE JUNE 30 RESET"):
+                from core.leave_reset import run_june_30_reset
 
-            conn.commit()
-            st.success(f"✅ Tahun {year} berhasil di-archive")
+                ok, msg = run_june_30_reset(executed_by=hr_id)
+
+                if ok:
+                    st.success(msg)
+                    st.rerun()
+                else:
+                    st.error(msg)
+
+        st.divider()
+
+        # =========================
+        # LEAVE ENGINE SCHEDULER
+        # =========================
+        st.markdown("### ⚙️ Leave Engine Runs")
+
+        runs = conn.execute("""
+            SELECT started_at, job, period, run_date, status, message, duration_ms
+            FROM engine_runs
+            ORDER BY id DESC
+            LIMIT 20
+        """).fetchall()
+
+        if not runs:
+            st.info("Scheduler belum pernah jalan (python -m scripts.run_scheduler)")
+        else:
+            st.dataframe([{
+                "Started": r[0],
+                "Job": r[1],
+                "Period": r[2],
+                "Run Date": r[3],
+                "Status": r[4].upper(),
+                "Message": r[5] or "-",
+                "Duration (ms)": r[6],
+            } for r in runs], width="stretch")
+
+        st.divider()
+
+        # =========================
+        # EMAIL OUTBOX
+        # =========================
+        st.markdown("### 📬 Email Outbox")
+
+        from core.outbox import retry_failed
+
+        counts = dict(conn.execute("""
+            SELECT status, COUNT(*) FROM email_outbox GROUP BY status
+        """).fetchall())
+        oldest = conn.execute("""
+            SELECT MIN(created_at) FROM email_outbox WHERE status IN ('pending', 'sending')
+        """).fetchone()[0]
+
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Pending", counts.get("pending", 0) + counts.get("sending", 0))
+        c2.metric("Sent", counts.get("sent", 0))
+        c3.metric("Failed", counts.get("failed", 0))
+        c4.metric("Oldest Pending (UTC)", oldest or "-")
+
+        problems = conn.execute("""
+            SELECT id, to_email, subject, status, attempts, next_attempt_at, last_error
+            FROM email_outbox
+            WHERE last_error IS NOT NULL AND status != 'sent'
+            ORDER BY id DESC
+            LIMIT 20
+        """).fetchall()
+
+        if problems:
+            st.dataframe([{
+                "ID": r[0],
+                "To": r[1],
+                "Subject": r[2],
+                "Status": r[3].upper(),
+                "Attempts": r[4],
+                "Next Attempt (UTC)": r[5] if r[3] == "pending" else "-",
+                "Last Error": r[6],
+            } for r in problems], width="stretch")
+
+        if counts.get("failed") and st.button("🔁 Retry failed emails"):
+            st.success(f"{retry_failed(conn)} email masuk antrian lagi")
             st.rerun()
 
+        st.divider()
+
+        # =========================
+        # METRICS (/metrics BACKEND + PROSES INI)
+        # =========================
+        st.markdown("### 📈 Metrics")
+
+        from core.metrics import REGISTRY, summarize
+
+        def show_metrics(text):
+            histograms, scalars = summarize(text)
+            if histograms:
+                st.dataframe([{
+                    "Metric": h["metric"],
+                    "Labels": ", ".join(f"{k}={v}" for k, v in h["labels"].items()),
+                    "Count": h["count"],
+                    "Avg (ms)": h["avg_ms"],
+                    "p50 ≤ (ms)": h["p50_ms"],
+                    "p95 ≤ (ms)": h["p95_ms"],
+                    "Total (s)": h["total_s"],
+                } for h in sorted(histograms, key=lambda h: -h["total_s"])], width="stretch")
+            if scalars:
+                st.dataframe([{
+                    "Metric": m["metric"],
+                    "Labels": ", ".join(f"{k}={v}" for k, v in m["labels"].items()),
+                    "Value": m["value"],
+                } for m in scalars], width="stretch")
+            if not histograms and not scalars:
+                st.info("Belum ada data metric")
+
+        metrics_token = os.getenv("HR_METRICS_TOKEN")
+        try:
+            r = api_get(
+                "/metrics",
+                headers={"Authorization": f"Bearer {metrics_token}"} if metrics_token else None,
+                timeout=5
+            )
+            r.raise_for_status()
+            st.caption("Backend API")
+            show_metrics(r.text)
         except Exception as e:
-            conn.rollback()
-            st.error(str(e))
+            st.warning(f"/metrics backend tidak bisa dibaca: {e}")
+
+        st.caption("Proses Streamlit ini")
+        show_metrics(REGISTRY.render())
+
+        st.divider()
+
+        # =========================
+        # TOP QUERIES (SLOW QUERY LOG)
+        # =========================
+        st.markdown("### 🐢 Top Queries by Total Time")
+
+        from core.db import PROFILE_QUERIES
+        from core.query_log import KEEP_DAYS, SLOW_QUERY_MS, top_queries
+
+        if not PROFILE_QUERIES:
+            st.info(
+                "Profiling query mati. Jalankan dengan HR_DB_PROFILE=1 untuk mengisi log ini "
+                "(saat ini hanya query dari rerun yang diprofil render profiler)."
+            )
+
+        slow = conn.execute("""
+            SELECT sql,
+                   COUNT(*),
+                   SUM(duration_ms),
+                   AVG(duration_ms),
+                   MAX(duration_ms),
+                   GROUP_CONCAT(DISTINCT call_site),
+                   MAX(created_at)
+            FROM slow_query_log
+            GROUP BY sql
+            ORDER BY SUM(duration_ms) DESC
+            LIMIT 20
+        """).fetchall()
+
+        st.caption(
+            f"Query ≥ {SLOW_QUERY_MS:g} ms dari semua proses, {KEEP_DAYS} hari terakhir"
+        )
+        if slow:
+            st.dataframe([{
+                "SQL": r[0],
+                "Slow Calls": r[1],
+                "Total (ms)": round(r[2], 1),
+                "Avg (ms)": round(r[3], 1),
+                "Max (ms)": round(r[4], 1),
+                "Call Sites": r[5],
+                "Last Seen (UTC)": r[6],
+            } for r in slow], width="stretch")
+        else:
+            st.info("Belum ada query lambat tercatat")
+
+        slow_queries = top_queries()
+        if slow_queries:
+            st.caption(
+                "Semua query proses Streamlit ini (sejak start)" if PROFILE_QUERIES
+                else "Query dari rerun yang diprofil di proses ini (sejak start)"
+            )
+            st.dataframe([{
+                "SQL": q["sql"],
+                "Calls": q["calls"],
+                "Total (ms)": q["total_ms"],
+                "Avg (ms)": q["avg_ms"],
+                "Max (ms)": q["max_ms"],
+            } for q in slow_queries], width="stretch")
+
+        st.divider()
+
+        # =========================
+        # RENDER PROFILE (FLAME SUMMARY)
+        # =========================
+        st.markdown("### 🔥 Render Profile")
+
+        reruns = profiler.recent_reruns()
+        st.caption(
+            "Aktifkan dengan HR_RENDER_PROFILE=1 / cprofile, atau ?profile=1 di URL "
+            "(termasuk waktu per query DB). "
+            f"Menyimpan {profiler.KEEP_RERUNS} rerun terakhir proses ini."
+        )
 
+        if not reruns:
+            st.info("Belum ada rerun yang diprofil")
+        else:
+            st.dataframe([{
+                "Started": r["started_at"],
+                "Page": r["page"],
+                "Total (ms)": r["total_ms"],
+                "Completed": "✅" if r["completed"] else "⏹️ stop/rerun",
+                "Slowest Section": max(
+                    (p for p in r["sections"] if p != r["page"]),
+                    key=r["sections"].get, default="-"
+                ),
+            } for r in reversed(reruns)], width="stretch")
+
+            st.dataframe([{
+                "Stack": "\u2003" * f["depth"] + f["name"],
+                "Calls": f["calls"] or "",
+                "Total (ms)": f["ms"],
+                "Per Rerun (ms)": f["per_rerun_ms"],
+                "Share": f["share"],
+            } for f in profiler.flame_summary(reruns)], width="stretch", column_config={
+                "Share": st.column_config.ProgressColumn(
+                    "Share", min_value=0, max_value=1, format="percent"
+                ),
+            })
+
+            c1, c2 = st.columns(2)
+            c1.download_button(
+                "⬇️ Collapsed stacks (speedscope / flamegraph.pl)",
+                profiler.collapsed_stacks(reruns),
+                file_name="render_profile.folded",
+            )
+            if c2.button("🧹 Clear profile history"):
+                profiler.clear_history()
+                st.rerun()
+
+            latest = next((r for r in reversed(reruns) if r["cprofile"]), None)
+            if latest:
+                st.caption(f"cProfile {latest['page']} @ {latest['started_at']}")
+                st.dataframe(latest["cprofile"], width="stretch")
+
+    elif menu == "🗄️ Archive Leave Data (FULL)":
+        st.subheader("🗄️ Full Archive Leave Data Tahunan")
+
+        current_year = date.today().year
+
+        year = st.selectbox(
+            "Pilih Tahun yang akan ditutup",
+            list(range(current_year, 2019, -1))
+        )
+
+        total = conn.execute("""
+            SELECT COUNT(*)
+            FROM leave_requests
+            WHERE strftime('%Y', start_date) = ?
+        """, (str(year),)).fetchone()[0]
+
+        st.info(f"📦 Total leave request tahun {year}: **{total} record**")
+
+        if year == current_year:
+            st.warning("⚠️ Ini adalah TAHUN BERJALAN")
+
+        st.error("""
+        ⚠️ SEMUA status akan di-archive:
+        - submitted
+        - manager_approved
+        - manager_rejected
+        - hr_approved
+        - hr_rejected
+
+        Tindakan ini TIDAK bisa dibatalkan
+        """)
+
+        confirm1 = st.checkbox("Saya memahami semua request akan ditutup")
+        confirm2 = st.checkbox("Saya bertanggung jawab penuh")
+
+        if confirm1 and confirm2 and st.button("🔒 ARCHIVE SEMUA DATA"):
+            try:
+                conn.execute("BEGIN")
+
+                conn.execute("""
+                    INSERT INTO leave_requests_archive
+                    SELECT *,
+                           CURRENT_TIMESTAMP,
+                           ?,
+                           'FULL YEAR ARCHIVE'
+                    FROM leave_requests
+                    WHERE strftime('%Y', start_date) = ?
+                """, (hr_id, str(year)))
+
+                conn.execute("""
+                    DELETE FROM leave_requests
+                    WHERE strftime('%Y', start_date) = ?
+                """, (str(year),))
+
+                conn.execute("""
+                    INSERT INTO archive_logs (year,total_rows,archived_by)
+                    VALUES (?,?,?)
+                """, (year, total, hr_id))
+
+                conn.commit()
+                st.success(f"✅ Tahun {year} berhasil di-archive")
+                st.rerun()
 
+            except Exception as e:
+                conn.rollback()
+                st.error(str(e))
 
-conn.close()
+profiler.end_rerun()
@@ -0,0 +1,264 @@
+"""
+Benchmark engine & query inti terhadap org sintetis (scripts.generate_org).
+
+    python -m scripts.benchmark                     # bandingkan dengan baseline
+    python -m scripts.benchmark --save-baseline     # simpan hasil sebagai baseline
+    python -m scripts.benchmark --users 50000 --only accrual
+
+Baseline disimpan di scripts/benchmark_baseline.json per profil
+(jumlah user x tahun). Angka baseline bergantung mesin: simpan ulang
+baseline di mesin yang sama sebelum membandingkan. Exit 1 jika ada
+benchmark yang waktu terbaiknya (min) lebih lambat dari baseline x
+--tolerance.
+
+Sengaja script terpisah, bukan bagian dari pytest: angka baru berarti
+dengan org besar (10k user dibangun ~30 detik) dan baseline per mesin,
+terlalu lambat dan terlalu bising untuk setiap run test. Di pytest,
+tests/test_query_plans.py menjaga plan query (tidak bergantung mesin)
+dan tests/test_benchmark.py menjalankan setiap benchmark sekali di org
+kecil supaya script ini tidak rusak diam-diam.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+import pandas as pd
+
+import core.db
+from core import queries
+from core.change_off import calculate_co, calculate_co_batch
+from core.holiday import calculate_working_days, calculate_working_days_many
+from core.leave_accrual import run_monthly_accrual
+from core.leave_reset import run_june_30_reset
+from scripts.generate_org import build_database
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+
+# Tanggal tetap supaya data sintetis identik antar run
+TODAY = date(2025, 9, 15)
+
+SCALAR_CALLS = 10_000
+BATCH_ROWS = 100_000
+
+
+def measure(fn, repeat, setup=None):
+    """
+    Jalankan fn `repeat` kali (setup tidak ikut diukur).
+    Return list durasi dalam ms.
+    """
+    timings = []
+    for i in range(repeat):
+        if setup:
+            setup(i)
+        started = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+# =========================
+# BENCHMARKS
+# =========================
+def bench_accrual(conn, rnd, repeat):
+    # setiap repeat = bulan baru -> accrual penuh untuk semua employee
+    def run(i):
+        month = TODAY.month + 1 + i
+        run_monthly_accrual(date(TODAY.year + (month - 1) // 12,
+                                 (month - 1) % 12 + 1, 1))
+    return measure(run, repeat)
+
+
+def bench_accrual_backfill(conn, rnd, repeat):
+    def setup(i):
+        conn.execute("DELETE FROM accrual_logs")
+        conn.commit()
+    return measure(
+        lambda i: run_monthly_accrual(TODAY, backfill=True), repeat, setup
+    )
+
+
+def bench_june_30_reset(conn, rnd, repeat):
+    day = date(TODAY.year + 1, 6, 30)
+
+    def setup(i):
+        conn.execute("DELETE FROM leave_reset_logs WHERE year=?", (day.year,))
+        conn.commit()
+    return measure(lambda i: run_june_30_reset(day, executed_by=0), repeat, setup)
+
+
+def _random_ranges(rnd, n):
+    ranges = []
+    for _ in range(n):
+        start = TODAY - timedelta(days=rnd.randint(0, 1000))
+        ranges.append((start, start + timedelta(days=rnd.randint(0, 30))))
+    return ranges
+
+
+def bench_working_days(conn, rnd, repeat):
+    ranges = _random_ranges(rnd, SCALAR_CALLS)
+
+    def run(i):
+        for start, end in ranges:
+            calculate_working_days(start, end)
+    return measure(run, repeat)
+
+
+def bench_working_days_many(conn, rnd, repeat):
+    ranges = _random_ranges(rnd, BATCH_ROWS)
+    return measure(lambda i: calculate_working_days_many(ranges), repeat)
+
+
+def _co_days(rnd, n):
+    work_types = ["non-shift", "2-shift", "3-shift", "back-office"]
+    return pd.DataFrame({
+        "work_type": [rnd.choice(work_types) for _ in range(n)],
+        "work_date": [TODAY - timedelta(days=rnd.randint(0, 365)) for _ in range(n)],
+        "start_time": [dtime(rnd.choice([7, 8, 13, 20])) for _ in range(n)],
+        "end_time": [dtime(rnd.choice([17, 21, 23, 8])) for _ in range(n)],
+        "travelling": [rnd.random() < 0.15 for _ in range(n)],
+        "standby": [rnd.random() < 0.1 for _ in range(n)],
+    })
+
+
+def bench_calculate_co(conn, rnd, repeat):
+    days = list(_co_days(rnd, SCALAR_CALLS).itertuples(index=False))
+
+    def run(i):
+        for d in days:
+            calculate_co("Teknisi / Engineer", d.work_type, d.work_date,
+                         d.start_time, d.end_time, d.travelling, d.standby)
+    return measure(run, repeat)
+
+
+def bench_calculate_co_batch(conn, rnd, repeat):
+    days = _co_days(rnd, BATCH_ROWS)
+    return measure(lambda i: calculate_co_batch(days), repeat)
+
+
+def _query(sql, params=None, loops=100):
+    """
+    Query di-ulang `loops` kali per sampel: satu eksekusi terlalu cepat
+    untuk diukur stabil.
+    """
+    def bench(conn, rnd, repeat):
+        args = params(conn) if params else ()
+
+        def run(i):
+            for _ in range(loops):
+                conn.execute(sql, args).fetchall()
+        return measure(run, repeat)
+    return bench
+
+
+def _busiest_manager(conn):
+    row = conn.execute("""
+        SELECT manager_id FROM users
+        WHERE role='employee' AND manager_id IS NOT NULL
+        GROUP BY manager_id ORDER BY COUNT(*) DESC LIMIT 1
+    """).fetchone()
+    return (row[0],)
+
+
+BENCHMARKS = {
+    "accrual": (bench_accrual, 5),
+    "accrual_backfill": (bench_accrual_backfill, 3),
+    "june_30_reset": (bench_june_30_reset, 5),
+    "working_days_x10k": (bench_working_days, 5),
+    "working_days_many_x100k": (bench_working_days_many, 5),
+    "calculate_co_x10k": (bench_calculate_co, 3),
+    "calculate_co_batch_x100k": (bench_calculate_co_batch, 5),
+    "hr_leave_queue_x100": (_query(queries.HR_LEAVE_QUEUE), 5),
+    "hr_co_queue_x100": (_query(queries.HR_CO_QUEUE), 5),
+    "manager_team_x100": (_query(queries.MANAGER_TEAM, _busiest_manager), 5),
+}
+
+
+# =========================
+# BASELINE
+# =========================
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def save_baseline(profile, results):
+    data = load_baseline()
+    best = data.get(profile, {}).get("min_ms", {})
+    best.update({name: round(r["min"], 3) for name, r in results.items()})
+    data[profile] = {
+        "recorded_at": date.today().isoformat(),
+        "machine": f"{platform.machine()} / Python {platform.python_version()}",
+        "min_ms": best,
+    }
+    with open(BASELINE_PATH, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS))
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="gagal jika min > baseline x tolerance")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    profile = f"{args.users}u_{args.years}y"
+    baseline = load_baseline().get(profile, {}).get("min_ms", {})
+    names = args.only or list(BENCHMARKS)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        build_database(os.path.join(tmp, "bench.db"), args.users, args.years,
+                       today=TODAY)
+        print(f"org {profile} siap ({time.perf_counter() - started:.1f}s)\n")
+
+        with core.db.connection() as conn:
+            for name in names:
+                bench, repeat = BENCHMARKS[name]
+                timings = bench(conn, random.Random(name), repeat)
+                results[name] = {
+                    "median": statistics.median(timings),
+                    "min": min(timings),
+                }
+
+        core.db.get_pool().close_all()
+
+    regressions = 0
+    print(f"{'benchmark':<28}{'median ms':>12}{'min ms':>12}{'baseline':>12}{'ratio':>8}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        # min lebih stabil dari median terhadap noise mesin
+        ratio = r["min"] / base if base else None
+        flag = ""
+        if ratio and ratio > args.tolerance:
+            regressions += 1
+            flag = "  ❌"
+        print(
+            f"{name:<28}{r['median']:>12.2f}{r['min']:>12.2f}"
+            f"{base if base is not None else '-':>12}"
+            f"{f'{ratio:.2f}x' if ratio else '-':>8}{flag}"
+        )
+
+    if args.save_baseline:
+        save_baseline(profile, results)
+        print(f"\nBaseline {profile} disimpan ke {BASELINE_PATH}")
+    elif regressions:
+        print(f"\n{regressions} benchmark lebih lambat dari baseline x{args.tolerance}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark throughput kirim email: satu sesi SMTP per email (cara lama)
+vs sesi yang di-reuse (utils.emailer.SMTPSender) vs fan-out async
+(utils.notifications.fan_out).
+
+    pip install aiosmtpd
+    python -m scripts.benchmark_email [--messages 500] [--handshake-ms 20]
+        [--latency-ms 10] [--concurrency 10]
+
+Server SMTP lokal (aiosmtpd) hanya menerima dan membuang email.
+--handshake-ms menambah jeda di EHLO untuk meniru biaya connect +
+STARTTLS + login ke server sungguhan (tanpa itu, localhost terlalu murah),
+--latency-ms menambah jeda di DATA (round trip + antrian server).
+"""
+import argparse
+import asyncio
+import time
+
+from utils.emailer import SMTP_CONNECTS, SMTPSender, build_message
+from utils.notifications import fan_out
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # dependency benchmark saja, bukan runtime
+    Controller = None
+
+
+class SinkHandler:
+    def __init__(self, handshake_ms: float, latency_ms: float = 0):
+        self.handshake = handshake_ms / 1000
+        self.latency = latency_ms / 1000
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        if self.handshake:
+            await asyncio.sleep(self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.received += 1
+        return "250 OK"
+
+
+def _messages(n):
+    return [
+        build_message(
+            f"employee{i}@example.com",
+            f"Leave Request Approved #{i}",
+            f"Hi Employee {i},\n\nYour leave request has been APPROVED.\n"
+        )
+        for i in range(n)
+    ]
+
+
+def run_per_message(port, messages):
+    for msg in messages:
+        sender = SMTPSender("127.0.0.1", port, password=None, starttls=False)
+        sender.send(msg)
+        sender.close()
+
+
+def run_pooled(port, messages):
+    sender = SMTPSender("127.0.0.1", port, password=None, starttls=False)
+    errors = [e for e in sender.send_many(messages) if e]
+    sender.close()
+    if errors:
+        raise errors[0]
+
+
+def run_fan_out(port, messages, concurrency):
+    result = asyncio.run(fan_out(
+        messages,
+        concurrency=concurrency,
+        domain_rate=0,
+        host="127.0.0.1",
+        port=port,
+        password=None,
+        starttls=False,
+    ))
+    if result.failed:
+        raise next(e for e in result.errors if e)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--handshake-ms", type=float, default=20)
+    parser.add_argument("--latency-ms", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    if Controller is None:
+        raise SystemExit("aiosmtpd belum terpasang: pip install aiosmtpd")
+
+    handler = SinkHandler(args.handshake_ms, args.latency_ms)
+    controller = Controller(handler, hostname="127.0.0.1", port=args.port)
+    controller.start()
+
+    try:
+        print(
+            f"{args.messages} email, handshake {args.handshake_ms:g} ms, "
+            f"latency {args.latency_ms:g} ms "
+            f"(aiosmtpd 127.0.0.1:{args.port})"
+        )
+        baseline = None
+        modes = (
+            ("per-message", run_per_message),
+            ("pooled", run_pooled),
+            (f"fan-out x{args.concurrency}",
+             lambda port, msgs: run_fan_out(port, msgs, args.concurrency)),
+        )
+        for name, fn in modes:
+            messages = _messages(args.messages)
+            connects = SMTP_CONNECTS.value()
+            received = handler.received
+            started = time.perf_counter()
+            fn(args.port, messages)
+            elapsed = time.perf_counter() - started
+
+            assert handler.received - received == args.messages
+            rate = args.messages / elapsed
+            baseline = baseline or rate
+            print(
+                f"  {name:<14} {elapsed:7.2f} s  {rate:8.1f} email/s  "
+                f"{SMTP_CONNECTS.value() - connects:5d} sesi  x{rate / baseline:.1f}"
+            )
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
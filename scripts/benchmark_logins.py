@@ -0,0 +1,101 @@
+"""
+Benchmark throughput /login (bcrypt di process pool) terhadap org kecil.
+
+    HR_BCRYPT_ROUNDS=12 HR_HASH_WORKERS=4 python -m scripts.benchmark_logins \\
+        [--requests 400] [--concurrency 32]
+
+Request dijalankan langsung ke ASGI app (tanpa jaringan). Campuran:
+login benar, password salah, dan email tidak terdaftar. Laporan:
+login/detik total dan per core (per worker hash), latensi p50/p95, dan
+rata-rata latensi email terdaftar vs tidak terdaftar (harus mirip).
+
+Yang diukur throughput bcrypt, bukan throttling: LoginGuard diganti
+dengan batas longgar supaya login salah dari satu IP tidak kena 429
+(tests/test_login_guard.py yang menguji throttling-nya).
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+
+import core.db
+from backend import main as backend
+from backend.login_guard import LoginGuard
+from core import passwords
+from scripts.generate_org import DEFAULT_PASSWORD, build_database
+
+
+async def _login(client, email, password):
+    started = time.perf_counter()
+    r = await client.post("/login", params={"email": email, "password": password})
+    r.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def run(n_requests, concurrency, n_users):
+    rnd = random.Random(7)
+    attempts = []
+    for _ in range(n_requests):
+        kind = rnd.choices(["ok", "wrong", "unknown"], [80, 10, 10])[0]
+        uid = rnd.randint(1, n_users)
+        email = f"user{uid}@example.com" if kind != "unknown" else f"ghost{uid}@example.com"
+        password = DEFAULT_PASSWORD if kind == "ok" else "salah"
+        attempts.append((kind, email, password))
+
+    backend.login_guard = LoginGuard(max_per_email=n_requests, max_per_ip=n_requests)
+    await backend.run_migrations()
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=backend.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(kind, email, password):
+            async with sem:
+                return kind, await _login(client, email, password)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(*a) for a in attempts))
+        elapsed = time.perf_counter() - started
+
+    await backend.close_db()
+    return results, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_database(os.path.join(tmp, "logins.db"), args.users, years=1)
+        results, elapsed = asyncio.run(
+            run(args.requests, args.concurrency, args.users)
+        )
+        core.db.get_pool().close_all()
+
+    latencies = sorted(t for _, t in results)
+    by_kind = {}
+    for kind, t in results:
+        by_kind.setdefault(kind, []).append(t)
+
+    rate = len(results) / elapsed
+    print(f"bcrypt rounds      : {passwords.BCRYPT_ROUNDS}")
+    print(f"hash workers       : {passwords.HASH_WORKERS}")
+    print(f"requests           : {len(results)} (concurrency {args.concurrency})")
+    print(f"login/detik        : {rate:.1f}")
+    print(f"login/detik/core   : {rate / passwords.HASH_WORKERS:.1f}")
+    print(f"latensi p50 / p95  : {statistics.median(latencies) * 1000:.0f} ms / "
+          f"{latencies[int(len(latencies) * 0.95)] * 1000:.0f} ms")
+    for kind in ("ok", "wrong", "unknown"):
+        if kind in by_kind:
+            print(f"rata-rata {kind:<9}: {statistics.mean(by_kind[kind]) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Kirim saldo cuti terbaru ke semua karyawan (setelah reset 30 Juni)
+lewat utils.notifications.broadcast: email dikirim bersamaan dengan
+batas per domain. Email yang gagal dimasukkan ke email_outbox supaya
+dicoba ulang oleh email worker.
+
+    python -m scripts.broadcast_balances                  # semua user
+    python -m scripts.broadcast_balances --division "Back Office"
+    python -m scripts.broadcast_balances --dry-run        # render saja
+"""
+import argparse
+from datetime import date
+
+from core.db import connection
+from core.migrations import migrate
+from core.outbox import enqueue_rendered
+from utils.email_templates import render_many
+from utils.notifications import CONCURRENCY, DOMAIN_RATE, broadcast
+
+
+def load_recipients(year: int, division: str | None = None) -> list[tuple]:
+    sql = """
+        SELECT u.email, u.name,
+               COALESCE(b.current_year, 0), COALESCE(b.last_year, 0),
+               COALESCE(b.change_off, 0)
+        FROM users u
+        LEFT JOIN leave_balance b ON b.user_id = u.id
+        WHERE u.email IS NOT NULL AND u.email != ''
+    """
+    params = []
+    if division:
+        sql += " AND u.division = ?"
+        params.append(division)
+
+    with connection() as conn:
+        rows = conn.execute(sql + " ORDER BY u.id", params).fetchall()
+
+    return [
+        (email, {
+            "emp_name": name,
+            "year": year,
+            "current_year": current_year,
+            "last_year": last_year,
+            "change_off": f"{change_off:g}",
+        })
+        for email, name, current_year, last_year, change_off in rows
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--year", type=int, default=date.today().year)
+    parser.add_argument("--division")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--domain-rate", type=float, default=DOMAIN_RATE)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    migrate()
+    recipients = load_recipients(args.year, args.division)
+    print(f"{len(recipients)} penerima", flush=True)
+
+    if args.dry_run:
+        rendered = render_many("balance_update", [c for _, c in recipients[:1]])
+        if rendered:
+            print(rendered[0].subject)
+            print(rendered[0].text)
+        return
+
+    result = broadcast(
+        "balance_update",
+        recipients,
+        concurrency=args.concurrency,
+        domain_rate=args.domain_rate,
+    )
+    print(result.summary())
+    for domain, stats in sorted(result.by_domain().items()):
+        print(f"  {domain:<30} sent={stats['sent']} failed={stats['failed']}")
+
+    # yang gagal -> outbox, dicoba ulang oleh email worker
+    retry = [
+        (to_email, context)
+        for (to_email, context), error in zip(recipients, result.errors)
+        if error is not None
+    ]
+    if retry:
+        rendered = render_many("balance_update", [c for _, c in retry])
+        with connection() as conn:
+            for (to_email, _), message in zip(retry, rendered):
+                enqueue_rendered(conn, to_email, message)
+            conn.commit()
+        print(f"{len(retry)} email gagal dimasukkan ke email_outbox")
+
+
+if __name__ == "__main__":
+    main()
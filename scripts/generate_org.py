@@ -0,0 +1,367 @@
+"""
+Generator organisasi sintetis untuk uji performa.
+
+Membuat user di semua DIVISIONS (HR, kepala divisi, manager, employee
+dengan hierarki manager), saldo cuti, kalender libur, beberapa tahun
+leave_requests / change_off_claims dan auth_logs.
+
+    python -m scripts.generate_org --db /tmp/org.db --users 50000 --years 3
+
+Semua user memakai password DEFAULT_PASSWORD. Hasilnya deterministik
+untuk --seed yang sama.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+import core.db
+from core.auth import hash_password
+from core.change_off import calculate_co_batch
+from core.co_rules import get_active_rules, invalidate_rules
+from core.holiday import get_calendar, invalidate_holidays
+from core.migrations import migrate
+from core.seed import DIVISIONS
+
+DEFAULT_PASSWORD = "password123"
+
+# Porsi employee per divisi (urut sesuai DIVISIONS)
+DIVISION_WEIGHTS = [30, 15, 5, 3, 5, 15, 12, 15]
+FIELD_DIVISIONS = {"TSCM", "IC", "WORKSHOP"}
+
+TEAM_SIZE = 12          # employee per manager
+MANAGERS_PER_HEAD = 6   # manager per kepala divisi
+HR_PER_USERS = 500
+
+LEAVE_PER_YEAR = 6
+CO_PER_YEAR = 8
+SESSIONS_PER_MONTH = 2
+FAILED_LOGIN_RATE = 0.05
+
+FIXED_HOLIDAYS = [(1, 1), (5, 1), (6, 1), (8, 17), (12, 25)]
+MOVING_HOLIDAYS_PER_YEAR = 10
+
+BATCH = 50_000
+
+
+def _iso(d: date) -> str:
+    return d.isoformat()
+
+
+def _stamp(d: date, rnd) -> str:
+    return f"{d.isoformat()} {rnd.randint(7, 19):02d}:{rnd.randint(0, 59):02d}:00"
+
+
+def _insert(conn, sql, rows):
+    """
+    executemany per batch supaya memori tetap kecil untuk org besar.
+    """
+    total, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            conn.executemany(sql, batch)
+            total += len(batch)
+            batch.clear()
+    if batch:
+        conn.executemany(sql, batch)
+        total += len(batch)
+    return total
+
+
+# =========================
+# USERS
+# =========================
+def _build_users(n_users, rnd, today, password_hash):
+    """
+    Return list baris users: (id, nik, name, email, role, manager_id,
+    division, join_date, probation_date, permanent_date, password_hash)
+    """
+    users = []
+
+    def add(role, division, manager_id, join):
+        uid = len(users) + 1
+        probation = join + timedelta(days=90)
+        permanent = probation if probation <= today else None
+        users.append((
+            uid, f"N{uid:06d}", f"User {uid}", f"user{uid}@example.com",
+            role, manager_id, division,
+            _iso(join), _iso(probation), permanent and _iso(permanent),
+            password_hash,
+        ))
+        return uid
+
+    def join_date():
+        return today - timedelta(days=rnd.randint(30, 365 * 12))
+
+    n_hr = max(1, n_users // HR_PER_USERS)
+    for _ in range(n_hr):
+        add("hr", "HR", None, join_date())
+
+    remaining = n_users - n_hr
+    per_division = [
+        remaining * w // sum(DIVISION_WEIGHTS) for w in DIVISION_WEIGHTS
+    ]
+    per_division[0] += remaining - sum(per_division)
+
+    for division, size in zip(DIVISIONS, per_division):
+        if size <= 0:
+            continue
+
+        n_managers = max(1, size // (TEAM_SIZE + 1))
+        n_heads = max(1, n_managers // MANAGERS_PER_HEAD)
+
+        heads = [add("manager", division, None, join_date())
+                 for _ in range(n_heads)]
+        managers = list(heads) + [
+            add("manager", division, rnd.choice(heads), join_date())
+            for _ in range(max(0, n_managers - n_heads))
+        ]
+
+        for _ in range(size - len(managers)):
+            add("employee", division, rnd.choice(managers), join_date())
+
+    return users
+
+
+# =========================
+# HOLIDAYS
+# =========================
+def _build_holidays(first_year, last_year, rnd):
+    rows = {}
+    for year in range(first_year, last_year + 1):
+        for month, day in FIXED_HOLIDAYS:
+            rows[date(year, month, day)] = "Libur nasional"
+        for _ in range(MOVING_HOLIDAYS_PER_YEAR):
+            d = date(year, 1, 1) + timedelta(days=rnd.randint(0, 364))
+            rows.setdefault(d, "Libur nasional / cuti bersama")
+    return [(_iso(d), desc) for d, desc in sorted(rows.items())]
+
+
+# =========================
+# LEAVE REQUESTS
+# =========================
+def _leave_status(start: date, today: date, rnd):
+    if start > today - timedelta(days=14):
+        return rnd.choice(["submitted", "submitted", "manager_approved"])
+    return rnd.choices(
+        ["hr_approved", "manager_rejected", "hr_rejected"], [90, 6, 4]
+    )[0]
+
+
+def _leave_rows(employees, first_day, today, rnd, calendar):
+    span = (today - first_day).days
+    for uid, manager_id in employees:
+        for _ in range(int(span / 365 * LEAVE_PER_YEAR)):
+            start = first_day + timedelta(days=rnd.randint(0, span))
+            end = start + timedelta(days=rnd.choice([0, 0, 0, 1, 2, 4]))
+            total = calendar.count_working_days(start, end)
+            if total == 0:
+                continue
+
+            status = _leave_status(start, today, rnd)
+            created = start - timedelta(days=rnd.randint(1, 21))
+            decided = status != "submitted"
+            leave_type = rnd.choices(
+                ["Personal Leave", "Sick (No Doc)", "Change Off"], [80, 10, 10]
+            )[0]
+
+            yield (
+                uid, leave_type, _iso(start), _iso(end), total,
+                "Keperluan keluarga", status, _stamp(created, rnd),
+                manager_id if decided else None,
+                _stamp(created + timedelta(days=1), rnd) if decided else None,
+            )
+
+
+# =========================
+# CHANGE OFF CLAIMS
+# =========================
+def _co_days(field_employees, first_day, today, rnd):
+    span = (today - first_day).days
+    for uid, work_type in field_employees:
+        for _ in range(int(span / 365 * CO_PER_YEAR)):
+            d = first_day + timedelta(days=rnd.randint(0, span))
+            start = rnd.choice(["07:00", "08:00", "13:00", "20:00"])
+            end = rnd.choice(["17:00", "21:00", "23:00", "08:00"])
+            yield {
+                "user_id": uid,
+                "work_type": work_type,
+                "work_date": d,
+                "start_time": start,
+                "end_time": end,
+                "travelling": rnd.random() < 0.15,
+                "standby": rnd.random() < 0.1,
+            }
+
+
+def _co_rows(field_employees, first_day, today, rnd, rules):
+    days = pd.DataFrame(list(_co_days(field_employees, first_day, today, rnd)))
+    if days.empty:
+        return []
+
+    co, _, hours = calculate_co_batch(days, rules=rules)
+    days["co_days"] = co
+    days["daily_hours"] = hours
+    days = days[days["co_days"] > 0]
+
+    rows = []
+    for r in days.itertuples(index=False):
+        status = _leave_status(r.work_date, today, rnd)
+        category = (
+            "Back Office / Workshop" if r.work_type == "back-office"
+            else "Teknisi / Engineer"
+        )
+        rows.append((
+            r.user_id, category, r.work_type, _iso(r.work_date),
+            float(r.daily_hours), float(r.co_days), "Maintenance site",
+            status, _stamp(r.work_date + timedelta(days=rnd.randint(1, 30)), rnd),
+            rules.version,
+        ))
+    return rows
+
+
+# =========================
+# AUTH LOGS
+# =========================
+def _auth_rows(users, first_day, today, rnd):
+    span = (today - first_day).days
+    months = max(1, span // 30)
+    for u in users:
+        uid, email, role = u[0], u[3], u[4]
+        for _ in range(months * SESSIONS_PER_MONTH):
+            d = first_day + timedelta(days=rnd.randint(0, span))
+            ip = f"10.{uid % 250}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}"
+            login_at = _stamp(d, rnd)
+
+            if rnd.random() < FAILED_LOGIN_RATE:
+                yield (uid, email, role, "failed_login", ip, "python-requests", login_at)
+            yield (uid, email, role, "login", ip, "python-requests", login_at)
+            yield (uid, email, role, "logout", ip, "python-requests",
+                   f"{_iso(d)} {rnd.randint(20, 23):02d}:00:00")
+
+
+def generate_org(conn, n_users: int, years: int = 3, seed: int = 42,
+                 today: date | None = None) -> dict:
+    """
+    Isi database (sudah di-migrate, masih kosong) dengan org sintetis.
+    Return jumlah baris per tabel.
+    """
+    rnd = random.Random(seed)
+    today = today or date.today()
+    first_day = today - timedelta(days=365 * years)
+    counts = {}
+
+    # satu hash untuk semua user: bcrypt ratusan ribu kali terlalu lama
+    users = _build_users(n_users, rnd, today, hash_password(DEFAULT_PASSWORD))
+    counts["users"] = _insert(conn, """
+        INSERT INTO users (id, nik, name, email, role, manager_id, division,
+                           join_date, probation_date, permanent_date,
+                           password_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, users)
+
+    counts["leave_balance"] = _insert(conn, """
+        INSERT INTO leave_balance
+        (user_id, last_year, current_year, change_off, sick_no_doc, updated_at)
+        VALUES (?, ?, ?, ?, 0, ?)
+    """, (
+        (u[0], rnd.randint(0, 6), rnd.randint(0, 12),
+         rnd.choice([0, 0, 0.5, 1, 1.5, 2]), _iso(today))
+        for u in users
+    ))
+
+    counts["holidays"] = _insert(conn, """
+        INSERT OR IGNORE INTO holidays (holiday_date, description)
+        VALUES (?, ?)
+    """, _build_holidays(first_day.year, today.year + 1, rnd))
+    conn.commit()
+
+    # kalender & aturan CO dibaca dari DB yang sedang diisi
+    invalidate_holidays()
+    invalidate_rules()
+    calendar = get_calendar()
+    rules = get_active_rules()
+
+    employees = [(u[0], u[5]) for u in users if u[4] == "employee"]
+    counts["leave_requests"] = _insert(conn, """
+        INSERT INTO leave_requests
+        (user_id, leave_type, start_date, end_date, total_days, reason,
+         status, created_at, approved_by, approved_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, _leave_rows(employees, first_day, today, rnd, calendar))
+    conn.commit()
+
+    field_employees = [
+        (u[0], rnd.choice(["non-shift", "2-shift", "3-shift"])
+         if u[6] in FIELD_DIVISIONS else "back-office")
+        for u in users if u[4] == "employee" and rnd.random() < 0.6
+    ]
+    counts["change_off_claims"] = _insert(conn, """
+        INSERT INTO change_off_claims
+        (user_id, category, work_type, work_date, daily_hours, co_days,
+         description, status, created_at, rule_version)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, _co_rows(field_employees, first_day, today, rnd, rules))
+    conn.commit()
+
+    counts["auth_logs"] = _insert(conn, """
+        INSERT INTO auth_logs
+        (user_id, email, role, action, ip_address, user_agent, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, _auth_rows(users, first_day, today, rnd))
+    conn.commit()
+
+    conn.execute("ANALYZE")
+    conn.commit()
+    return counts
+
+
+def build_database(path: str, n_users: int, years: int = 3, seed: int = 42,
+                   today: date | None = None) -> dict:
+    """
+    Buat database baru di path (harus belum ada), migrate, lalu isi.
+    core.db.DB_PATH diarahkan ke path ini.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(path)
+
+    core.db.DB_PATH = path
+    migrate()
+    with core.db.connection() as conn:
+        return generate_org(conn, n_users, years, seed, today)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", required=True, help="path database baru")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true",
+                        help="hapus database lama di --db")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        if not args.force:
+            sys.exit(f"{args.db} sudah ada (pakai --force untuk menimpa)")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+
+    started = time.perf_counter()
+    counts = build_database(args.db, args.users, args.years, args.seed)
+    core.db.get_pool().close_all()
+
+    for table, n in counts.items():
+        print(f"{table:<20} {n:>12,}")
+    print(f"✅ {args.db} ({time.perf_counter() - started:.1f}s)")
+    print(f"🔑 Password semua user: {DEFAULT_PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Proses terpisah yang mengirim email dari email_outbox (lihat core.outbox),
+termasuk membuat email digest dari notification_events (core.notify).
+Batch besar (mis. pengumuman massal) dikirim bersamaan lewat
+utils.notifications.deliver_many.
+
+    python -m scripts.run_email_worker           # loop, poll tiap 5 detik
+    python -m scripts.run_email_worker --once    # satu putaran (mis. dari cron)
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+from core.migrations import migrate
+from core.notify import build_digests
+from core.outbox import BATCH_SIZE, deliver_pending
+from utils.notifications import CONCURRENCY, deliver_many
+
+POLL_SECONDS = float(os.getenv("HR_EMAIL_POLL_SECONDS", 5))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--once", action="store_true")
+    parser.add_argument("--interval", type=float, default=POLL_SECONDS)
+    # batch besar dikirim bersamaan (utils.notifications.fan_out)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE * max(CONCURRENCY, 1))
+    args = parser.parse_args()
+
+    migrate()
+
+    while True:
+        try:
+            build_digests()
+            result = deliver_pending(limit=args.batch_size, send_many=deliver_many)
+        except Exception as e:
+            # DB sibuk / terkunci: coba lagi di putaran berikutnya
+            print(f"❌ email worker error: {e}", flush=True)
+            if args.once:
+                raise
+            result = {}
+
+        if any(result.values()):
+            print(
+                f"[{datetime.now():%Y-%m-%d %H:%M:%S}] "
+                f"sent={result['sent']} retry={result['retry']} failed={result['failed']}",
+                flush=True
+            )
+
+        if args.once:
+            return
+
+        # batch penuh -> kemungkinan masih ada antrian, langsung lanjut
+        if sum(result.values()) < args.batch_size:
+            time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
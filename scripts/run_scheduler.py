@@ -0,0 +1,59 @@
+"""
+Proses terpisah yang menjalankan leave engine (accrual bulanan + reset
+30 Juni) secara berkala, termasuk mengejar periode yang terlewat.
+
+    python -m scripts.run_scheduler            # loop, default tiap 1 jam
+    python -m scripts.run_scheduler --once     # satu kali (mis. dari cron)
+    python -m scripts.run_scheduler --backfill # isi bulan yang terlewat lalu keluar
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+from core.migrations import migrate
+from core.leave_accrual import run_monthly_accrual
+from core.leave_engine import run_leave_engine
+
+INTERVAL_SECONDS = int(os.getenv("HR_ENGINE_INTERVAL", 3600))
+
+
+def tick():
+    for r in run_leave_engine():
+        print(
+            f"[{datetime.now():%Y-%m-%d %H:%M:%S}] "
+            f"{r['job']} {r['period']} ({r['run_date']}): "
+            f"{r['status']} — {r['message']} [{r['duration_ms']} ms]",
+            flush=True
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--once", action="store_true")
+    parser.add_argument("--interval", type=int, default=INTERVAL_SECONDS)
+    parser.add_argument("--backfill", action="store_true")
+    args = parser.parse_args()
+
+    migrate()
+
+    if args.backfill:
+        print(f"✅ Backfill: {run_monthly_accrual(backfill=True)} accrual baru")
+        return
+
+    while True:
+        try:
+            tick()
+        except Exception as e:
+            # DB sibuk / terkunci: coba lagi di tick berikutnya
+            print(f"❌ leave engine error: {e}", flush=True)
+            if args.once:
+                raise
+
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
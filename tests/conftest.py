@@ -0,0 +1,5 @@
+import os
+import sys
+
+# import core/, backend/, scripts/ dari root repo (pytest maupun python -m pytest)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
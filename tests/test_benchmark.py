@@ -0,0 +1,35 @@
+"""
+Smoke test scripts.benchmark: setiap benchmark jalan sekali di org kecil.
+Angka waktunya tidak diperiksa (itu tugas python -m scripts.benchmark).
+
+    python -m pytest tests/test_benchmark.py
+"""
+import os
+import random
+
+os.environ.setdefault("HR_BCRYPT_ROUNDS", "4")  # hash user sintetis, bukan yang diuji
+
+import pytest
+
+import core.db
+from scripts.benchmark import BENCHMARKS, TODAY
+from scripts.generate_org import build_database
+
+
+@pytest.fixture(scope="module")
+def bench_conn(tmp_path_factory):
+    old_path = core.db.DB_PATH
+    build_database(str(tmp_path_factory.mktemp("bench") / "bench.db"), 200, 1, today=TODAY)
+    try:
+        with core.db.connection() as conn:
+            yield conn
+    finally:
+        core.db.get_pool().close_all()
+        core.db.DB_PATH = old_path
+
+
+@pytest.mark.parametrize("name", BENCHMARKS)
+def test_benchmark_runs(bench_conn, name):
+    bench, _ = BENCHMARKS[name]
+    timings = bench(bench_conn, random.Random(name), 1)
+    assert len(timings) == 1 and timings[0] >= 0
@@ -0,0 +1,104 @@
+"""
+LoginGuard di bawah request paralel: burst login salah yang datang
+bersamaan tidak boleh lolos melebihi batas sebelum gagalnya tercatat.
+
+    python -m pytest tests/test_login_guard.py
+"""
+import asyncio
+import os
+import threading
+
+os.environ.setdefault("HR_BCRYPT_ROUNDS", "4")  # hash user sintetis, bukan yang diuji
+
+import httpx
+import pytest
+
+import core.db
+from backend import main as backend
+from backend.login_guard import LoginGuard
+from scripts.generate_org import build_database
+
+LIMIT = 5
+BURST = 40
+
+
+def test_check_reserves_inflight_attempts():
+    guard = LoginGuard(max_per_email=LIMIT, max_per_ip=100, window=300)
+    allowed = []
+    barrier = threading.Barrier(BURST)
+
+    def attempt():
+        barrier.wait()
+        if guard.check("10.0.0.1", "user1@example.com") == 0:
+            allowed.append(1)
+
+    threads = [threading.Thread(target=attempt) for _ in range(BURST)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # belum ada satu pun hasil yang dicatat, tapi slot sudah habis
+    assert len(allowed) == LIMIT
+    assert guard.check("10.0.0.1", "user1@example.com") > 0
+
+    for _ in allowed:
+        guard.record_failure("10.0.0.1", "user1@example.com")
+    assert guard.check("10.0.0.1", "user1@example.com") > 0
+
+
+def test_inflight_counts_toward_ip_limit():
+    guard = LoginGuard(max_per_email=100, max_per_ip=3, window=300)
+    for i in range(3):
+        assert guard.check("10.0.0.2", f"user{i}@example.com") == 0
+    assert guard.check("10.0.0.2", "other@example.com") > 0
+
+    guard.release("10.0.0.2", "user0@example.com")
+    assert guard.check("10.0.0.2", "other@example.com") == 0
+
+
+def test_success_and_release_free_the_slot():
+    guard = LoginGuard(max_per_email=1, max_per_ip=100, window=300)
+    assert guard.check("10.0.0.3", "a@example.com") == 0
+    assert guard.check("10.0.0.3", "a@example.com") > 0
+    guard.record_success("10.0.0.3", "a@example.com")
+    assert guard.check("10.0.0.3", "a@example.com") == 0
+    guard.release("10.0.0.3", "a@example.com")
+    assert guard.check("10.0.0.3", "a@example.com") == 0
+
+
+@pytest.fixture
+def login_app(tmp_path, monkeypatch):
+    old_path = core.db.DB_PATH
+    build_database(str(tmp_path / "logins.db"), 20, years=1)
+    monkeypatch.setattr(
+        backend, "login_guard", LoginGuard(max_per_email=LIMIT, max_per_ip=1000)
+    )
+    try:
+        yield backend.app
+    finally:
+        core.db.get_pool().close_all()
+        core.db.DB_PATH = old_path
+
+
+def test_parallel_bad_logins_are_throttled(login_app):
+    async def burst():
+        await backend.run_migrations()
+        transport = httpx.ASGITransport(app=login_app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*(
+                    client.post("/login", params={
+                        "email": "user1@example.com", "password": "salah",
+                    })
+                    for _ in range(BURST)
+                ))
+        finally:
+            await backend.close_db()
+
+    responses = asyncio.run(burst())
+    statuses = [r.status_code for r in responses]
+
+    assert statuses.count(200) == LIMIT
+    assert statuses.count(429) == BURST - LIMIT
+    assert all(r.headers["Retry-After"] for r in responses if r.status_code == 429)
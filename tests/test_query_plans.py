@@ -0,0 +1,103 @@
+"""
+Regression test query plan untuk query yang paling sering jalan.
+
+Membuat DB sintetis besar (scripts.generate_org) di folder sementara,
+lalu EXPLAIN QUERY PLAN setiap query di core.queries dan query halaman
+data API. Gagal kalau ada query yang jatuh ke full table scan.
+
+    python -m pytest tests/test_query_plans.py
+    HR_PLAN_TEST_USERS=5000 python -m pytest tests/test_query_plans.py
+"""
+import os
+import re
+from datetime import date
+
+os.environ.setdefault("HR_BCRYPT_ROUNDS", "4")  # hash user sintetis, bukan yang diuji
+
+import pytest
+
+import core.db
+from backend.resources import RESOURCES, page_query
+from core import queries
+from scripts.generate_org import build_database
+
+USERS = int(os.getenv("HR_PLAN_TEST_USERS", 20000))
+YEARS = int(os.getenv("HR_PLAN_TEST_YEARS", 2))
+
+EMPLOYEE_ID = 100
+MANAGER_ID = 2
+TODAY = date.today()
+MONTH = TODAY.year * 12 + TODAY.month - 1
+
+HOT_QUERIES = {
+    "manager_team": (queries.MANAGER_TEAM, (MANAGER_ID,)),
+    "manager_pending_leave": (queries.MANAGER_PENDING_LEAVE, (EMPLOYEE_ID,)),
+    "manager_pending_co": (queries.MANAGER_PENDING_CO, (EMPLOYEE_ID,)),
+    "hr_emails": (queries.HR_EMAILS, ()),
+    "managers_by_division": (queries.MANAGERS_BY_DIVISION, ()),
+    "hr_leave_queue": (queries.HR_LEAVE_QUEUE, ()),
+    "hr_co_queue": (queries.HR_CO_QUEUE, ()),
+    "login_activity": (queries.LOGIN_ACTIVITY, ()),
+    "employee_leave_history": (queries.EMPLOYEE_LEAVE_HISTORY, (EMPLOYEE_ID,)),
+    "employee_co_history": (queries.EMPLOYEE_CO_HISTORY, (EMPLOYEE_ID,)),
+    "accrual_insert": (queries.ACCRUAL_INSERT, {
+        "floor": MONTH - 11, "target": MONTH, "today": TODAY.isoformat(),
+    }),
+}
+
+# Halaman data API untuk manager / employee (dibatasi ke baris miliknya).
+# Halaman HR tanpa filter memang berjalan di primary key (ORDER BY key
+# DESC LIMIT), jadi tidak diperiksa di sini.
+for _name, _resource in RESOURCES.items():
+    for _role, _viewer_id in (("manager", MANAGER_ID), ("employee", EMPLOYEE_ID)):
+        for _after in (None, 1000):
+            HOT_QUERIES[f"api_{_name}_{_role}{'_after' if _after else ''}"] = page_query(
+                _resource, list(_resource.fields), {},
+                {"id": _viewer_id, "role": _role}, _after, 50,
+            )
+
+_SQL_WORDS = r"(?:ON|WHERE|LEFT|INNER|JOIN|GROUP|ORDER|LIMIT|UNION)\b"
+_FROM = re.compile(
+    rf"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!{_SQL_WORDS})(\w+))?", re.I
+)
+
+
+@pytest.fixture(scope="module")
+def plan_conn(tmp_path_factory):
+    old_path = core.db.DB_PATH
+    build_database(str(tmp_path_factory.mktemp("plans") / "plans.db"), USERS, YEARS)
+    try:
+        with core.db.connection() as conn:
+            yield conn
+    finally:
+        core.db.get_pool().close_all()
+        core.db.DB_PATH = old_path
+
+
+def full_scans(conn, sql, params) -> list[str]:
+    """
+    Detail plan yang berupa SCAN tabel tanpa index. "SCAN x USING INDEX"
+    (scan berurutan via index) dan scan atas CTE masih diterima.
+    """
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    aliases = {}
+    for table, alias in _FROM.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+
+    scans = []
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+        detail = row[3]
+        if not detail.startswith("SCAN ") or "INDEX" in detail:
+            continue
+        target = detail.split()[1]
+        if aliases.get(target, target) in tables:
+            scans.append(detail)
+    return scans
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_no_full_table_scan(plan_conn, name):
+    sql, params = HOT_QUERIES[name]
+    assert full_scans(plan_conn, sql, params) == []
@@ -0,0 +1,39 @@
+"""
+TokenCache: catatan logout hidup sampai token kedaluwarsa, tidak lebih.
+
+    python -m pytest tests/test_token_cache.py
+"""
+import time
+
+from backend.auth import TokenCache
+
+NOW = time.time()  # revoke() membuang yang expired menurut jam asli
+
+
+def test_revoked_token_rejected_until_exp():
+    cache = TokenCache(maxsize=10)
+    cache.put("t", {"user_id": 1}, NOW + 60)
+    cache.revoke("t", NOW + 60)
+
+    assert cache.get("t", NOW) == (True, None)
+    assert cache.get("t", NOW + 61) == (False, None)
+
+
+def test_expired_revocations_do_not_accumulate():
+    cache = TokenCache(maxsize=10)
+    for i in range(1000):
+        cache.revoke(f"t{i}", NOW + i)
+
+    cache.get("other", NOW + 990)
+    assert len(cache._revoked) == 9
+    assert len(cache._revoked_exp) == 9
+
+
+def test_revoke_again_keeps_latest_exp():
+    cache = TokenCache(maxsize=10)
+    cache.revoke("t", NOW + 10)
+    cache.revoke("t", NOW + 100)
+
+    assert cache.get("t", NOW + 50) == (True, None)
+    assert cache.get("t", NOW + 101) == (False, None)
+    assert not cache._revoked
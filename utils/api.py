@@ -1,11 +1,57 @@
+import os
+import time
+
 import requests
+import streamlit as st
 
 API_BASE = "http://127.0.0.1:8000"
 
+# /me di-cache per session Streamlit; rerun karena klik widget tidak
+# perlu round trip ke backend. Login / logout selalu membuang cache.
+ME_CACHE_SECONDS = float(os.getenv("HR_ME_CACHE_SECONDS", 30))
+_ME_KEY = "_api_me_cache"
+
 _session = requests.Session()
 
 def api_get(path, **kwargs):
     return _session.get(f"{API_BASE}{path}", **kwargs)
 
 def api_post(path, **kwargs):
+    if path in ("/login", "/logout"):
+        clear_me_cache()
     return _session.post(f"{API_BASE}{path}", **kwargs)
+
+def clear_me_cache():
+    st.session_state.pop(_ME_KEY, None)
+
+def update_me_cache(**fields):
+    """
+    Perbarui payload /me yang di-cache setelah user mengubah datanya
+    sendiri (mis. notify_mode), tanpa round trip ke backend.
+    """
+    cached = st.session_state.get(_ME_KEY)
+    if cached:
+        cached[0].update(fields)
+
+def get_me(**kwargs):
+    """
+    Payload /me (dict) atau None jika belum login / session invalid.
+    Hanya hasil valid yang di-cache, supaya login langsung terdeteksi.
+    """
+    cached = st.session_state.get(_ME_KEY)
+    now = time.monotonic()
+    if cached and cached[1] > now:
+        return cached[0]
+
+    r = api_get("/me", **kwargs)
+    try:
+        me = r.json() if r.status_code == 200 else None
+    except ValueError:
+        me = None
+
+    if isinstance(me, dict):
+        st.session_state[_ME_KEY] = (me, now + ME_CACHE_SECONDS)
+        return me
+
+    clear_me_cache()
+    return None
@@ -1,99 +1,123 @@
-def leave_request_email(emp_name, type, start, end, days):
-    return f"""
-    <html>
-    <body>
-        <h3>📩 Leave Request Pending Approval</h3>
-
-        <p>
-            <strong>{emp_name}</strong> has submitted a leave request:
-        </p>
-
-        <ul>
-            <li><b>Type:</b> {type}</li>
-            <li><b>Period:</b> {start} → {end}</li>
-            <li><b>Total Days:</b> {days}</li>
-        </ul>
-
-        <p>Please login to the system to approve or reject.</p>
-
-        <br>
-        <small>HR System</small>
-    </body>
-    </html>
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    StrictUndefined,
+)
+from markupsafe import Markup, escape
+
+# =========================
+# EMAIL TEMPLATE REGISTRY
+# =========================
+# Semua email dirender dari templates/email/<nama>.txt.j2 + .html.j2
+# (Jinja2). Template dikompilasi sekali per proses (cache Environment)
+# dan bytecode-nya disimpan di disk supaya proses baru (worker, restart
+# Streamlit) tidak parse ulang. Bagian HTML di-autoescape: field dari
+# user (reason, note, nama) aman disisipkan apa adanya.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(BASE_DIR, "templates", "email")
+CACHE_DIR = os.getenv(
+    "HR_TEMPLATE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "hr-email-templates")
+)
+
+# nama template -> subject (juga template Jinja, tanpa escape)
+TEMPLATES = {
+    "leave_request": "Leave Request Pending Approval",
+    "change_off_request": "Change Off Claim Pending Approval",
+    "request_status": "{{ request_type }} {{ status | title }}",
+    "leave_event": "{{ subjects.get(event, 'Leave Notification') }}",
+    "digest": "HR System digest: {{ count }} notification(s)",
+    "balance_update": "Leave Balance Update {{ year }}",
+}
+
+LEAVE_EVENT_SUBJECTS = {
+    "submitted": "📩 Leave Request Submitted",
+    "manager_approved": "✅ Leave Approved by Manager",
+    "manager_rejected": "❌ Leave Rejected by Manager",
+    "hr_approved": "🎉 Leave Approved by HR",
+    "hr_rejected": "❌ Leave Rejected by HR",
+}
+
+
+@dataclass(frozen=True)
+class RenderedEmail:
+    subject: str
+    text: str
+    html: str
+
+
+def _nl2br(value):
+    return Markup("<br>").join(escape(value).splitlines())
+
+
+def _build_env() -> Environment:
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(CACHE_DIR)
+    except OSError:
+        bytecode_cache = None
+
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=lambda name: bool(name) and name.endswith(".html.j2"),
+        bytecode_cache=bytecode_cache,
+        undefined=StrictUndefined,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        auto_reload=False,
+    )
+    env.filters["nl2br"] = _nl2br
+    env.globals["subjects"] = LEAVE_EVENT_SUBJECTS
+    return env
+
+
+_env: Environment | None = None
+_compiled = {}  # nama -> (subject, text, html) Template
+_lock = threading.Lock()
+
+
+def get_template(name: str):
+    global _env
+    compiled = _compiled.get(name)
+    if compiled is not None:
+        return compiled
+
+    with _lock:
+        if _env is None:
+            _env = _build_env()
+        if name not in TEMPLATES:
+            raise KeyError(f"unknown email template: {name}")
+        compiled = _compiled[name] = (
+            _env.from_string(TEMPLATES[name]),
+            _env.get_template(f"{name}.txt.j2"),
+            _env.get_template(f"{name}.html.j2"),
+        )
+    return compiled
+
+
+def _render(compiled, context: dict) -> RenderedEmail:
+    subject, text, html = compiled
+    return RenderedEmail(
+        # subject masuk header: buang newline (header injection)
+        subject=" ".join(subject.render(context).split()),
+        text=text.render(context).strip() + "\n",
+        html=html.render(context),
+    )
+
+
+def render(name: str, **context) -> RenderedEmail:
+    return _render(get_template(name), context)
+
+
+def render_many(name: str, contexts) -> list[RenderedEmail]:
     """
-
-
-def leave_status_email(name, typ, status, note=None):
-    note_html = f"<p><b>Note:</b> {note}</p>" if note else ""
-    return f"""
-    <h3>Leave Request Update</h3>
-    <p>Hi <b>{name}</b>,</p>
-    <p>Your leave request ({typ}) has been <b>{status}</b>.</p>
-    {note_html}
-    <p>— HR System</p>
-    """
-
-def change_off_request_email(
-    emp_name,
-    work_type,
-    period,
-    co_days,
-    day_type
-):
-    return f"""
-    <html>
-    <body style="font-family:Arial, sans-serif;">
-        <h3>📦 Change Off Claim Pending Approval</h3>
-
-        <p><strong>Employee:</strong> {emp_name}</p>
-        <p><strong>Work Type:</strong> {work_type.upper()}</p>
-        <p><strong>Period:</strong> {period}</p>
-        <p><strong>Day Type:</strong> {day_type.upper()}</p>
-        <p><strong>Change Off:</strong> {co_days} day(s)</p>
-
-        <hr>
-        <p style="font-size:12px;color:#6b7280;">
-            This is an automated notification. Please review in HR System.
-        </p>
-    </body>
-    </html>
-    """
-
-def approval_result_email(
-    emp_name: str,
-    request_type: str,
-    status: str,
-    note: str = None
-):
-    color = "#16a34a" if status == "APPROVED" else "#dc2626"
-
-    note_html = ""
-    if note:
-        note_html = f"""
-        <p><b>Reason:</b><br>
-        {note}</p>
-        """
-
-    return f"""
-    <html>
-    <body style="font-family:Arial,sans-serif">
-        <h3 style="color:{color};">
-            {request_type} {status}
-        </h3>
-
-        <p>Hello <b>{emp_name}</b>,</p>
-
-        <p>
-            Your <b>{request_type}</b> request has been
-            <b>{status.lower()}</b> by your manager.
-        </p>
-
-        {note_html}
-
-        <br>
-        <p style="font-size:12px;color:#6b7280">
-            This is an automated notification. Please do not reply.
-        </p>
-    </body>
-    </html>
+    Render satu template untuk banyak penerima (digest, pengumuman
+    massal). Template diambil sekali untuk seluruh batch.
     """
+    compiled = get_template(name)
+    return [_render(compiled, context) for context in contexts]
@@ -1,38 +1,216 @@
 from email.message import EmailMessage
+import atexit
 import smtplib
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from core.metrics import EMAIL_SEND_SECONDS, counter
 
 load_dotenv()
 
 SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
 EMAIL_SENDER = os.getenv("EMAIL_SENDER")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 FROM_NAME = os.getenv("EMAIL_FROM_NAME", "HR System")
 
+# =========================
+# POOLED SMTP SESSION
+# =========================
+# Satu sesi SMTP (connect + STARTTLS + login) dipakai untuk banyak email.
+# Sesi yang menganggur lebih dari NOOP_AFTER dicek dengan NOOP sebelum
+# dipakai; NOOP gagal -> reconnect. Sesi yang putus saat kirim di-reconnect
+# sekali lalu email diulang; email yang ditolak server (SMTP response
+# error) tidak diulang. Server umumnya membatasi jumlah pesan per sesi,
+# jadi sesi diganti setelah MAX_MESSAGES.
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 30))
+NOOP_AFTER_SECONDS = float(os.getenv("SMTP_NOOP_AFTER_SECONDS", 30))
+IDLE_CLOSE_SECONDS = float(os.getenv("SMTP_IDLE_CLOSE_SECONDS", 240))
+MAX_MESSAGES_PER_SESSION = int(os.getenv("SMTP_MAX_MESSAGES_PER_SESSION", 100))
 
-def send_email(
-    to_email: str,
+SMTP_CONNECTS = counter(
+    "hr_email_smtp_connects_total", "Sesi SMTP baru (connect + login)"
+)
+
+
+def _session_broken(error: Exception) -> bool:
+    """
+    True kalau error berarti sesinya rusak (putus / socket error), bukan
+    email-nya. smtplib.SMTPException juga turunan OSError: penolakan
+    server (recipient/sender refused, data error) tidak di-reconnect.
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def build_message(
+    to_email,
     subject: str,
     body: str,
-    html: bool = False
-):
-    if not EMAIL_SENDER or not EMAIL_PASSWORD:
-        raise RuntimeError("Email environment belum lengkap")
+    html: bool = False,
+    body_html: str | None = None
+) -> EmailMessage:
+    if not isinstance(to_email, str):
+        to_email = ", ".join(to_email)
 
     msg = EmailMessage()
     msg["From"] = f"{FROM_NAME} <{EMAIL_SENDER}>"
     msg["To"] = to_email
     msg["Subject"] = subject
 
-    if html:
+    if body_html:
+        # multipart/alternative: teks untuk klien tanpa HTML
+        msg.set_content(body)
+        msg.add_alternative(body_html, subtype="html")
+    elif html:
         msg.set_content("Email ini membutuhkan HTML viewer.")
         msg.add_alternative(body, subtype="html")
     else:
         msg.set_content(body)
+    return msg
+
+
+class SMTPSender:
+    def __init__(
+        self,
+        host=SMTP_SERVER,
+        port=SMTP_PORT,
+        user=EMAIL_SENDER,
+        password=EMAIL_PASSWORD,
+        starttls=SMTP_STARTTLS,
+        timeout=SMTP_TIMEOUT,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._smtp: smtplib.SMTP | None = None
+        self._last_used = 0.0
+        self._sent_in_session = 0
+        self._lock = threading.Lock()
+
+    # ---- sesi ----
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.password:
+                smtp.login(self.user, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        SMTP_CONNECTS.inc()
+        self._smtp = smtp
+        self._sent_in_session = 0
+        self._last_used = time.monotonic()
+
+    def _drop(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _healthy(self) -> bool:
+        if self._smtp is None:
+            return False
+        idle = time.monotonic() - self._last_used
+        if idle > IDLE_CLOSE_SECONDS or self._sent_in_session >= MAX_MESSAGES_PER_SESSION:
+            return False
+        if idle < NOOP_AFTER_SECONDS:
+            return True
+        try:
+            return self._smtp.noop()[0] == 250
+        except OSError:
+            return False
+
+    def _ensure(self):
+        if not self._healthy():
+            self._drop()
+            self._connect()
+
+    def _send_one(self, msg: EmailMessage):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            try:
+                self._ensure()
+                self._smtp.send_message(msg)
+            except OSError as e:
+                # hanya sesi yang putus di tengah jalan yang di-reconnect
+                # (satu kali) lalu diulang; email yang ditolak server
+                # langsung dilempar ke pemanggil
+                if not _session_broken(e):
+                    raise
+                self._drop()
+                self._connect()
+                self._smtp.send_message(msg)
+            self._sent_in_session += 1
+            self._last_used = time.monotonic()
+            status = "ok"
+        finally:
+            EMAIL_SEND_SECONDS.observe(time.perf_counter() - started, status=status)
 
-    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-        server.starttls()
-        server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-        server.send_message(msg)
+    # ---- API ----
+    def send(self, msg: EmailMessage):
+        with self._lock:
+            self._send_one(msg)
+
+    def send_many(self, messages) -> list[Exception | None]:
+        """
+        Kirim banyak email lewat sesi yang sama. Return error per email
+        (None = terkirim); satu email yang ditolak tidak menghentikan
+        sisanya.
+        """
+        results = []
+        with self._lock:
+            for msg in messages:
+                try:
+                    self._send_one(msg)
+                    results.append(None)
+                except Exception as e:
+                    results.append(e)
+        return results
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+
+_sender: SMTPSender | None = None
+_sender_lock = threading.Lock()
+
+
+def get_sender() -> SMTPSender:
+    global _sender
+    if _sender is None:
+        with _sender_lock:
+            if _sender is None:
+                if not EMAIL_SENDER or not EMAIL_PASSWORD:
+                    raise RuntimeError("Email environment belum lengkap")
+                _sender = SMTPSender()
+    return _sender
+
+
+@atexit.register
+def _close_sender():
+    if _sender is not None:
+        _sender.close()
+
+
+def send_email(
+    to_email: str,
+    subject: str,
+    body: str,
+    html: bool = False,
+    body_html: str | None = None
+):
+    get_sender().send(build_message(to_email, subject, body, html, body_html))
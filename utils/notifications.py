@@ -1,5 +1,44 @@
 # utils/notifications.py
-from utils.emailer import send_email
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+
+import aiosmtplib
+
+from core.metrics import EMAIL_SEND_SECONDS
+from utils.email_templates import render, render_many
+from utils.emailer import (
+    EMAIL_PASSWORD,
+    EMAIL_SENDER,
+    MAX_MESSAGES_PER_SESSION,
+    SMTP_CONNECTS,
+    SMTP_PORT,
+    SMTP_SERVER,
+    SMTP_STARTTLS,
+    SMTP_TIMEOUT,
+    build_message,
+    get_sender,
+    send_email,
+)
+
+# =========================
+# ASYNC FAN-OUT
+# =========================
+# Email massal (saldo cuti setelah reset 30 Juni, batch besar outbox)
+# dikirim bersamaan di satu event loop (aiosmtplib). Maksimal CONCURRENCY
+# email in-flight (semaphore); sesi SMTP dibuka sesuai kebutuhan dan
+# dipakai ulang antar email. Tiap domain penerima dibatasi DOMAIN_RATE
+# email/detik (token bucket, boleh DOMAIN_BURST sekaligus) supaya server
+# tujuan tidak men-throttle / menandai spam.
+CONCURRENCY = int(os.getenv("HR_EMAIL_CONCURRENCY", 10))
+DOMAIN_RATE = float(os.getenv("HR_EMAIL_DOMAIN_RATE", 20))  # 0 = tanpa batas
+DOMAIN_BURST = int(os.getenv("HR_EMAIL_DOMAIN_BURST", 20))
+# batch lebih kecil dari ini lewat sesi sync (utils.emailer) saja
+FANOUT_MIN = int(os.getenv("HR_EMAIL_FANOUT_MIN", 10))
+
+# Error yang berarti sesinya rusak, bukan email-nya
+_SESSION_ERRORS = (aiosmtplib.SMTPServerDisconnected, OSError)
 
 
 def notify_leave_event(
@@ -12,88 +51,240 @@ def notify_leave_event(
     end_date: str,
     note: str | None = None
 ):
-    subject_map = {
-        "submitted": "📩 Leave Request Submitted",
-        "manager_approved": "✅ Leave Approved by Manager",
-        "manager_rejected": "❌ Leave Rejected by Manager",
-        "hr_approved": "🎉 Leave Approved by HR",
-        "hr_rejected": "❌ Leave Rejected by HR",
-    }
+    message = render(
+        "leave_event",
+        emp_name=emp_name,
+        event=event,
+        leave_type=leave_type,
+        start_date=start_date,
+        end_date=end_date,
+        note=note,
+    )
 
-    subject = subject_map.get(event, "Leave Notification")
+    send_email(
+        to_email=to_email,
+        subject=message.subject,
+        body=message.text,
+        body_html=message.html
+    )
 
-    body = f"""
-Halo {emp_name},
 
-Status pengajuan cuti Anda:
+@dataclass
+class FanOutResult:
+    recipients: list[str]
+    errors: list[Exception | None]  # per email, urutan sama dengan input
+    elapsed: float
+    sessions: int
 
-• Tipe   : {leave_type}
-• Periode: {start_date} s/d {end_date}
-• Status : {event.replace('_', ' ').title()}
+    @property
+    def sent(self) -> int:
+        return sum(e is None for e in self.errors)
 
-"""
+    @property
+    def failed(self) -> int:
+        return len(self.errors) - self.sent
 
-    if note:
-        body += f"Catatan:\n{note}\n\n"
+    def failures(self) -> dict[str, str]:
+        return {
+            to: f"{type(e).__name__}: {e}"
+            for to, e in zip(self.recipients, self.errors)
+            if e is not None
+        }
 
-    body += "Email ini dikirim otomatis oleh HR System.\nMohon tidak membalas."
+    def by_domain(self) -> dict[str, dict]:
+        stats = {}
+        for to, e in zip(self.recipients, self.errors):
+            row = stats.setdefault(_domain(to), {"sent": 0, "failed": 0})
+            row["sent" if e is None else "failed"] += 1
+        return stats
 
-    send_email(
-        to_email=to_email,
-        subject=subject,
-        body=body
+    def summary(self) -> str:
+        rate = len(self.errors) / self.elapsed if self.elapsed else 0
+        return (
+            f"sent={self.sent} failed={self.failed} "
+            f"in {self.elapsed:.1f} s ({rate:.1f} email/s, {self.sessions} sesi)"
+        )
+
+
+def _domain(to_email: str) -> str:
+    first = to_email.split(",")[0].strip()
+    return first.rsplit("@", 1)[-1].rstrip(">").lower()
+
+
+class _DomainLimiter:
+    """
+    Token bucket per domain (GCRA): tiap email memesan slot waktu kirim,
+    jadi email ke domain lain tidak ikut menunggu.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.window = max(burst - 1, 0) * self.interval
+        self._tat = {}  # domain -> theoretical arrival time (monotonic)
+
+    async def wait(self, domain: str):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        tat = max(self._tat.get(domain, now), now)
+        self._tat[domain] = tat + self.interval
+        delay = tat - self.window - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class _AsyncSession:
+    def __init__(self, host, port, user, password, starttls, timeout):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._smtp: aiosmtplib.SMTP | None = None
+        self._sent_in_session = 0
+
+    async def _connect(self):
+        smtp = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            timeout=self.timeout,
+            start_tls=self.starttls,
+        )
+        await smtp.connect()
+        try:
+            if self.password:
+                await smtp.login(self.user, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        SMTP_CONNECTS.inc()
+        self._smtp = smtp
+        self._sent_in_session = 0
+
+    async def close(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            await smtp.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            smtp.close()
+
+    async def send(self, msg):
+        # sesi fan-out hanya hidup selama satu batch: tanpa NOOP check
+        if self._smtp is None or self._sent_in_session >= MAX_MESSAGES_PER_SESSION:
+            await self.close()
+            await self._connect()
+        try:
+            await self._smtp.send_message(msg)
+        except _SESSION_ERRORS:
+            # sesi putus di tengah jalan: satu kali reconnect lalu ulang
+            await self.close()
+            await self._connect()
+            await self._smtp.send_message(msg)
+        self._sent_in_session += 1
+
+
+async def fan_out(
+    messages,
+    concurrency: int = CONCURRENCY,
+    domain_rate: float = DOMAIN_RATE,
+    domain_burst: int = DOMAIN_BURST,
+    host=SMTP_SERVER,
+    port=SMTP_PORT,
+    user=EMAIL_SENDER,
+    password=EMAIL_PASSWORD,
+    starttls=SMTP_STARTTLS,
+    timeout=SMTP_TIMEOUT,
+) -> FanOutResult:
+    """
+    Kirim banyak EmailMessage bersamaan. Satu email yang ditolak tidak
+    menghentikan sisanya; hasil per email ada di FanOutResult.errors.
+    """
+    messages = list(messages)
+    semaphore = asyncio.BoundedSemaphore(max(concurrency, 1))
+    limiter = _DomainLimiter(domain_rate, domain_burst)
+    idle: list[_AsyncSession] = []  # LIFO: sesi yang baru dipakai dulu
+    opened: list[_AsyncSession] = []
+
+    async def deliver(msg):
+        await limiter.wait(_domain(msg["To"]))
+        async with semaphore:
+            session = idle.pop() if idle else None
+            if session is None:
+                session = _AsyncSession(host, port, user, password, starttls, timeout)
+                opened.append(session)
+
+            started = time.perf_counter()
+            status = "error"
+            try:
+                await session.send(msg)
+                status = "ok"
+                return None
+            except Exception as e:
+                return e
+            finally:
+                EMAIL_SEND_SECONDS.observe(time.perf_counter() - started, status=status)
+                idle.append(session)
+
+    started = time.perf_counter()
+    try:
+        errors = await asyncio.gather(*(deliver(msg) for msg in messages))
+    finally:
+        await asyncio.gather(*(s.close() for s in opened), return_exceptions=True)
+
+    return FanOutResult(
+        recipients=[msg["To"] for msg in messages],
+        errors=list(errors),
+        elapsed=time.perf_counter() - started,
+        sessions=len(opened),
     )
 
 
+def send_concurrent(messages, **kwargs) -> FanOutResult:
+    """
+    Versi sync dari fan_out (untuk script / worker).
+    """
+    if "password" not in kwargs and (not EMAIL_SENDER or not EMAIL_PASSWORD):
+        raise RuntimeError("Email environment belum lengkap")
+    return asyncio.run(fan_out(messages, **kwargs))
 
 
-def leave_request_email(emp_name, manager_name, leave_type, start, end, days):
-    return f"""
-    <html>
-    <body style="font-family: Inter, Segoe UI, Arial, sans-serif; background:#f9fafb; padding:24px;">
-        <div style="max-width:600px; margin:auto; background:#ffffff; border-radius:8px; border:1px solid #e5e7eb;">
-
-            <div style="padding:20px; border-bottom:1px solid #e5e7eb;">
-                <h2 style="margin:0; color:#111827;">📩 Leave Request Pending Approval</h2>
-            </div>
-
-            <div style="padding:20px; color:#111827;">
-                <p>Dear <b>{manager_name}</b>,</p>
-
-                <p>
-                    <b>{emp_name}</b> has submitted a leave request with the following details:
-                </p>
-
-                <table style="width:100%; border-collapse:collapse; margin-top:12px;">
-                    <tr>
-                        <td style="padding:8px; background:#f3f4f6;">Type</td>
-                        <td style="padding:8px;">{leave_type}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding:8px; background:#f3f4f6;">Period</td>
-                        <td style="padding:8px;">{start} → {end}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding:8px; background:#f3f4f6;">Total Days</td>
-                        <td style="padding:8px;"><b>{days}</b></td>
-                    </tr>
-                </table>
-
-                <p style="margin-top:16px;">
-                    Please login to the HR System to approve or reject this request.
-                </p>
-
-                <p style="margin-top:24px;">
-                    Regards,<br>
-                    <b>HR System</b>
-                </p>
-            </div>
-
-            <div style="padding:12px; background:#f9fafb; color:#6b7280; font-size:12px; text-align:center;">
-                This is an automated notification. Please do not reply.
-            </div>
-
-        </div>
-    </body>
-    </html>
+def deliver_many(messages) -> list[Exception | None]:
     """
+    send_many untuk core.outbox.deliver_pending: batch kecil lewat sesi
+    SMTP sync yang di-pool, batch besar lewat fan-out async.
+    """
+    messages = list(messages)
+    if len(messages) < FANOUT_MIN or CONCURRENCY <= 1:
+        return get_sender().send_many(messages)
+    return send_concurrent(messages).errors
+
+
+def broadcast(name: str, recipients, **kwargs) -> FanOutResult:
+    """
+    Render template `name` untuk setiap (to_email, context) lalu kirim
+    bersamaan. Dipakai untuk pengumuman massal.
+    """
+    recipients = list(recipients)
+    rendered = render_many(name, [context for _, context in recipients])
+    messages = [
+        build_message(to_email, m.subject, m.text, body_html=m.html)
+        for (to_email, _), m in zip(recipients, rendered)
+    ]
+    return send_concurrent(messages, **kwargs)
+
+
+def notify_leave_events(events, **kwargs) -> FanOutResult:
+    """
+    notify_leave_event untuk banyak penerima sekaligus. events = list dict
+    berisi to_email + field notify_leave_event.
+    """
+    return broadcast(
+        "leave_event",
+        [
+            (e["to_email"], {"note": None, **{k: v for k, v in e.items() if k != "to_email"}})
+            for e in events
+        ],
+        **kwargs
+    )
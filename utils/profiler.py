@@ -0,0 +1,284 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import streamlit as st
+
+from core import query_log
+
+# =========================
+# RENDER PROFILER (STREAMLIT)
+# =========================
+# Opt-in, per rerun halaman:
+#   HR_RENDER_PROFILE=1         -> waktu per section + per query DB
+#   HR_RENDER_PROFILE=cprofile  -> + cProfile (fungsi teratas)
+#   ?profile=1 / ?profile=cprofile di URL -> hanya untuk session itu
+# Selama rerun yang diprofil, koneksi DB yang diambil thread halaman
+# ter-instrumentasi (core.db), jadi waktu per query ikut tercatat. Hasil
+# disimpan di ring buffer per proses dan ditampilkan di HR System Status.
+MODE = os.getenv("HR_RENDER_PROFILE", "0")
+KEEP_RERUNS = int(os.getenv("HR_RENDER_PROFILE_KEEP", 50))
+CPROFILE_TOP = 25
+
+_SESSION_KEY = "_render_profile"
+
+_history = deque(maxlen=KEEP_RERUNS)
+_history_lock = threading.Lock()
+_local = threading.local()
+
+
+class RerunProfile:
+    def __init__(self, page: str, use_cprofile: bool):
+        self.page = page
+        self.started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.started = time.perf_counter()
+        self.last_seen = self.started
+        self.stack = []     # [(nama, mulai)]
+        self.sections = {}  # path "a;b" -> detik (inklusif)
+        self.db = {}        # path "a;b;db: SQL" -> [calls, detik]
+        self.profiler = None
+
+        if use_cprofile:
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # profiler lain sudah aktif di thread ini
+                self.profiler = None
+
+    def path(self, *extra) -> str:
+        return ";".join([self.page] + [name for name, _ in self.stack] + list(extra))
+
+    def push(self, name: str):
+        self.stack.append((name, time.perf_counter()))
+
+    def pop(self):
+        path = self.path()
+        _, started = self.stack.pop()
+        self.last_seen = time.perf_counter()
+        self.sections[path] = self.sections.get(path, 0.0) + self.last_seen - started
+
+    def add_query(self, sql: str, seconds: float, call: bool):
+        stat = self.db.setdefault(self.path("db: " + sql[:120].replace(";", ",")), [0, 0.0])
+        stat[0] += call
+        stat[1] += seconds
+        self.last_seen = time.perf_counter()
+
+    def finish(self, completed: bool) -> dict:
+        # rerun yang dihentikan st.stop()/st.rerun() ditutup saat rerun
+        # berikutnya; waktunya dihitung sampai aktivitas terakhir
+        ended = time.perf_counter() if completed else self.last_seen
+        while self.stack:
+            name, started = self.stack[-1]
+            path = self.path()
+            self.stack.pop()
+            self.sections[path] = self.sections.get(path, 0.0) + ended - started
+        self.sections[self.page] = ended - self.started
+
+        top = []
+        if self.profiler is not None:
+            self.profiler.disable()
+            stats = pstats.Stats(self.profiler, stream=io.StringIO())
+            rows = sorted(
+                stats.stats.items(), key=lambda kv: -kv[1][3]
+            )[:CPROFILE_TOP]
+            for (filename, line, func), (_, ncalls, tottime, cumtime, _) in rows:
+                top.append({
+                    "function": f"{func} ({os.path.basename(filename)}:{line})",
+                    "calls": ncalls,
+                    "self_ms": round(tottime * 1000, 2),
+                    "cumulative_ms": round(cumtime * 1000, 2),
+                })
+
+        return {
+            "page": self.page,
+            "started_at": self.started_at,
+            "total_ms": round((ended - self.started) * 1000, 2),
+            "completed": completed,
+            "sections": {k: v * 1000 for k, v in self.sections.items()},
+            "db": {k: [c, s * 1000] for k, (c, s) in self.db.items()},
+            "cprofile": top,
+        }
+
+
+def _current() -> RerunProfile | None:
+    return getattr(_local, "profile", None)
+
+
+def _on_query(sql, seconds, call):
+    profile = _current()
+    if profile is not None:
+        profile.add_query(sql, seconds, call)
+
+
+query_log.add_observer(_on_query)
+
+
+def _mode() -> str:
+    try:
+        param = st.query_params.get("profile")
+    except Exception:
+        param = None
+    return param or MODE
+
+
+def _store(result: dict):
+    with _history_lock:
+        _history.append(result)
+
+
+# =========================
+# API HALAMAN
+# =========================
+def start_rerun(page: str):
+    """
+    Panggil di awal script halaman. No-op jika profiler tidak aktif.
+    """
+    pending = st.session_state.pop(_SESSION_KEY, None)
+    if pending is not None:
+        _store(pending.finish(completed=False))
+    _local.profile = None
+    query_log.set_thread_profiling(False)
+
+    mode = _mode()
+    if mode in ("", "0"):
+        return
+
+    profile = RerunProfile(page, use_cprofile=mode == "cprofile")
+    _local.profile = profile
+    # koneksi yang diambil halaman setelah ini ter-instrumentasi (core.db)
+    query_log.set_thread_profiling(True)
+    st.session_state[_SESSION_KEY] = profile
+
+
+def end_rerun():
+    """
+    Panggil di akhir script halaman.
+    """
+    profile = _current()
+    _local.profile = None
+    query_log.set_thread_profiling(False)
+    if profile is None:
+        return
+    st.session_state.pop(_SESSION_KEY, None)
+    _store(profile.finish(completed=True))
+
+
+def mark(name: str):
+    """
+    Section berurutan tingkat atas: menutup section sebelumnya lalu
+    membuka yang baru (cocok untuk blok-blok script Streamlit).
+    """
+    profile = _current()
+    if profile is None:
+        return
+    while profile.stack:
+        profile.pop()
+    profile.push(name)
+
+
+@contextmanager
+def section(name: str):
+    profile = _current()
+    if profile is None:
+        yield
+        return
+    profile.push(name)
+    try:
+        yield
+    finally:
+        profile.pop()
+
+
+def profiled(name: str | None = None):
+    """
+    Decorator: @profiled() atau @profiled("nama section").
+    """
+    def decorator(fn):
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with section(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# =========================
+# RINGKASAN (HR SYSTEM STATUS)
+# =========================
+def recent_reruns() -> list[dict]:
+    with _history_lock:
+        return list(_history)
+
+
+def clear_history():
+    with _history_lock:
+        _history.clear()
+
+
+def flame_summary(reruns: list[dict]) -> list[dict]:
+    """
+    Gabungan semua rerun per stack path (format "page;section;...").
+    ms = total inklusif, per_rerun = rata-rata per rerun halaman itu,
+    share = porsi dari total waktu halaman.
+    """
+    per_page = {}
+    totals = {}
+    for r in reruns:
+        per_page[r["page"]] = per_page.get(r["page"], 0) + 1
+        for path, ms in r["sections"].items():
+            t = totals.setdefault(path, [0, 0.0])
+            t[1] += ms
+        for path, (calls, ms) in r["db"].items():
+            t = totals.setdefault(path, [0, 0.0])
+            t[0] += calls
+            t[1] += ms
+
+    rows = []
+    for path, (calls, ms) in totals.items():
+        parts = path.split(";")
+        page_ms = totals[parts[0]][1] if parts[0] in totals else 0
+        rows.append({
+            "path": path,
+            "depth": len(parts) - 1,
+            "name": parts[-1],
+            "calls": calls,
+            "ms": round(ms, 2),
+            "per_rerun_ms": round(ms / per_page[parts[0]], 2),
+            "share": ms / page_ms if page_ms else 0.0,
+        })
+    rows.sort(key=lambda r: r["path"])
+    return rows
+
+
+def collapsed_stacks(reruns: list[dict]) -> str:
+    """
+    Format "collapsed" (flamegraph.pl / speedscope): "a;b;c <mikrodetik>".
+    Nilai per path adalah waktu self (dikurangi anak-anaknya).
+    """
+    inclusive = {}
+    for r in reruns:
+        for path, ms in r["sections"].items():
+            inclusive[path] = inclusive.get(path, 0.0) + ms
+        for path, (_, ms) in r["db"].items():
+            inclusive[path] = inclusive.get(path, 0.0) + ms
+
+    self_time = dict(inclusive)
+    for path, ms in inclusive.items():
+        parent = path.rpartition(";")[0]
+        if parent in self_time:
+            self_time[parent] -= ms
+
+    return "\n".join(
+        f"{path} {max(0, int(ms * 1000))}"
+        for path, ms in sorted(self_time.items())
+    ) + "\n"
@@ -8,3 +8,29 @@ def load_css(path: str):
             f"<style>{css_file.read_text()}</style>",
             unsafe_allow_html=True
         )
+
+
+def notification_settings(conn, user):
+    """
+    Pilihan email per event / digest untuk user yang login. Mode saat ini
+    dibaca dari profil /me (user), bukan query per rerun.
+    """
+    from core.notify import NOTIFY_MODES, set_mode
+    from utils.api import update_me_cache
+
+    current = user.get("notify_mode")
+    if current not in NOTIFY_MODES:
+        current = "instant"
+
+    with st.popover("🔔 Email Notifications"):
+        mode = st.radio(
+            "Delivery",
+            list(NOTIFY_MODES),
+            index=list(NOTIFY_MODES).index(current),
+            format_func=NOTIFY_MODES.get,
+            key="notify_mode",
+        )
+        if mode != current:
+            set_mode(conn, user["id"], mode)
+            update_me_cache(notify_mode=mode)
+            st.toast(f"🔔 Notifications: {NOTIFY_MODES[mode]}")